@@ -0,0 +1,67 @@
+"""Benchmark the local FEN-to-PNG board renderer.
+
+Measures cold renders (cache misses, after sprites and base boards are
+warmed up) and cached renders over a set of distinct positions.
+
+Run from the repository root:
+
+    python -m benchmarks.board_render --positions 200
+"""
+import argparse
+import time
+
+from benchmarks.common import format_latency
+from utils.board import BoardRenderer
+from utils.fen import apply_uci_move
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+OPENING = ["e2e4", "e7e5", "g1f3", "b8c6", "f1b5", "a7a6", "b5a4", "g8f6", "e1g1", "f8e7",
+           "f1e1", "b7b5", "a4b3", "d7d6", "c2c3", "e8g8", "h2h3", "c6a5", "b3c2", "c7c5"]
+
+
+def positions(count):
+    """Build count distinct FENs by walking the opening and flipping themes/orientations."""
+    fens = []
+    fen = START
+    for move in OPENING:
+        fen = apply_uci_move(fen, move)
+        fens.append(fen)
+    result = []
+    for theme in ("brown", "blue", "green"):
+        for orientation in ("w", "b"):
+            for fen in fens:
+                result.append((fen, orientation, theme))
+    return (result * (count // len(result) + 1))[:count]
+
+
+def timed(renderer, cases):
+    latencies = []
+    for fen, orientation, theme in cases:
+        start = time.perf_counter()
+        renderer.render(fen, orientation, theme)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--positions", type=int, default=120)
+    parser.add_argument("--square-size", type=int, default=60)
+    args = parser.parse_args()
+
+    cases = positions(args.positions)
+    renderer = BoardRenderer(square_size=args.square_size, cache_size=0)
+    # Warm up sprites, base boards and palettes for every theme/orientation
+    timed(renderer, list({(orientation, theme): (fen, orientation, theme)
+                          for fen, orientation, theme in reversed(cases)}.values()))
+
+    print(f"cold render   {format_latency(timed(renderer, cases))}")
+
+    renderer = BoardRenderer(square_size=args.square_size, cache_size=len(cases))
+    timed(renderer, cases)
+    print(f"cached render {format_latency(timed(renderer, cases))}")
+    print("renderer stats:", renderer.stats())
+
+
+if __name__ == "__main__":
+    main()
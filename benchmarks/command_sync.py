@@ -0,0 +1,141 @@
+"""Discord API calls and time spent syncing application commands across restarts and reconnects.
+
+Loads the bot's real cogs and points py-cord's command endpoints at an
+in-process fake of Discord with a fixed round-trip time. Compares the old
+behaviour (py-cord's sync on every connect plus sync_commands in every
+on_ready) with CommandSync over a series of starts and reconnects: a
+first start, restarts with nothing changed, a restart after one command
+changed, and a restart with a stale command left registered on Discord. After each CommandSync run it checks that every command
+has the ID py-cord needs to dispatch its interactions.
+
+Run from the repository root:
+
+    python -m benchmarks.command_sync --reconnects 5 --rtt-ms 120
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import itertools
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+from utils.command_sync import CommandSync
+
+APPLICATION_ID = 1234
+COMMAND_IDS = itertools.count(10_000)
+
+
+class FakeCommandsAPI:
+    """Stores command payloads per scope and counts reads and writes."""
+
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.scopes = {}
+        self.reads = 0
+        self.writes = 0
+
+    def _stored(self, scope, payload):
+        stored = []
+        for data in payload:
+            entry = dict(data, id=str(next(COMMAND_IDS)), application_id=str(APPLICATION_ID), version="1")
+            entry.setdefault("type", 1)
+            if scope is not None:
+                entry["guild_id"] = str(scope)
+            stored.append(entry)
+        self.scopes[scope] = stored
+        return [dict(entry) for entry in stored]
+
+    async def get_global_commands(self, application_id, *, with_localizations=True):
+        self.reads += 1
+        await asyncio.sleep(self.rtt)
+        return [dict(entry) for entry in self.scopes.get(None, [])]
+
+    async def get_guild_commands(self, application_id, guild_id, *, with_localizations=True):
+        self.reads += 1
+        await asyncio.sleep(self.rtt)
+        return [dict(entry) for entry in self.scopes.get(guild_id, [])]
+
+    async def bulk_upsert_global_commands(self, application_id, payload):
+        self.writes += 1
+        await asyncio.sleep(self.rtt)
+        return self._stored(None, payload)
+
+    async def bulk_upsert_guild_commands(self, application_id, guild_id, payload):
+        self.writes += 1
+        await asyncio.sleep(self.rtt)
+        return self._stored(guild_id, payload)
+
+
+def make_bot(api, changed=False):
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.default(), auto_sync_commands=False)
+    for package in ("commands", "events"):
+        for filename in sorted(os.listdir(package)):
+            if filename.endswith(".py"):
+                bot.load_extension(f"{package}.{filename[:-3]}")
+    if changed:
+        command = next(command for command in bot.pending_application_commands if command.name == "coach")
+        command.description = command.description + " (updated)"
+    bot._connection.user = SimpleNamespace(id=APPLICATION_ID)
+    for name in ("get_global_commands", "get_guild_commands", "bulk_upsert_global_commands",
+                 "bulk_upsert_guild_commands"):
+        setattr(bot.http, name, getattr(api, name))
+    return bot
+
+
+async def old_connect(bot):
+    # py-cord's default on_connect sync, then main.py's on_ready sync
+    await bot.sync_commands()
+    await bot.sync_commands()
+
+
+async def measure(label, api, bot, connect, reconnects):
+    reads, writes = api.reads, api.writes
+    started = time.perf_counter()
+    for _ in range(1 + reconnects):
+        await connect(bot)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<34} {api.reads - reads:3} reads  {api.writes - writes:3} writes  {elapsed * 1000:7.0f} ms")
+
+
+async def main_async(args):
+    rtt = args.rtt_ms / 1000
+    print(f"each start connects {1 + args.reconnects} times, {args.rtt_ms:g} ms per API call")
+
+    print("before: sync on every connect and every on_ready")
+    api = FakeCommandsAPI(rtt)
+    await measure("first start", api, make_bot(api), old_connect, args.reconnects)
+    await measure("restart, nothing changed", api, make_bot(api), old_connect, args.reconnects)
+    await measure("restart, one command changed", api, make_bot(api, changed=True), old_connect, args.reconnects)
+
+    print("after: hash-gated, once per process")
+    api = FakeCommandsAPI(rtt)
+    path = os.path.join(tempfile.mkdtemp(), "command_sync.db")
+    for label, changed in (("first start", False), ("restart, nothing changed", False),
+                           ("restart, one command changed", True), ("restart, stale command on Discord", True)):
+        if label.endswith("on Discord"):
+            api.scopes[None].append({"id": "1", "name": "stale", "type": 1, "description": "Removed command"})
+        sync = CommandSync(path)
+        bot = make_bot(api, changed)
+        await measure(label, api, bot, sync.sync, args.reconnects)
+        sync.close()
+        unmapped = [command.name for command in bot.pending_application_commands
+                    if bot._application_commands.get(command.id) is not command]
+        assert not unmapped, f"commands without an ID: {unmapped}"
+    assert all(entry["name"] != "stale" for entry in api.scopes[None]), "stale command still registered"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reconnects", type=int, default=5)
+    parser.add_argument("--rtt-ms", type=float, default=120)
+    args = parser.parse_args()
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp())
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
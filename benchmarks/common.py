@@ -0,0 +1,8 @@
+"""Helpers shared by the benchmark scripts."""
+
+from utils.stats import percentile
+
+
+def format_latency(latencies):
+    """Format p50/p99 of a list of second-based latencies in milliseconds."""
+    return f"p50={percentile(latencies, 50) * 1000:7.2f}ms p99={percentile(latencies, 99) * 1000:7.2f}ms"
@@ -0,0 +1,75 @@
+"""Simulate a burst of /puzzle calls right after the daily post goes out.
+
+Compares calling the upstream directly against the coalescing daily
+puzzle cache, using a fake Lichess fetch with configurable latency.
+
+Run from the repository root:
+
+    python -m benchmarks.daily_puzzle_burst --users 200 --latency 0.15
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import format_latency
+from utils.puzzle_cache import DailyPuzzleCache
+
+PAYLOAD = {"puzzle": {"id": "K69di", "rating": 1875, "plays": 12345, "solution": ["e2e4"]}}
+
+
+class FakeLichess:
+    """Counts upstream calls and answers after a fixed delay."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return PAYLOAD
+
+
+async def burst(get, users):
+    """Fire users concurrent calls and return their latencies."""
+    latencies = []
+
+    async def one():
+        start = time.perf_counter()
+        await get()
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(users)))
+    return latencies
+
+
+def report(name, latencies, upstream_calls):
+    print(f"{name:<12} upstream_calls={upstream_calls:<4} {format_latency(latencies)}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.15, help="fake Lichess latency (seconds)")
+    args = parser.parse_args()
+
+    direct = FakeLichess(args.latency)
+    report("uncached", await burst(direct.fetch, args.users), direct.calls)
+
+    upstream = FakeLichess(args.latency)
+    cache = DailyPuzzleCache(upstream.fetch, stale_timeout=0.25)
+    report("cold burst", await burst(cache.get, args.users), upstream.calls)
+    report("warm burst", await burst(cache.get, args.users), upstream.calls)
+
+    # Simulate the rollover with a slow upstream: callers get the stale puzzle
+    upstream.latency = cache.stale_timeout * 2
+    cache._entry = (cache._entry[0].replace(year=2000),) + cache._entry[1:]
+    report("slow+stale", await burst(cache.get, args.users), upstream.calls)
+    if cache._inflight:
+        await cache._inflight
+
+    print("cache stats:", cache.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+"""Minimal stand-ins for the Discord objects the cogs touch in benchmarks."""
+import time
+import asyncio
+import itertools
+
+_ids = itertools.count(1)
+
+
+class FakeChannel:
+    """Text channel that records sends and resolves an optional future on the first one."""
+
+    def __init__(self, name, latency=0.0, error=None):
+        self.id = next(_ids)
+        self.name = name
+        self.latency = latency
+        self.error = error
+        self.sent = None
+        self.messages = 0
+
+    async def send(self, content=None, embed=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error:
+            raise self.error
+        self.messages += 1
+        if self.sent and not self.sent.done():
+            self.sent.set_result(time.perf_counter())
+
+
+class FakeGuild:
+    def __init__(self, id, channels, name="Safari"):
+        self.id = id
+        self.name = name
+        self.channels = channels
+        for channel in channels:
+            channel.guild = self
+
+    def get_channel(self, channel_id):
+        return next((channel for channel in self.channels if channel.id == channel_id), None)
+
+
+class FakeBot:
+    """Just enough of a bot for the cogs and the API routes."""
+
+    def __init__(self, guilds):
+        self.guilds = guilds
+        self.cogs = {}
+
+    async def wait_until_ready(self):
+        pass
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
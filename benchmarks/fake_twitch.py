@@ -0,0 +1,254 @@
+"""A local stand-in for the Twitch APIs the bot uses.
+
+Serves the OAuth token endpoint, Helix /users, /streams and
+/eventsub/subscriptions, and delivers signed EventSub webhooks (including
+the callback verification challenge) to subscribed callbacks. Point the bot
+at it with TWITCH_AUTH_BASE=http://127.0.0.1:8081 and
+TWITCH_API_BASE=http://127.0.0.1:8081/helix, then flip a channel live with
+POST /fake/live/<login> (or /fake/offline/<login>).
+
+Run from the repository root:
+
+    python -m benchmarks.fake_twitch --port 8081
+"""
+import json
+import uuid
+import asyncio
+import argparse
+import time
+import itertools
+from collections import Counter
+from datetime import datetime, timezone
+
+from aiohttp import web, ClientSession
+
+from utils.twitch_eventsub import sign, MESSAGE_ID, MESSAGE_TIMESTAMP, MESSAGE_SIGNATURE, MESSAGE_TYPE
+
+
+def now_rfc3339():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f000Z")
+
+
+class FakeTwitch:
+    """In-memory Twitch: channels, live streams and EventSub subscriptions."""
+
+    def __init__(self, latency=0.0, token_lifetime=3600):
+        self.latency = latency
+        self.token_lifetime = token_lifetime
+        self.user_ids = {}
+        self.live = {}
+        self.subscriptions = {}
+        self.tokens = set()
+        self._ids = itertools.count(1000)
+        self._session = None
+        self._runner = None
+
+        # Requests per route, so callers can count upstream calls
+        self.requests = Counter()
+        self.deliveries = 0
+
+        # Helix token bucket, reported in the Ratelimit-* headers
+        self.ratelimit_limit = 800
+        self.ratelimit_remaining = 800
+        self.ratelimit_reset = int(time.time()) + 60
+
+    def user_id(self, login):
+        login = login.lower()
+        if login not in self.user_ids:
+            self.user_ids[login] = str(next(self._ids))
+        return self.user_ids[login]
+
+    @web.middleware
+    async def rate_limit(self, request, handler):
+        """Spend one point per Helix call and answer 429 once the bucket is empty."""
+        if not request.path.startswith("/helix"):
+            return await handler(request)
+        now = time.time()
+        if now >= self.ratelimit_reset:
+            self.ratelimit_remaining = self.ratelimit_limit
+            self.ratelimit_reset = int(now) + 60
+        token = request.headers.get("Authorization", "")
+        token = token[len("Bearer "):] if token.startswith("Bearer ") else token
+        if token not in self.tokens:
+            self.requests["unauthorized"] += 1
+            return web.json_response({"error": "Unauthorized", "message": "Invalid OAuth token"}, status=401)
+        if self.ratelimit_remaining <= 0:
+            self.requests["rate_limited"] += 1
+            response = web.json_response({"error": "Too Many Requests"}, status=429)
+        else:
+            self.ratelimit_remaining -= 1
+            response = await handler(request)
+        response.headers["Ratelimit-Limit"] = str(self.ratelimit_limit)
+        response.headers["Ratelimit-Remaining"] = str(self.ratelimit_remaining)
+        response.headers["Ratelimit-Reset"] = str(self.ratelimit_reset)
+        return response
+
+    def app(self):
+        app = web.Application(middlewares=[self.rate_limit])
+        app.add_routes([
+            web.post("/oauth2/token", self.token),
+            web.get("/helix/users", self.users),
+            web.get("/helix/streams", self.streams),
+            web.get("/helix/eventsub/subscriptions", self.list_subscriptions),
+            web.post("/helix/eventsub/subscriptions", self.create_subscription),
+            web.post("/fake/live/{login}", self.control_live),
+            web.post("/fake/offline/{login}", self.control_offline),
+        ])
+        return app
+
+    async def start(self, host="127.0.0.1", port=8081):
+        self._session = ClientSession()
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+        if self._session:
+            await self._session.close()
+
+    async def _count(self, name):
+        self.requests[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    # Twitch API
+
+    async def token(self, request):
+        await self._count("token")
+        token = uuid.uuid4().hex
+        self.tokens.add(token)
+        return web.json_response({"access_token": token, "expires_in": self.token_lifetime, "token_type": "bearer"})
+
+    def revoke_tokens(self):
+        """Invalidate every issued token, as Twitch does when a client secret is rotated."""
+        self.tokens.clear()
+
+    async def users(self, request):
+        await self._count("users")
+        logins = request.query.getall("login", [])
+        return web.json_response({"data": [{"id": self.user_id(login), "login": login.lower()} for login in logins]})
+
+    async def streams(self, request):
+        await self._count("streams")
+        logins = [login.lower() for login in request.query.getall("user_login", [])]
+        if len(logins) > 100:
+            return web.json_response({"error": "Bad Request", "message": "too many user_login values"}, status=400)
+        first = int(request.query.get("first", "20"))
+        streams = [self.live[login] for login in logins if login in self.live]
+        return web.json_response({"data": streams[:first]})
+
+    async def list_subscriptions(self, request):
+        await self._count("list_subscriptions")
+        return web.json_response({"data": [sub for sub, _ in self.subscriptions.values()]})
+
+    async def create_subscription(self, request):
+        await self._count("create_subscription")
+        body = await request.json()
+        sub = {
+            "id": str(uuid.uuid4()),
+            "status": "webhook_callback_verification_pending",
+            "type": body["type"],
+            "version": body.get("version", "1"),
+            "condition": body["condition"],
+            "transport": {"method": "webhook", "callback": body["transport"]["callback"]},
+            "created_at": now_rfc3339(),
+        }
+        self.subscriptions[sub["id"]] = (sub, body["transport"]["secret"])
+        asyncio.ensure_future(self._verify(sub["id"]))
+        return web.json_response({"data": [sub]}, status=202)
+
+    # Test controls
+
+    async def control_live(self, request):
+        await self.go_live(request.match_info["login"])
+        return web.json_response({"live": True})
+
+    async def control_offline(self, request):
+        await self.go_offline(request.match_info["login"])
+        return web.json_response({"live": False})
+
+    async def go_live(self, login, title="Chess adventures await!", duplicate=False):
+        """Mark a channel live and deliver stream.online (twice if duplicate, as a Twitch retry)."""
+        login = login.lower()
+        self.live[login] = {
+            "id": str(next(self._ids)),
+            "user_id": self.user_id(login),
+            "user_login": login,
+            "user_name": login,
+            "type": "live",
+            "title": title,
+            "game_name": "Chess",
+            "viewer_count": 42,
+            "started_at": now_rfc3339(),
+            "thumbnail_url": f"https://static-cdn.jtvnw.net/previews-ttv/live_user_{login}-{{width}}x{{height}}.jpg",
+        }
+        await self._notify("stream.online", login, {"id": self.live[login]["id"], "type": "live",
+                                                    "started_at": self.live[login]["started_at"]}, duplicate)
+
+    async def go_offline(self, login):
+        login = login.lower()
+        self.live.pop(login, None)
+        await self._notify("stream.offline", login, {})
+
+    # Webhook delivery
+
+    async def _notify(self, subscription_type, login, extra, duplicate=False):
+        broadcaster_id = self.user_id(login)
+        event = {"broadcaster_user_id": broadcaster_id, "broadcaster_user_login": login,
+                 "broadcaster_user_name": login, **extra}
+        for sub, secret in list(self.subscriptions.values()):
+            if (sub["type"] != subscription_type or sub["status"] != "enabled"
+                    or sub["condition"].get("broadcaster_user_id") != broadcaster_id):
+                continue
+            message_id = str(uuid.uuid4())
+            payload = {"subscription": sub, "event": event}
+            await self._deliver(sub, secret, "notification", payload, message_id)
+            if duplicate:
+                await self._deliver(sub, secret, "notification", payload, message_id)
+
+    async def _verify(self, subscription_id):
+        sub, secret = self.subscriptions[subscription_id]
+        challenge = uuid.uuid4().hex
+        status, text = await self._deliver(sub, secret, "webhook_callback_verification",
+                                           {"subscription": sub, "challenge": challenge})
+        sub["status"] = "enabled" if status == 200 and text == challenge else "webhook_callback_verification_failed"
+
+    async def _deliver(self, sub, secret, message_type, payload, message_id=None):
+        message_id = message_id or str(uuid.uuid4())
+        timestamp = now_rfc3339()
+        body = json.dumps(payload).encode()
+        headers = {
+            MESSAGE_ID: message_id,
+            MESSAGE_TIMESTAMP: timestamp,
+            MESSAGE_SIGNATURE: sign(secret, message_id, timestamp, body),
+            MESSAGE_TYPE: message_type,
+            "Content-Type": "application/json",
+        }
+        self.deliveries += 1
+        async with self._session.post(sub["transport"]["callback"], data=body, headers=headers) as response:
+            return response.status, await response.text()
+
+
+async def serve(args):
+    fake = FakeTwitch(latency=args.latency)
+    await fake.start(args.host, args.port)
+    print(f"Fake Twitch listening on http://{args.host}:{args.port}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="added latency per API call (seconds)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Burst benchmark: fresh aiohttp session per call vs the shared pooled client.
+
+Starts a local HTTP server that mimics a Lichess endpoint (with a small
+handshake-like delay on new connections) and fires bursts of concurrent
+requests through both strategies, reporting p50/p99 latency and
+connection reuse.
+
+Run from the repository root:
+
+    python -m benchmarks.http_pool_burst --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.common import format_latency
+from utils.http_client import HTTPClient
+
+PAYLOAD = {"puzzle": {"id": "K69di", "rating": 1875, "plays": 12345, "solution": ["e2e4"]}}
+
+
+async def start_server(port, connect_delay):
+    """Start a fake Lichess server; new connections pay connect_delay once."""
+    seen_transports = set()
+
+    async def daily(request):
+        transport = request.transport
+        if id(transport) not in seen_transports:
+            seen_transports.add(id(transport))
+            # Stand-in for the TCP+TLS handshake cost of a new connection
+            await asyncio.sleep(connect_delay)
+        return web.json_response(PAYLOAD)
+
+    app = web.Application()
+    app.router.add_get("/api/puzzle/daily", daily)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def run_burst(fetch, total, concurrency):
+    """Run total fetches with at most concurrency in flight and return latencies."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await fetch()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies
+
+
+def report(name, latencies):
+    print(f"{name:<22} {format_latency(latencies)}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--connect-delay", type=float, default=0.02,
+                        help="simulated handshake cost per new connection (seconds)")
+    args = parser.parse_args()
+
+    runner = await start_server(args.port, args.connect_delay)
+    url = f"http://127.0.0.1:{args.port}/api/puzzle/daily"
+
+    async def fresh_session_fetch():
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as response:
+                await response.json()
+
+    client = HTTPClient(limit_per_host=args.concurrency)
+
+    async def pooled_fetch():
+        async with client.get(url) as response:
+            await response.json()
+
+    try:
+        report("session per request", await run_burst(fresh_session_fetch, args.requests, args.concurrency))
+        report("shared pooled client", await run_burst(pooled_fetch, args.requests, args.concurrency))
+        stats = client.stats()
+        print(f"connections created={stats['connections_created']} "
+              f"reused={stats['connections_reused']} reuse_ratio={stats['reuse_ratio']:.2%}")
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
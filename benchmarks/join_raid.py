@@ -0,0 +1,76 @@
+"""Replay a join raid against the Welcome and Logging cogs.
+
+Members join at a fixed rate into a guild with fake #welcome and
+#mod-logs channels. Without aggregation each join costs a welcome and a
+mod-log send; once the join rate crosses the raid threshold both cogs
+batch their messages per interval instead.
+
+Run from the repository root:
+
+    python -m benchmarks.join_raid --joins 150 --rate 600
+"""
+import os
+import time
+import asyncio
+import argparse
+import itertools
+from datetime import datetime, timezone
+
+from benchmarks.fake_discord import FakeChannel, FakeGuild, FakeBot
+
+_member_ids = itertools.count(10**17)
+
+
+class FakeMember:
+    def __init__(self, guild):
+        self.id = next(_member_ids)
+        self.guild = guild
+        self.name = f"raider{self.id % 10000}"
+        self.discriminator = "0"
+        self.mention = f"<@{self.id}>"
+        self.created_at = datetime.now(timezone.utc)
+        self.joined_at = self.created_at
+        self.display_avatar = type("Avatar", (), {"url": "https://example.invalid/a.png"})()
+
+    def __str__(self):
+        return self.name
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--joins", type=int, default=150)
+    parser.add_argument("--rate", type=float, default=600, help="joins per minute")
+    parser.add_argument("--threshold", default="10")
+    parser.add_argument("--interval", default="5", help="seconds between aggregated messages")
+    args = parser.parse_args()
+
+    os.environ.setdefault("CHANNEL_INDEX_PATH", "/tmp/join_raid_channels.db")
+    os.environ["RAID_JOIN_THRESHOLD"] = args.threshold
+    os.environ["RAID_AGGREGATE_INTERVAL"] = args.interval
+    os.environ["MODLOG_MAX_DELAY"] = "0.5"
+    from events.welcome import Welcome
+    from events.logging import Logging
+
+    welcome, mod_logs = FakeChannel("welcome"), FakeChannel("mod-logs")
+    guild = FakeGuild(1, [welcome, mod_logs])
+    bot = FakeBot([guild])
+    welcome_cog, logging_cog = Welcome(bot), Logging(bot)
+
+    started = time.perf_counter()
+    for _ in range(args.joins):
+        member = FakeMember(guild)
+        await welcome_cog.on_member_join(member)
+        await logging_cog.on_member_join(member)
+        await asyncio.sleep(60 / args.rate)
+    await asyncio.sleep(float(args.interval) + 1)
+
+    stats = logging_cog.stats()
+    print(f"{args.joins} joins at {args.rate:g}/min over {time.perf_counter() - started:.1f}s")
+    print(f"one send per event would be {args.joins * 2} sends")
+    print(f"welcome messages={welcome.messages} mod-log messages={mod_logs.messages} "
+          f"(mod-log entries={stats['writer']['embeds_sent']})")
+    print(f"raid stats: {stats['raids']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
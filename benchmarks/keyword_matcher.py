@@ -0,0 +1,88 @@
+"""Messages per second for the reaction keyword matcher on a chat-like corpus.
+
+Compares the old per-keyword regexes (one scan per trigger) with the
+single combined matcher, and counts how many messages still need a
+command context built once the prefix check runs first.
+
+Run from the repository root:
+
+    python -m benchmarks.keyword_matcher --messages 200000
+"""
+import re
+import time
+import random
+import argparse
+
+from utils.keyword_matcher import KeywordMatcher, DEFAULT_TRIGGERS
+
+CHAT_WORDS = (
+    "lol", "gg", "wp", "that", "was", "so", "close", "i", "think", "you", "should", "have", "played", "e4",
+    "nf3", "the", "opening", "is", "london", "system", "again", "why", "did", "he", "resign", "time", "pressure",
+    "stream", "tonight", "anyone", "up", "for", "a", "game", "blitz", "bullet", "rapid", "elo", "hikaru", "magnus",
+    "what", "do", "we", "think", "about", "this", "line", "engine", "says", "+2", "lmao", "no", "way", "bro",
+    "kingside", "castle", "queenside", "knight", "bishop", "rook", "pawn", "endgame", "draw", "stalemate",
+)
+TRIGGER_WORDS = tuple(DEFAULT_TRIGGERS)
+
+
+def make_corpus(count, trigger_rate, command_rate, rng):
+    messages = []
+    for _ in range(count):
+        words = rng.choices(CHAT_WORDS, k=rng.choice((1, 2, 3, 5, 8, 13, 21)))
+        if rng.random() < trigger_rate:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(TRIGGER_WORDS).capitalize())
+        if rng.random() < 0.05:
+            words.append("https://lichess.org/" + "".join(rng.choices("abcdefghXYZ0123456789", k=8)))
+        message = " ".join(words)
+        if rng.random() < command_rate:
+            message = "!" + rng.choice(("puzzle", "chessfact", "socials", "help")) + " " + message
+        messages.append(message)
+    return messages
+
+
+def per_keyword(messages):
+    patterns = {keyword: re.compile(rf"\b{keyword}\b", re.IGNORECASE) for keyword in DEFAULT_TRIGGERS}
+    reactions = 0
+    for content in messages:
+        for keyword, pattern in patterns.items():
+            if pattern.search(content):
+                reactions += 1
+    return reactions
+
+
+def combined(messages):
+    matcher = KeywordMatcher(DEFAULT_TRIGGERS)
+    reactions = 0
+    for content in messages:
+        reactions += len(matcher.match(content))
+    return reactions
+
+
+def run(label, func, messages):
+    started = time.perf_counter()
+    reactions = func(messages)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22} {len(messages) / elapsed:12,.0f} msg/s  reactions={reactions}")
+    return reactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--trigger-rate", type=float, default=0.1, help="share of messages with a trigger word")
+    parser.add_argument("--command-rate", type=float, default=0.02, help="share of messages that are ! commands")
+    args = parser.parse_args()
+
+    messages = make_corpus(args.messages, args.trigger_rate, args.command_rate, random.Random(1))
+    print(f"{len(messages)} messages, avg {sum(map(len, messages)) / len(messages):.0f} chars")
+    old = run("per-keyword regexes", per_keyword, messages)
+    new = run("combined matcher", combined, messages)
+    assert old == new, "matchers disagree"
+
+    matcher = KeywordMatcher(DEFAULT_TRIGGERS)
+    contexts = sum(1 for content in messages if matcher.match(content) and content.startswith("!"))
+    print(f"command contexts built: before {len(messages)}, now {contexts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Deliver a live announcement to many guilds, serially and with the fan-out.
+
+Each fake guild's channel answers after a random latency, and a small
+fraction fail, to check that one bad guild does not stop the others. The
+concurrent runs should finish in about the slowest single send once the
+concurrency covers every guild.
+
+Run from the repository root:
+
+    python -m benchmarks.live_fanout --guilds 500
+"""
+import random
+import asyncio
+import argparse
+
+from benchmarks.fake_discord import FakeChannel, FakeGuild
+from utils.fanout import FanOut
+
+
+def make_targets(args):
+    targets = []
+    for guild_id in range(args.guilds):
+        error = RuntimeError("Missing Permissions") if random.random() < args.failure_rate else None
+        channel = FakeChannel("live-now", latency=random.uniform(args.min_latency, args.max_latency), error=error)
+        targets.append((FakeGuild(guild_id, [channel], name=f"guild-{guild_id}"), channel))
+    return targets
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guilds", type=int, default=500)
+    parser.add_argument("--min-latency", type=float, default=0.05)
+    parser.add_argument("--max-latency", type=float, default=0.25)
+    parser.add_argument("--failure-rate", type=float, default=0.01)
+    parser.add_argument("--concurrency", default="10,50,500", help="comma-separated fan-out concurrency levels")
+    args = parser.parse_args()
+
+    targets = make_targets(args)
+    slowest = max(channel.latency for _, channel in targets)
+    print(f"{args.guilds} guilds, slowest single send {slowest * 1000:.0f}ms")
+    # A serial loop waits for every send in turn
+    print(f"serial          wall={sum(channel.latency for _, channel in targets) * 1000:8.0f}ms")
+
+    for concurrency in (int(value) for value in args.concurrency.split(",")):
+        report = await FanOut(concurrency=concurrency).send(targets, content="live", embed=None)
+        summary = report.summary()
+        print(f"fan-out {concurrency:<7} wall={summary['wall_time_ms']:8.0f}ms "
+              f"delivered={summary['delivered']}/{summary['targets']} "
+              f"p50={summary['latency_p50_ms']:.0f}ms max={summary['latency_max_ms']:.0f}ms")
+    print(f"failed guilds: {sorted(summary['failed'])}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+"""Event loop time spent logging, with direct handlers and with the queue pipeline.
+
+Runs a burst of simulated gateway events on an asyncio loop, each logging
+a couple of INFO lines and a disabled DEBUG line with a puzzle-sized
+payload, once with the old basicConfig setup (file and console handlers
+called on the loop) and once through utils.log_pipeline. The console is
+a sink that stalls now and then, like a container log pipe under
+backpressure. Reports time per event on the loop and the worst loop lag
+a 1 ms ticker saw.
+
+Run from the repository root:
+
+    python -m benchmarks.logging_stall --events 20000
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+
+from benchmarks.common import percentile
+from utils.log_pipeline import LogPipeline, TEXT_FORMAT
+
+PAYLOAD = {
+    "game": {"id": "abcd1234", "pgn": " ".join(f"{n}. e4 e5" for n in range(1, 40)), "players": ["a", "b"]},
+    "puzzle": {"id": "XyZ12", "rating": 1834, "solution": ["e2e4", "e7e5", "g1f3"] * 5, "themes": ["fork"] * 4},
+}
+
+
+class StallingSink:
+    """A console stream whose write blocks for ``stall`` seconds every ``every`` writes."""
+
+    def __init__(self, every, stall):
+        self.every = every
+        self.stall = stall
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        if self.every and self.writes % self.every == 0:
+            time.sleep(self.stall)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+async def run_events(count, lazy):
+    logger = logging.getLogger("safari_buddy.bench")
+    durations = []
+    lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal lag
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - started - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    for i in range(count):
+        started = time.perf_counter()
+        if lazy:
+            logger.debug("Daily puzzle response: %s", PAYLOAD)
+            logger.info("New grandmaster joined: %s#%s (%s)", "member", "0001", i)
+            logger.info("Logged event %s", i)
+        else:
+            logger.debug(f"Daily puzzle response: {PAYLOAD}")
+            logger.info(f"New grandmaster joined: member#0001 ({i})")
+            logger.info(f"Logged event {i}")
+        durations.append(time.perf_counter() - started)
+        if i % 50 == 0:
+            await asyncio.sleep(0)
+    done = True
+    await tick
+    return durations, lag
+
+
+def report(label, durations, lag, elapsed):
+    print(f"{label:<24} per event p50 {percentile(durations, 50) * 1e6:6.1f} us  "
+          f"p99 {percentile(durations, 99) * 1e6:8.1f} us  max {max(durations) * 1000:6.1f} ms  "
+          f"loop lag max {lag * 1000:6.1f} ms  total on loop {sum(durations) * 1000:7.1f} ms  ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--stall-every", type=int, default=2000, help="console writes between stalls (0 = never)")
+    parser.add_argument("--stall-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    stderr = sys.stderr
+
+    # Before: basicConfig with a FileHandler and a StreamHandler, called on the loop
+    reset_root()
+    sink = StallingSink(args.stall_every, args.stall_ms / 1000)
+    formatter = logging.Formatter(TEXT_FORMAT)
+    for handler in (logging.FileHandler(os.path.join(directory, "direct.log")), logging.StreamHandler(sink)):
+        handler.setFormatter(formatter)
+        logging.getLogger().addHandler(handler)
+    logging.getLogger().setLevel(logging.INFO)
+    started = time.perf_counter()
+    durations, lag = asyncio.run(run_events(args.events, lazy=False))
+    report("direct handlers", durations, lag, time.perf_counter() - started)
+    reset_root()
+
+    # After: queue pipeline with deferred formatting
+    sys.stderr = StallingSink(args.stall_every, args.stall_ms / 1000)
+    try:
+        pipeline = LogPipeline(path=os.path.join(directory, "pipeline.log"), queue_size=args.events * 3).start()
+    finally:
+        sys.stderr = stderr
+    started = time.perf_counter()
+    durations, lag = asyncio.run(run_events(args.events, lazy=True))
+    on_loop = time.perf_counter() - started
+    pipeline.stop()
+    report("queue pipeline", durations, lag, on_loop)
+    print(f"writer thread drained in {time.perf_counter() - started - on_loop:.2f}s after the burst")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Memory and speed of the audit message cache at a million messages.
+
+Compares the compact slot cache with an OrderedDict of CachedMessage
+tuples (which is already far smaller than py-cord keeping full Message
+objects), then fills a byte-budgeted cache to show eviction keeping it
+at its budget.
+
+Run from the repository root:
+
+    python -m benchmarks.message_cache_memory --messages 1000000
+"""
+import gc
+import time
+import random
+import argparse
+import tracemalloc
+from collections import OrderedDict
+
+from utils.message_cache import MessageCache, CachedMessage
+
+WORDS = ("e4", "gg", "nice", "blunder", "the", "knight", "fork", "lol", "queen", "sac", "mate", "in", "two", "?!")
+# Snowflakes around 2026
+FIRST_ID = 1_400_000_000_000_000_000
+
+
+def make_messages(args):
+    rng = random.Random(1)
+    authors = [(rng.randrange(10**17, 10**18), f"user{i}") for i in range(args.authors)]
+    for i in range(args.messages):
+        author_id, author_name = rng.choice(authors)
+        words = rng.randint(args.min_words, args.max_words)
+        attachments = ("board.png",) if rng.random() < 0.02 else ()
+        yield CachedMessage(FIRST_ID + i * 4096, i % args.guilds, rng.randrange(args.guilds * 10),
+                            author_id, author_name, " ".join(rng.choices(WORDS, k=words)), attachments)
+
+
+def measure(label, fill, args):
+    """Time a fill, then trace everything the filled cache keeps alive."""
+    messages = list(make_messages(args))
+    text_bytes = sum(len(message.content.encode()) for message in messages)
+    started = time.perf_counter()
+    fill(messages)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    # Built inside the trace so tuples and strings the cache keeps are counted
+    messages = list(make_messages(args))
+    cache = fill(messages)
+    del messages
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{label:<28} {used / 2**20:8.1f} MiB  {used / args.messages:6.0f} B/msg "
+          f"(text {text_bytes / args.messages:.0f} B/msg)  fill {elapsed / args.messages * 1e6:5.2f} us/msg")
+    return cache
+
+
+def fill_ordered_dict(messages):
+    cache = OrderedDict()
+    for message in messages:
+        cache[message.id] = message
+    return cache
+
+
+def fill_slot_cache(budget):
+    def fill(messages):
+        cache = MessageCache(guild_budget=budget)
+        for message in messages:
+            cache.add(message)
+        return cache
+    return fill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--authors", type=int, default=5000)
+    parser.add_argument("--min-words", type=int, default=2)
+    parser.add_argument("--max-words", type=int, default=20)
+    parser.add_argument("--budget-mib", type=float, default=1.0, help="per-guild budget for the eviction run")
+    args = parser.parse_args()
+
+    print(f"{args.messages} messages across {args.guilds} guilds")
+    measure("OrderedDict of tuples", fill_ordered_dict, args)
+    cache = measure("slot cache (no eviction)", fill_slot_cache(float("inf")), args)
+
+    sample = random.Random(2).sample(list(make_messages(args)), 100_000)
+    started = time.perf_counter()
+    for message in sample:
+        cache.get(message.guild_id, message.id)
+    print(f"{'slot cache lookups':<28} {(time.perf_counter() - started) / len(sample) * 1e6:8.2f} us/lookup")
+
+    budget = int(args.budget_mib * 2**20)
+    cache = measure(f"slot cache ({args.budget_mib:g} MiB/guild)", fill_slot_cache(budget), args)
+    stats = cache.stats()
+    print(f"{'':<28} kept={stats['messages']} evicted={stats['evictions']} "
+          f"accounted={stats['bytes'] / 2**20:.1f} MiB (budget {budget * args.guilds / 2**20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Cost of recording a metric, per call, on the hot path.
+
+Times counter increments and histogram observations with the per-thread
+cells used by utils.metrics, next to a counter guarded by a lock, then
+hammers one counter from several threads and checks no increment is lost.
+
+Run from the repository root:
+
+    python -m benchmarks.metrics_overhead --ops 1000000
+"""
+import time
+import argparse
+import threading
+
+from utils.metrics import Registry
+
+
+class LockedCounter:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+def per_call(label, func, ops):
+    started = time.perf_counter()
+    for _ in range(ops):
+        func()
+    elapsed = time.perf_counter() - started
+    # Subtract the cost of the loop itself
+    started = time.perf_counter()
+    for _ in range(ops):
+        pass
+    elapsed -= time.perf_counter() - started
+    print(f"{label:<34} {elapsed / ops * 1e9:8.0f} ns/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    registry = Registry()
+    counter = registry.counter("bench_events", "Events", ("event",))
+    histogram = registry.histogram("bench_duration_seconds", "Durations", ("event",))
+    child = counter.labels("on_message")
+    histogram_child = histogram.labels("on_message")
+    locked = LockedCounter()
+
+    per_call("locked counter inc", locked.inc, args.ops)
+    per_call("counter inc (cached child)", child.inc, args.ops)
+    per_call("counter labels().inc", lambda: counter.labels("on_message").inc(), args.ops)
+    per_call("histogram observe (cached child)", lambda: histogram_child.observe(0.0042), args.ops)
+    per_call("histogram labels().observe", lambda: histogram.labels("on_message").observe(0.0042), args.ops)
+
+    shared = registry.counter("bench_threaded", "Threaded increments")
+    per_thread = args.ops // args.threads
+
+    def work():
+        for _ in range(per_thread):
+            shared.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    total = shared._default.value()
+    print(f"{args.threads} threads: {total} of {per_thread * args.threads} increments counted "
+          f"in {elapsed:.2f}s")
+    assert total == per_thread * args.threads, "lost increments"
+
+    started = time.perf_counter()
+    text = registry.render()
+    print(f"scrape: {len(text)} bytes in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
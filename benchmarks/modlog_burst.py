@@ -0,0 +1,125 @@
+"""Log a burst of mod-log events, one send each and through the batching writer.
+
+The fake channel enforces a per-channel rate limit the way Discord does
+(a fixed number of messages per window; later sends wait for the next
+window), so one send per event falls behind by events / rate seconds,
+while the writer packs ten embeds per message. Lag is measured from each
+event to the end of the send that carried it.
+
+Run from the repository root:
+
+    python -m benchmarks.modlog_burst --events 200
+"""
+import time
+import asyncio
+import argparse
+
+import discord
+
+from benchmarks.common import format_latency
+from benchmarks.fake_discord import FakeChannel, FakeGuild
+from utils.modlog import ModLogWriter, DROP_OLDEST, SPILL
+
+
+class RateLimitedChannel(FakeChannel):
+    """Channel that lets ``rate`` messages through per ``window`` seconds."""
+
+    def __init__(self, name, rate, window, latency):
+        super().__init__(name, latency=latency)
+        self.rate = rate
+        self.window = window
+        self.sends = []
+        self.lags = []
+        # py-cord sends to one route in order and waits out its 429s
+        self._route = asyncio.Lock()
+
+    async def send(self, content=None, embed=None, embeds=None, **kwargs):
+        async with self._route:
+            now = time.perf_counter()
+            recent = [sent for sent in self.sends if now - sent < self.window]
+            if len(recent) >= self.rate:
+                await asyncio.sleep(self.window - (now - recent[-self.rate]))
+            self.sends = recent[-self.rate:] + [time.perf_counter()]
+        await super().send(content, embed, **kwargs)
+        done = time.perf_counter()
+        for logged in embeds or [embed]:
+            self.lags.append(done - CREATED[id(logged)])
+
+
+# id(embed) -> time the event happened
+CREATED = {}
+
+
+def make_embed(i):
+    embed = discord.Embed(title="Member Joined", description=f"<@{i}> joined the server",
+                          timestamp=discord.utils.utcnow())
+    embed.add_field(name="ID", value=str(i), inline=True)
+    CREATED[id(embed)] = time.perf_counter()
+    return embed
+
+
+def new_channel(args):
+    channel = RateLimitedChannel("mod-logs", args.rate, args.window, args.latency)
+    FakeGuild(1, [channel])
+    return channel
+
+
+async def burst(args, log):
+    for i in range(args.events):
+        log(make_embed(i))
+        await asyncio.sleep(args.interval)
+
+
+async def run_direct(args):
+    channel = new_channel(args)
+    tasks = []
+    await burst(args, lambda embed: tasks.append(asyncio.ensure_future(channel.send(embed=embed))))
+    await asyncio.gather(*tasks)
+    return channel, {}
+
+
+async def run_writer(args, overflow):
+    channel = new_channel(args)
+    writer = ModLogWriter(max_delay=args.max_delay, max_queue=args.max_queue, overflow=overflow,
+                          spill_dir=args.spill_dir)
+    await burst(args, lambda embed: writer.enqueue(channel, embed))
+    while writer.stats()["queue_depth"] or writer.stats()["spilled_pending"]:
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(args.latency + 0.05)
+    writer.close()
+    return channel, writer.stats()
+
+
+def report(label, started, channel, stats):
+    print(f"{label:<22} messages={channel.messages:4} logged={len(channel.lags):4} "
+          f"wall={(time.perf_counter() - started):6.1f}s lag {format_latency(channel.lags)} "
+          f"max={max(channel.lags, default=0):6.2f}s")
+    if stats:
+        print(f"{'':<22} max_depth={stats['max_depth']} dropped={stats['dropped']} spilled={stats['spilled']} "
+              f"flush_p99={stats['flush_latency_p99_ms']:.0f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.002, help="seconds between events")
+    parser.add_argument("--rate", type=int, default=10, help="messages allowed per window")
+    parser.add_argument("--window", type=float, default=1.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-delay", type=float, default=1.0)
+    parser.add_argument("--max-queue", type=int, default=100)
+    parser.add_argument("--spill-dir", default="/tmp/modlog_spill")
+    parser.add_argument("--skip-direct", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{args.events} events, channel limit {args.rate} messages per {args.window}s")
+    if not args.skip_direct:
+        started = time.perf_counter()
+        report("one send per event", started, *await run_direct(args))
+    for overflow in (DROP_OLDEST, SPILL):
+        started = time.perf_counter()
+        report(f"writer ({overflow})", started, *await run_writer(args, overflow))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
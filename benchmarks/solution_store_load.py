@@ -0,0 +1,99 @@
+"""Load test the puzzle solution store with many tracked messages.
+
+Tracks --messages solutions (write-behind to a temporary SQLite file), then
+reports the memory held by the store and lookup latency for memory hits,
+disk hits (messages evicted from memory, first and repeated), misses
+inside the tracked range (first and repeated), misses on messages older
+than any puzzle, and after a reopen.
+
+Run from the repository root:
+
+    python -m benchmarks.solution_store_load --messages 100000
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+
+from benchmarks.common import format_latency
+from utils.solution_store import SolutionStore
+
+SOLUTION = ("e2e4", "e7e5", "g1f3", "b8c6", "f1b5", "a7a6")
+FIRST_MESSAGE_ID = 1100000000000000000
+
+
+async def timed_lookups(store, message_ids):
+    latencies = []
+    for message_id in message_ids:
+        start = time.perf_counter()
+        await store.get(message_id)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run(args, path):
+    message_ids = [FIRST_MESSAGE_ID + i * 4096 for i in range(args.messages)]
+    puzzle_ids = [f"p{i:05d}" for i in range(args.messages)]
+
+    tracemalloc.start()
+    store = SolutionStore(path, memory_size=args.memory_size, flush_interval=3600)
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    start = time.perf_counter()
+    for message_id, puzzle_id in zip(message_ids, puzzle_ids):
+        store.put(message_id, puzzle_id, SOLUTION)
+    put_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    written = await store.flush()
+    flush_elapsed = time.perf_counter() - start
+
+    held = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    print(f"tracked {args.messages} messages, memory tier {len(store._memory)}/{args.memory_size}")
+    print(f"put           {put_elapsed / args.messages * 1e6:7.2f}µs/message")
+    print(f"flush         {written} rows in {flush_elapsed * 1000:.0f}ms")
+    print(f"memory held   {held / 1024 / 1024:.1f} MiB ({held / max(1, len(store._memory)):.0f} bytes/cached entry)")
+
+    recent = random.sample(message_ids[-args.memory_size:], min(args.lookups, args.memory_size))
+    older = random.sample(message_ids[:-args.memory_size], min(args.lookups, args.messages - args.memory_size))
+    unknown = [message_id + 1 for message_id in random.sample(message_ids, args.lookups)]
+
+    print(f"memory hits   {format_latency(await timed_lookups(store, recent))}")
+    if older:
+        print(f"disk hits     {format_latency(await timed_lookups(store, older))}")
+        print(f"disk again    {format_latency(await timed_lookups(store, older))}")
+    print(f"misses        {format_latency(await timed_lookups(store, unknown))}")
+    print(f"misses again  {format_latency(await timed_lookups(store, unknown))}")
+    older_messages = [FIRST_MESSAGE_ID - 1 - i for i in range(args.lookups)]
+    print(f"before range  {format_latency(await timed_lookups(store, older_messages))}")
+    print(f"disk misses   {store.disk_misses}")
+    store.close()
+
+    # A restarted bot should answer from disk straight away
+    store = SolutionStore(path, memory_size=args.memory_size)
+    start = time.perf_counter()
+    store.warm_up()
+    print(f"warm up       {(time.perf_counter() - start) * 1000:.0f}ms")
+    print(f"after reopen  {format_latency(await timed_lookups(store, random.sample(message_ids, args.lookups)))}")
+    print("store stats:", store.stats())
+    store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--memory-size", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(args, os.path.join(directory, "solutions.db")))
+
+
+if __name__ == "__main__":
+    main()
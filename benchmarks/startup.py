@@ -0,0 +1,86 @@
+"""Cold start time, from process spawn until every cog is loaded.
+
+Each run is a fresh interpreter that builds the bot and loads its
+extensions the way main.py does, without connecting to Discord. Compares
+loading every extension eagerly (the old loop, which always imported the
+API) with the feature-gated loader at the default settings, and prints
+the loader's per-extension breakdown.
+
+Run from the repository root:
+
+    python -m benchmarks.startup --runs 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+CHILD = """
+import os, sys, json, time
+started = time.perf_counter()
+import asyncio
+import discord
+from discord.ext import commands
+from dotenv import load_dotenv
+load_dotenv()
+imported = time.perf_counter()
+
+async def load():
+    # Cogs start tasks while loading, so load inside the loop like main.py
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+    if sys.argv[1] == "eager":
+        for package in ("commands", "events"):
+            for filename in os.listdir(package):
+                if filename.endswith(".py"):
+                    bot.load_extension(f"{package}.{filename[:-3]}")
+        bot.load_extension("utils.api")
+        return {}
+    from utils.startup import ExtensionLoader
+    loader = ExtensionLoader.from_env(bot)
+    loader.load_all()
+    return loader.stats()
+
+stats = asyncio.run(load())
+print(json.dumps({"discord_import": imported - started, "loaded": time.perf_counter() - started,
+                  "fastapi": "fastapi" in sys.modules, "extensions": stats}))
+os._exit(0)
+"""
+
+
+def run(mode, env):
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD, mode], env=env, capture_output=True, text=True, check=True)
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    result["wall"] = time.perf_counter() - started
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATA_DIR=tempfile.mkdtemp(), PYTHONPATH=os.getcwd(), API_ENABLED="false")
+    env.pop("TWITCH_CLIENT_ID", None)
+    # Warm the page cache and bytecode so every mode starts equally warm
+    run("eager", env)
+    run("gated", env)
+
+    for mode, label in (("eager", "all extensions eager"), ("gated", "feature-gated loader")):
+        results = [run(mode, env) for _ in range(args.runs)]
+        wall = statistics.median(r["wall"] for r in results)
+        discord_import = statistics.median(r["discord_import"] for r in results)
+        loaded = statistics.median(r["loaded"] for r in results)
+        print(f"{label:<22} spawn to loaded {wall * 1000:6.0f} ms  (discord import {discord_import * 1000:4.0f} ms, "
+              f"extensions {(loaded - discord_import) * 1000:4.0f} ms, fastapi imported: {results[-1]['fastapi']})")
+    print()
+    for name, timing in results[-1]["extensions"].items():
+        print(f"  {name:<20} {timing['status']:<9} import {timing['import_ms']:6.1f} ms  setup {timing['setup_ms']:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
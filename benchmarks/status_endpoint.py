@@ -0,0 +1,85 @@
+"""Requests per second for GET /status, full responses and 304 revalidations.
+
+Serves the real FastAPI app with uvicorn on the local loop and hits
+/status with keep-alive connections, once without and once with
+If-None-Match, then times the snapshot lookup itself.
+
+Run from the repository root:
+
+    python -m benchmarks.status_endpoint --requests 5000
+"""
+import time
+import asyncio
+import argparse
+
+import aiohttp
+import uvicorn
+
+from benchmarks.fake_discord import FakeBot, FakeGuild
+from utils import api
+from utils.status import get_status_snapshot
+
+
+class StatusBot(FakeBot):
+    latency = 0.042
+    cached_messages = ()
+    users = ()
+
+
+async def hammer(session, url, count, concurrency, headers=None):
+    statuses = {}
+
+    async def worker(n):
+        for _ in range(n):
+            async with session.get(url, headers=headers) as response:
+                await response.read()
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(count // concurrency) for _ in range(concurrency)))
+    return count / (time.perf_counter() - started), statuses
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    bot = StatusBot([FakeGuild(i, [], name=f"guild-{i}") for i in range(100)])
+    api.BOT_INSTANCE = bot
+    api.API_KEY = ""
+    snapshot = get_status_snapshot(bot)
+    # Kept current by events, as the StatusTracker cog does
+    snapshot.tracked = True
+    snapshot.set_shard(None, "ready")
+    snapshot.refresh()
+
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=args.port, log_level="error"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    url = f"http://127.0.0.1:{args.port}/status"
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            etag = response.headers["ETag"]
+            print(f"body: {await response.text()}")
+        rate, statuses = await hammer(session, url, args.requests, args.concurrency)
+        print(f"full responses   {rate:8.0f} req/s  {statuses}")
+        rate, statuses = await hammer(session, url, args.requests, args.concurrency, {"If-None-Match": etag})
+        print(f"If-None-Match    {rate:8.0f} req/s  {statuses}")
+
+    started = time.perf_counter()
+    for _ in range(100_000):
+        snapshot.matches(etag)
+    print(f"snapshot check   {(time.perf_counter() - started) / 100_000 * 1e6:8.2f} us")
+    print(f"snapshot stats: {snapshot.stats()}")
+
+    server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
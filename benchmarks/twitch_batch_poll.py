@@ -0,0 +1,103 @@
+"""Compare per-channel and batched Helix polling for a growing watchlist.
+
+Runs TwitchNotifier.poll_streams against the local fake Twitch for
+watchlists of increasing size, with a fraction of the channels live, and
+counts the /streams requests made. The batched poll should need
+ceil(N/100) requests; the per-channel baseline needs N.
+
+Run from the repository root:
+
+    python -m benchmarks.twitch_batch_poll --sizes 1,10,100,250,1000 --latency 0.02
+"""
+import os
+import math
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+from benchmarks.fake_discord import FakeChannel, FakeGuild, FakeBot
+from benchmarks.fake_twitch import FakeTwitch
+from utils.http_client import get_http_client
+
+CHANNEL = "chesssafari_"
+
+
+async def measure(fake, poll):
+    """Run one poll and return (streams requests, seconds)."""
+    before = fake.requests["streams"]
+    start = time.perf_counter()
+    await poll()
+    return fake.requests["streams"] - before, time.perf_counter() - start
+
+
+async def run(args, directory):
+    from events.twitch import TwitchNotifier
+
+    fake = FakeTwitch(latency=args.latency)
+    await fake.start(port=args.twitch_port)
+    channel = FakeChannel("live-now")
+    bot = FakeBot([FakeGuild(1, [channel])])
+    # Hold the shared client so it stays open while cogs come and go
+    get_http_client(bot).acquire()
+
+    print(f"{'channels':>8} {'live':>5} {'expected':>8} {'batched':>8} {'time':>9} {'per-channel':>11} {'time':>9}")
+    try:
+        for size in args.sizes:
+            os.environ["TWITCH_WATCHLIST_PATH"] = os.path.join(directory, f"twitch-{size}.db")
+            cog = TwitchNotifier(bot)
+            cog.check_twitch_stream.cancel()
+            logins = [CHANNEL] + [f"costreamer_{i:05d}" for i in range(size - 1)]
+            for login in logins[1:]:
+                cog.watchlist.add(1, login)
+
+            fake.live.clear()
+            live = random.sample(logins, max(1, int(size * args.live_fraction)))
+            for login in live:
+                await fake.go_live(login)
+
+            batched, batched_time = await measure(fake, cog.poll_streams)
+            announced = channel.messages
+            assert sorted(cog.live_streams) == sorted(live), "batched poll missed a live channel"
+
+            async def per_channel():
+                for login in logins:
+                    await cog.fetch_live_streams([login])
+
+            single, single_time = await measure(fake, per_channel)
+            print(f"{size:>8} {len(live):>5} {math.ceil(size / 100):>8} {batched:>8} {batched_time * 1000:>7.1f}ms "
+                  f"{single:>11} {single_time * 1000:>7.1f}ms")
+
+            cog.cog_unload()
+            channel.messages = 0
+        print(f"announcements sent in the last run: {announced}")
+        print(f"requests refused by the Helix rate limit: {fake.requests['rate_limited']}")
+    finally:
+        await bot.http_client.close()
+        await fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,10,100,250,1000", help="comma-separated watchlist sizes")
+    parser.add_argument("--live-fraction", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=0.02, help="fake Helix latency per request (seconds)")
+    parser.add_argument("--twitch-port", type=int, default=8081)
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+
+    os.environ.update({
+        "TWITCH_CLIENT_ID": "fake-client",
+        "TWITCH_CLIENT_SECRET": "fake-secret",
+        "TWITCH_CHANNEL": CHANNEL,
+        "TWITCH_AUTH_BASE": f"http://127.0.0.1:{args.twitch_port}",
+        "TWITCH_API_BASE": f"http://127.0.0.1:{args.twitch_port}/helix",
+        "TWITCH_EVENTSUB_CALLBACK": "",
+    })
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(args, directory))
+
+
+if __name__ == "__main__":
+    main()
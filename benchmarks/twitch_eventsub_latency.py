@@ -0,0 +1,115 @@
+"""Measure go-live notification latency with EventSub against polling.
+
+Runs the real TwitchNotifier cog and the FastAPI app against the local fake
+Twitch (benchmarks/fake_twitch.py). Each trial flips the channel live and
+times how long it takes until the announcement reaches the (fake) Discord
+channel, first via EventSub webhooks and then with EventSub disabled,
+where the poll loop has to notice the change.
+
+Run from the repository root:
+
+    python -m benchmarks.twitch_eventsub_latency --trials 20 --poll-interval 2
+"""
+import os
+import time
+import tempfile
+import random
+import asyncio
+import argparse
+
+import uvicorn
+
+from benchmarks.common import format_latency
+from benchmarks.fake_discord import FakeChannel, FakeGuild, FakeBot
+from benchmarks.fake_twitch import FakeTwitch
+
+CHANNEL = "chesssafari_"
+
+
+async def trial(fake, cog, channel, timeout):
+    """Flip the channel live and return the seconds until it was announced."""
+    channel.sent = asyncio.get_running_loop().create_future()
+    start = time.perf_counter()
+    await fake.go_live(CHANNEL, duplicate=True)
+    announced = await asyncio.wait_for(channel.sent, timeout)
+    await fake.go_offline(CHANNEL)
+    cog.live_streams.clear()
+    return announced - start
+
+
+async def run_mode(args, fake, eventsub):
+    from events.twitch import TwitchNotifier
+    from utils import api
+
+    os.environ["TWITCH_EVENTSUB_CALLBACK"] = f"http://127.0.0.1:{args.api_port}/twitch/eventsub" if eventsub else ""
+    channel = FakeChannel("live-now")
+    bot = FakeBot([FakeGuild(1, [channel])])
+    cog = TwitchNotifier(bot)
+    bot.cogs["TwitchNotifier"] = cog
+    api.BOT_INSTANCE = bot
+    if not eventsub:
+        # Fixed interval; the interval can only change once the loop has run its first iteration
+        cog.scheduler.interval = cog.scheduler.min_interval = args.poll_interval
+        cog.scheduler.jitter = 0
+        await asyncio.sleep(0.1)
+        cog.check_twitch_stream.change_interval(seconds=args.poll_interval)
+    else:
+        await cog.subscribe_eventsub()
+        # Wait for the fake to verify the callback
+        while any(sub["status"] != "enabled" for sub, _ in fake.subscriptions.values()):
+            await asyncio.sleep(0.01)
+
+    latencies = []
+    for _ in range(args.trials):
+        # Go live at a random point of the poll cycle
+        await asyncio.sleep(random.uniform(0, args.poll_interval) if not eventsub else 0.01)
+        latencies.append(await trial(fake, cog, channel, args.poll_interval * 3))
+
+    name = "eventsub" if eventsub else f"poll {args.poll_interval:g}s"
+    print(f"{name:<12} {format_latency(latencies)} max={max(latencies) * 1000:8.2f}ms")
+    if eventsub:
+        print("eventsub stats:", cog.eventsub.stats())
+    cog.cog_unload()
+    await bot.http_client.close()
+    fake.subscriptions.clear()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="poll loop interval for the fallback run (seconds)")
+    parser.add_argument("--twitch-port", type=int, default=8081)
+    parser.add_argument("--api-port", type=int, default=8082)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "TWITCH_CLIENT_ID": "fake-client",
+        "TWITCH_CLIENT_SECRET": "fake-secret",
+        "TWITCH_CHANNEL": CHANNEL,
+        "TWITCH_AUTH_BASE": f"http://127.0.0.1:{args.twitch_port}",
+        "TWITCH_API_BASE": f"http://127.0.0.1:{args.twitch_port}/helix",
+        "TWITCH_EVENTSUB_SECRET": "fake-eventsub-secret-0123456789",
+        "TWITCH_WATCHLIST_PATH": os.path.join(tempfile.mkdtemp(), "twitch.db"),
+    })
+
+    fake = FakeTwitch()
+    await fake.start(port=args.twitch_port)
+
+    from utils.api import app
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.api_port, log_level="warning"))
+    serve_task = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    try:
+        await run_mode(args, fake, eventsub=True)
+        await run_mode(args, fake, eventsub=False)
+        print(f"fake twitch requests: {dict(fake.requests)} deliveries={fake.deliveries}")
+    finally:
+        server.should_exit = True
+        await serve_task
+        await fake.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,10 +2,7 @@ import discord
 from discord.ext import commands
 from discord import SlashCommandGroup, Option
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from utils.status import get_status_snapshot, format_uptime
 
 class General(commands.Cog):
     """General commands for ChessSafari Discord bot."""
@@ -48,10 +45,7 @@ class General(commands.Cog):
     @discord.slash_command(name="status", description="Check the bot's current status")
     async def status_slash(self, ctx):
         """Slash command to check bot status."""
-        uptime = discord.utils.utcnow() - self.bot.user.created_at
-        days, remainder = divmod(int(uptime.total_seconds()), 86400)
-        hours, remainder = divmod(remainder, 3600)
-        minutes, seconds = divmod(remainder, 60)
+        uptime = format_uptime(get_status_snapshot(self.bot).uptime)
         
         embed = discord.Embed(
             title="🌴 Safari Buddy Status",
@@ -63,7 +57,7 @@ class General(commands.Cog):
         embed.add_field(name="Connected Servers", value=f"{len(self.bot.guilds)}", inline=True)
         embed.add_field(
             name="Uptime", 
-            value=f"{days}d {hours}h {minutes}m {seconds}s", 
+            value=uptime, 
             inline=True
         )
         embed.set_footer(text="Safari Buddy - Watching the jungle 🦁")
@@ -160,15 +154,12 @@ class General(commands.Cog):
         except discord.Forbidden:
             try:
                 # Create a basic text version for DM
-                uptime = discord.utils.utcnow() - self.bot.user.created_at
-                days, remainder = divmod(int(uptime.total_seconds()), 86400)
-                hours, remainder = divmod(remainder, 3600)
-                minutes, seconds = divmod(remainder, 60)
+                uptime = format_uptime(get_status_snapshot(self.bot).uptime)
                 
                 status_text = f"**🌴 Safari Buddy Status**\n\n" \
                               f"**Bot Latency:** {round(self.bot.latency * 1000)}ms\n" \
                               f"**Connected Servers:** {len(self.bot.guilds)}\n" \
-                              f"**Uptime:** {days}d {hours}h {minutes}m {seconds}s\n\n" \
+                              f"**Uptime:** {uptime}\n\n" \
                               f"*Safari Buddy - Watching the jungle 🦁*"
                 
                 await ctx.author.send(f"I don't have permission to send messages in that channel. Here's the bot status:\n\n{status_text}")
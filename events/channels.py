@@ -0,0 +1,69 @@
+import discord
+from discord.ext import commands
+from discord import SlashCommandGroup, Option
+import logging
+from utils.channel_index import get_channel_index, ROLES
+from utils.status import get_status_snapshot
+
+logger = logging.getLogger("safari_buddy.channels")
+
+class ChannelRoles(commands.Cog):
+    """Keeps the shared channel index up to date and lets admins pin channel roles."""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.index = get_channel_index(bot)
+        get_status_snapshot(bot).register_cache("indexed_guilds", lambda: self.index.stats()["indexed_guilds"])
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.index.channel_changed(channel)
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        if before.name != after.name or type(before) is not type(after):
+            self.index.channel_changed(before, after)
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.index.channel_changed(channel)
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.index.forget_guild(guild.id)
+    
+    channels_group = SlashCommandGroup(
+        "channels",
+        "Choose which channels the bot uses in this server",
+        default_member_permissions=discord.Permissions(administrator=True),
+        # Server settings: default_member_permissions does not apply in DMs
+        contexts={discord.InteractionContextType.guild}
+    )
+    
+    @channels_group.command(name="set", description="Use a specific channel for one of the bot's features")
+    async def channels_set(self, ctx,
+                           role: Option(str, "Feature", choices=list(ROLES), required=True),
+                           channel: Option(discord.TextChannel, "Channel to use", required=True)):
+        self.index.set_override(ctx.guild.id, role, channel.id)
+        logger.info("Pinned %s to #%s in %s", role, channel.name, ctx.guild.name)
+        await ctx.respond(f"✅ `{role}` messages will go to {channel.mention}.", ephemeral=True)
+    
+    @channels_group.command(name="reset", description="Find a feature's channel by name again")
+    async def channels_reset(self, ctx, role: Option(str, "Feature", choices=list(ROLES), required=True)):
+        if self.index.clear_override(ctx.guild.id, role):
+            await ctx.respond(f"✅ `{role}` channel will be found by name again.", ephemeral=True)
+        else:
+            await ctx.respond(f"ℹ️ `{role}` was not pinned to a channel.", ephemeral=True)
+    
+    @channels_group.command(name="show", description="Show the channels the bot uses in this server")
+    async def channels_show(self, ctx):
+        overrides = self.index.overrides(ctx.guild.id)
+        lines = []
+        for role in ROLES:
+            channel = self.index.get(ctx.guild, role)
+            where = channel.mention if channel else "not found"
+            lines.append(f"`{role}`: {where}{' (pinned)' if role in overrides else ''}")
+        await ctx.respond("\n".join(lines), ephemeral=True)
+
+def setup(bot):
+    return bot.add_cog(ChannelRoles(bot))
@@ -1,32 +1,85 @@
 import discord
 from discord.ext import commands
+import os
+import asyncio
 import logging
-from datetime import datetime
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from utils.channel_index import get_channel_index, MOD_LOGS
+from utils.modlog import ModLogWriter
+from utils.message_cache import MessageCache, snapshot
+from utils.join_rate import get_join_detector, MemberBatcher
+from utils.status import get_status_snapshot
 
 logger = logging.getLogger("safari_buddy.logging")
 
+# Accounts younger than this are called out in raid summaries
+NEW_ACCOUNT_AGE = timedelta(days=7)
+
 class Logging(commands.Cog):
     """Log member activities and message changes to a mod-logs channel."""
     
     def __init__(self, bot):
         self.bot = bot
+        self.channels = get_channel_index(bot)
+        # Entries are batched per guild instead of one send per event
+        self.modlog = ModLogWriter.from_env()
+        # Recent message contents for edits and deletes py-cord no longer has cached
+        self.messages = MessageCache.from_env()
+        get_status_snapshot(bot).register_cache("audit_messages", lambda: len(self.messages))
+        self.purges = 0
+        self.purged_messages = 0
+        self.unresolved_deletes = 0
+        self.unresolved_edits = 0
+        # During a join raid, one summary per interval instead of one entry per member
+        self.joins = get_join_detector(bot)
+        self.join_batcher = MemberBatcher(self.joins.aggregate_interval, self.log_joins)
+        self.leave_batcher = MemberBatcher(self.joins.aggregate_interval, self.log_leaves)
+    
+    def cog_unload(self):
+        """Clean up when the cog is unloaded; queued entries are still sent."""
+        self._shutdown_task = asyncio.ensure_future(self.shutdown())
+    
+    async def shutdown(self, timeout=None):
+        """Send pending raid summaries and queued mod-log entries, then stop the writer."""
+        if timeout is None:
+            timeout = float(os.getenv("MODLOG_SHUTDOWN_TIMEOUT", "10"))
+        await self.join_batcher.drain()
+        await self.leave_batcher.drain()
+        await self.modlog.drain(timeout)
+    
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Pick up entries spilled to disk before a restart."""
+        for guild_id in self.modlog.pending_spills():
+            guild = self.bot.get_guild(guild_id)
+            logs_channel = await self.get_logs_channel(guild) if guild else None
+            if logs_channel:
+                self.modlog.resume(logs_channel)
+    
+    def stats(self):
+        """Return mod-log pipeline metrics."""
+        return {
+            "writer": self.modlog.stats(),
+            "raids": self.joins.stats(),
+            "message_cache": self.messages.stats(),
+            "purges": self.purges,
+            "purged_messages": self.purged_messages,
+            "unresolved_deletes": self.unresolved_deletes,
+            "unresolved_edits": self.unresolved_edits,
+        }
     
     async def get_logs_channel(self, guild):
         """Find the mod-logs channel in the guild."""
-        logs_channel = discord.utils.get(guild.channels, name="mod-logs")
-        
-        if not logs_channel:
-            # Try to find a channel with "log" in the name
-            for channel in guild.channels:
-                if isinstance(channel, discord.TextChannel) and ("log" in channel.name.lower() or "mod" in channel.name.lower()):
-                    logs_channel = channel
-                    break
-        
-        return logs_channel
+        return self.channels.get(guild, MOD_LOGS)
     
     @commands.Cog.listener()
     async def on_member_join(self, member):
         """Log when a member joins the server."""
+        if self.joins.observe(member):
+            self.join_batcher.add(member.guild, member)
+            return
+        
         logs_channel = await self.get_logs_channel(member.guild)
         
         if logs_channel:
@@ -41,11 +94,15 @@ class Logging(commands.Cog):
             embed.add_field(name="ID", value=member.id, inline=True)
             embed.add_field(name="Account Created", value=f"<t:{int(member.created_at.timestamp())}:R>", inline=True)
             
-            await logs_channel.send(embed=embed)
+            self.modlog.enqueue(logs_channel, embed)
     
     @commands.Cog.listener()
     async def on_member_remove(self, member):
         """Log when a member leaves the server."""
+        if self.joins.in_raid(member.guild.id):
+            self.leave_batcher.add(member.guild, member)
+            return
+        
         logs_channel = await self.get_logs_channel(member.guild)
         
         if logs_channel:
@@ -60,60 +117,194 @@ class Logging(commands.Cog):
             embed.add_field(name="ID", value=member.id, inline=True)
             embed.add_field(name="Joined", value=f"<t:{int(member.joined_at.timestamp()) if member.joined_at else 0}:R>", inline=True)
             
-            await logs_channel.send(embed=embed)
+            self.modlog.enqueue(logs_channel, embed)
+    
+    async def log_joins(self, guild, members):
+        """Summarize the members who joined during the last interval of a raid."""
+        now = datetime.now(timezone.utc)
+        new_accounts = sum(1 for member in members if now - member.created_at < NEW_ACCOUNT_AGE)
+        embed = discord.Embed(
+            title="Join Raid",
+            description=f"{len(members)} members joined in the last {self.joins.aggregate_interval:g}s",
+            color=discord.Color.dark_red(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(name="Join Rate", value=f"{self.joins.join_rate(guild.id):.0f}/min", inline=True)
+        embed.add_field(name="New Accounts", value=f"{new_accounts} under {NEW_ACCOUNT_AGE.days} days old", inline=True)
+        self.enqueue_member_summary(guild, embed, members, "joins")
+    
+    async def log_leaves(self, guild, members):
+        """Summarize the members who left during the last interval of a raid."""
+        embed = discord.Embed(
+            title="Members Left",
+            description=f"{len(members)} members left in the last {self.joins.aggregate_interval:g}s",
+            color=discord.Color.red(),
+            timestamp=datetime.utcnow()
+        )
+        self.enqueue_member_summary(guild, embed, members, "leaves")
+    
+    def enqueue_member_summary(self, guild, embed, members, kind):
+        """Queue a raid summary listing the first members, with the full list attached if longer."""
+        logs_channel = self.channels.get(guild, MOD_LOGS)
+        if not logs_channel:
+            return
+        listed = "\n".join(f"{member.mention} ({member.id})" for member in members[:20])
+        if len(members) > 20:
+            listed += f"\n... and {len(members) - 20} more"
+        embed.add_field(name="Members", value=listed[:1024], inline=False)
+        
+        attachment = None
+        if len(members) > 20:
+            lines = [f"{member.id}\t{member}\tcreated {member.created_at:%Y-%m-%d %H:%M}" for member in members]
+            filename = f"{kind}-{guild.id}-{datetime.utcnow():%Y%m%d-%H%M%S}.txt"
+            attachment = (filename, ("\n".join(lines) + "\n").encode("utf-8"))
+        self.modlog.enqueue(logs_channel, embed, attachment=attachment)
+        self.joins.count_suppressed(f"modlog_{kind}", len(members) - 1)
     
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
-        """Log when a message is deleted."""
-        if message.author.bot:
+    async def on_message(self, message):
+        """Remember message contents so edits and deletes can still be logged after py-cord forgets them."""
+        if message.guild and not message.author.bot:
+            self.messages.add(message)
+    
+    def resolve_deleted(self, guild_id, message_id, cached_message=None):
+        """Return what is known about a deleted message, preferring py-cord's own cache."""
+        entry = self.messages.pop(guild_id, message_id)
+        if cached_message is not None:
+            return snapshot(cached_message)
+        return entry
+    
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        """Log when a message is deleted, even if py-cord no longer has it cached."""
+        if payload.guild_id is None:
             return
         
-        logs_channel = await self.get_logs_channel(message.guild)
+        message = payload.cached_message
+        if message is not None and message.author.bot:
+            return
+        entry = self.resolve_deleted(payload.guild_id, payload.message_id, message)
+        if entry is None:
+            # Sent before the cache filled up, or by a bot; nothing useful to log
+            self.unresolved_deletes += 1
+            return
+        
+        guild = self.bot.get_guild(payload.guild_id)
+        logs_channel = await self.get_logs_channel(guild) if guild else None
         
         if logs_channel:
             embed = discord.Embed(
                 title="Message Deleted",
-                description=f"Message by {message.author.mention} deleted in {message.channel.mention}",
+                description=f"Message by <@{entry.author_id}> deleted in <#{payload.channel_id}>",
                 color=discord.Color.orange(),
                 timestamp=datetime.utcnow()
             )
             
-            embed.set_thumbnail(url=message.author.display_avatar.url)
+            if message is not None:
+                embed.set_thumbnail(url=message.author.display_avatar.url)
             
-            if message.content:
-                if len(message.content) > 1024:
-                    embed.add_field(name="Content", value=f"{message.content[:1021]}...", inline=False)
+            if entry.content:
+                if len(entry.content) > 1024:
+                    embed.add_field(name="Content", value=f"{entry.content[:1021]}...", inline=False)
                 else:
-                    embed.add_field(name="Content", value=message.content, inline=False)
+                    embed.add_field(name="Content", value=entry.content, inline=False)
             
-            if message.attachments:
-                attachment_names = [attachment.filename for attachment in message.attachments]
-                embed.add_field(name="Attachments", value=", ".join(attachment_names), inline=False)
+            if entry.attachments:
+                embed.add_field(name="Attachments", value=", ".join(entry.attachments), inline=False)
             
-            await logs_channel.send(embed=embed)
+            self.modlog.enqueue(logs_channel, embed)
+    
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        """Log a purge as one summary with the deleted messages attached as a transcript."""
+        if payload.guild_id is None:
+            return
+        
+        cached = {message.id: message for message in payload.cached_messages}
+        entries = {}
+        for message_id in payload.message_ids:
+            entries[message_id] = self.resolve_deleted(payload.guild_id, message_id, cached.get(message_id))
+        
+        guild = self.bot.get_guild(payload.guild_id)
+        logs_channel = await self.get_logs_channel(guild) if guild else None
+        if not logs_channel:
+            return
+        
+        known = [entry for entry in entries.values() if entry]
+        authors = Counter(entry.author_id for entry in known)
+        embed = discord.Embed(
+            title="Messages Purged",
+            description=f"{len(entries)} messages deleted in <#{payload.channel_id}>",
+            color=discord.Color.dark_orange(),
+            timestamp=datetime.utcnow()
+        )
+        if authors:
+            top_authors = "\n".join(f"<@{author_id}>: {count}" for author_id, count in authors.most_common(10))
+            embed.add_field(name="Authors", value=top_authors, inline=True)
+        embed.add_field(name="Content Recovered", value=f"{len(known)}/{len(entries)}", inline=True)
+        
+        filename = f"purge-{payload.channel_id}-{datetime.utcnow():%Y%m%d-%H%M%S}.txt"
+        transcript = self.build_transcript(payload.channel_id, entries)
+        self.purges += 1
+        self.purged_messages += len(entries)
+        self.modlog.enqueue(logs_channel, embed, attachment=(filename, transcript.encode("utf-8")))
+    
+    def build_transcript(self, channel_id, entries):
+        """Render deleted messages oldest first, one line each (continuation lines indented)."""
+        lines = [f"Purge of {len(entries)} messages in channel {channel_id}", ""]
+        for message_id in sorted(entries):
+            sent_at = discord.utils.snowflake_time(message_id).strftime("%Y-%m-%d %H:%M:%S")
+            entry = entries[message_id]
+            if entry is None:
+                lines.append(f"[{sent_at}] (message {message_id} not cached)")
+                continue
+            content = entry.content.replace("\n", "\n    ") if entry.content else ""
+            attachments = f" [attachments: {', '.join(entry.attachments)}]" if entry.attachments else ""
+            lines.append(f"[{sent_at}] {entry.author_name} ({entry.author_id}): {content}{attachments}")
+        return "\n".join(lines) + "\n"
     
     @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        """Log when a message is edited."""
-        if before.author.bot or before.content == after.content:
+    async def on_raw_message_edit(self, payload):
+        """Log when a message is edited, even if py-cord no longer has it cached."""
+        if payload.guild_id is None or "content" not in payload.data:
+            # Embed unfurls and other non-content updates
+            return
+        if payload.data.get("author", {}).get("bot"):
             return
         
-        logs_channel = await self.get_logs_channel(before.guild)
+        message = payload.cached_message
+        before = snapshot(message) if message is not None else self.messages.get(payload.guild_id, payload.message_id)
+        after_content = payload.data["content"]
+        if before is None:
+            self.unresolved_edits += 1
+            return
+        if before.content == after_content:
+            return
+        self.messages.update(payload.guild_id, payload.message_id, after_content)
+        
+        guild = self.bot.get_guild(payload.guild_id)
+        logs_channel = await self.get_logs_channel(guild) if guild else None
         
         if logs_channel:
             embed = discord.Embed(
                 title="Message Edited",
-                description=f"Message by {before.author.mention} edited in {before.channel.mention}",
+                description=f"Message by <@{before.author_id}> edited in <#{payload.channel_id}>",
                 color=discord.Color.blue(),
                 timestamp=datetime.utcnow()
             )
             
-            embed.set_thumbnail(url=before.author.display_avatar.url)
+            if message is not None:
+                embed.set_thumbnail(url=message.author.display_avatar.url)
+            jump_url = f"https://discord.com/channels/{payload.guild_id}/{payload.channel_id}/{payload.message_id}"
             embed.add_field(name="Before", value=before.content[:1024] if before.content else "(empty)", inline=False)
-            embed.add_field(name="After", value=after.content[:1024] if after.content else "(empty)", inline=False)
-            embed.add_field(name="Jump to Message", value=f"[Click Here]({after.jump_url})", inline=False)
+            embed.add_field(name="After", value=after_content[:1024] if after_content else "(empty)", inline=False)
+            embed.add_field(name="Jump to Message", value=f"[Click Here]({jump_url})", inline=False)
             
-            await logs_channel.send(embed=embed)
+            self.modlog.enqueue(logs_channel, embed)
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.messages.forget_guild(guild.id)
 
 def setup(bot):
     return bot.add_cog(Logging(bot))
\ No newline at end of file
@@ -0,0 +1,51 @@
+from discord.ext import commands
+from utils.metrics import REGISTRY, instrument_bot
+
+COMMAND_ERRORS = REGISTRY.counter(
+    "safari_command_errors", "Commands that failed, by error type", ("command", "kind", "error"))
+
+class Metrics(commands.Cog):
+    """Instruments the bot for the /metrics endpoint.
+    
+    Event handlers, commands and Discord API calls are timed by wrapping the
+    bot itself; queue depths and cache sizes are read from the cogs at scrape
+    time, so a reloaded cog is picked up without re-registering anything.
+    """
+    
+    def __init__(self, bot):
+        self.bot = bot
+        instrument_bot(bot)
+        
+        REGISTRY.gauge("safari_guilds", "Guilds the bot is in").set_function(lambda: len(bot.guilds))
+        REGISTRY.gauge("safari_gateway_latency_seconds", "Heartbeat latency of the gateway connection").set_function(
+            self.gateway_latency)
+        REGISTRY.gauge("safari_modlog_queue_depth", "Mod-log embeds waiting to be sent").set_function(
+            lambda: self.from_cog("Logging", lambda cog: cog.modlog.queue_depth()))
+        REGISTRY.gauge("safari_audit_cache_messages", "Messages kept for edit and delete logs").set_function(
+            lambda: self.from_cog("Logging", lambda cog: len(cog.messages)))
+        REGISTRY.gauge("safari_join_raids_active", "Guilds currently in join-raid mode").set_function(
+            lambda: self.from_cog("Logging", lambda cog: cog.joins.active_raids()))
+        REGISTRY.gauge("safari_twitch_live_streams", "Watched Twitch channels that are live").set_function(
+            lambda: self.from_cog("TwitchNotifier", lambda cog: len(cog.live_streams)))
+    
+    def gateway_latency(self):
+        latency = self.bot.latency
+        return latency if latency == latency and latency != float("inf") else None
+    
+    def from_cog(self, name, read):
+        """Read a value from a cog, or leave the sample out while it isn't loaded."""
+        cog = self.bot.get_cog(name)
+        return read(cog) if cog else None
+    
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx, error):
+        name = ctx.command.qualified_name if ctx.command else "unknown"
+        COMMAND_ERRORS.labels(name, "prefix", type(getattr(error, "original", error)).__name__).inc()
+    
+    @commands.Cog.listener()
+    async def on_application_command_error(self, ctx, error):
+        name = ctx.command.qualified_name if ctx.command else "unknown"
+        COMMAND_ERRORS.labels(name, "slash", type(getattr(error, "original", error)).__name__).inc()
+
+def setup(bot):
+    return bot.add_cog(Metrics(bot))
@@ -1,26 +1,36 @@
 import discord
 from discord.ext import commands
 import os
+import time
 import logging
-import aiohttp
 import asyncio
-from datetime import datetime, time, timezone
+from datetime import datetime, timezone
 import json
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from utils.http_client import get_http_client
+from utils.puzzle_cache import DailyPuzzleCache
+from utils.puzzle_store import PuzzleStore
+from utils.puzzle_db import OfflinePuzzleDB
+from utils.puzzle_reservoir import PuzzleReservoir, parse_bands
+from utils.board import BoardRenderer
+from utils.puzzle_model import Puzzle
+from utils.puzzle_presenter import PuzzlePresenter, DAILY, BY_ID, RANDOM
+from utils.solution_store import SolutionStore
+from utils.channel_index import get_channel_index, PUZZLE
 
 logger = logging.getLogger("safari_buddy.puzzle")
 
+# Reaction that reveals a puzzle's solution
+SOLUTION_EMOJI = "🔍"
+
 class ChessPuzzle(commands.Cog):
     """Daily chess puzzles from Lichess."""
     
     def __init__(self, bot):
         self.bot = bot
         self.puzzle_channel_id = os.getenv('PUZZLE_CHANNEL_ID')
+        self.channels = get_channel_index(bot)
         self.scheduler = AsyncIOScheduler()
         self.puzzle_timezone = os.getenv('PUZZLE_TIMEZONE', 'Africa/Johannesburg')  # CAT timezone by default
         self.puzzle_time = os.getenv('PUZZLE_TIME', '08:06')  # Default to 9AM
@@ -28,6 +38,51 @@ class ChessPuzzle(commands.Cog):
         # Store API base URL
         self.lichess_api_base = "https://lichess.org/api"
         
+        # Shared pooled HTTP client
+        self.http = get_http_client(bot).acquire()
+        
+        # Cache the daily puzzle so bursts of /puzzle calls share one fetch
+        self.daily_cache = DailyPuzzleCache(
+            self.fetch_daily_model,
+            rollover_hour=int(os.getenv('LICHESS_DAILY_ROLLOVER_HOUR', '0')),
+            stale_timeout=float(os.getenv('DAILY_PUZZLE_STALE_TIMEOUT', '2')),
+            key=lambda puzzle: puzzle.id
+        )
+        
+        # Local store for puzzles by ID, preloaded with recently posted puzzles
+        self.puzzle_store = PuzzleStore.from_env(encode=Puzzle.to_payload, decode=Puzzle.from_payload)
+        self.puzzle_store.warm_up(int(os.getenv('PUZZLE_STORE_WARMUP', '100')))
+        
+        # Offline puzzle database for random puzzles, if one has been imported
+        self.puzzle_db = OfflinePuzzleDB.from_env()
+        
+        # Pre-fetched random puzzles for the common rating bands
+        self.reservoir = PuzzleReservoir(
+            self.fetch_random_puzzle,
+            parse_bands(os.getenv('PUZZLE_RESERVOIR_BANDS', '1000-1500,1500-2000,2000-2500')),
+            depth=int(os.getenv('PUZZLE_RESERVOIR_DEPTH', '5')),
+            refill_concurrency=int(os.getenv('PUZZLE_RESERVOIR_CONCURRENCY', '2')),
+            key=lambda puzzle: puzzle.id
+        )
+        
+        # Solutions for posted puzzles, keyed by message ID and kept across restarts
+        self.solutions = SolutionStore.from_env()
+        self.solutions.warm_up()
+        
+        # Message ID -> monotonic time of the last reveal, so a burst of 🔍
+        # reactions on one puzzle gets a single reply
+        self.reveal_window = float(os.getenv('SOLUTION_REVEAL_WINDOW', '10'))
+        self._recent_reveals = {}
+        self.reveals = 0
+        self.reveals_deduplicated = 0
+        
+        # Single embed pipeline, rendering boards locally when Pillow is available
+        self.presenter = PuzzlePresenter(
+            renderer=BoardRenderer.from_env(),
+            board_theme=os.getenv('BOARD_THEME', 'brown'),
+            cache_size=int(os.getenv('PUZZLE_EMBED_CACHE_SIZE', '256'))
+        )
+        
         # Convert time string to hour and minute
         hour, minute = map(int, self.puzzle_time.split(':'))
         
@@ -40,244 +95,306 @@ class ChessPuzzle(commands.Cog):
         
         # Start the scheduler
         self.scheduler.start()
-        logger.info(f"Daily puzzle scheduler started, will post at {self.puzzle_time} {self.puzzle_timezone}")
+        logger.info("Daily puzzle scheduler started, will post at %s %s", self.puzzle_time, self.puzzle_timezone)
     
     def cog_unload(self):
         """Clean up when the cog is unloaded."""
         self.scheduler.shutdown()
+        self.reservoir.stop()
+        self.http.release()
+        self.puzzle_store.close()
+        self.solutions.close()
+        if self.puzzle_db:
+            self.puzzle_db.close()
+    
+    def parse_puzzle(self, puzzle_data, puzzle_id=None):
+        """Parse a Lichess payload into a Puzzle, or return None if it is malformed."""
+        if not puzzle_data:
+            return None
+        try:
+            return Puzzle.from_payload(puzzle_data, puzzle_id)
+        except ValueError as e:
+            logger.error("Could not parse puzzle data: %s", e)
+            return None
     
     async def fetch_daily_puzzle(self):
+        """Get the daily puzzle, served from the cache when possible."""
+        return await self.daily_cache.get()
+    
+    async def fetch_daily_model(self):
+        """Fetch and parse the daily puzzle (used to fill the cache)."""
+        return self.parse_puzzle(await self.fetch_daily_puzzle_uncached())
+    
+    async def fetch_daily_puzzle_uncached(self):
         """Fetch the daily puzzle from Lichess API."""
         url = f"{self.lichess_api_base}/puzzle/daily"
         headers = {"Accept": "application/json"}
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        # Log the entire response for debugging
-                        logger.debug(f"Daily puzzle response: {data}")
-                        
-                        # Check if we have puzzle data with ID
-                        if 'puzzle' in data and 'id' in data['puzzle']:
-                            logger.info(f"Successfully fetched daily puzzle: {data['puzzle']['id']}")
-                            return data
-                        else:
-                            logger.error(f"Puzzle data structure is unexpected: {data}")
-                            return None
+            async with self.http.get(url, headers=headers) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    # Log the entire response for debugging
+                    logger.debug("Daily puzzle response: %s", data)
+                    
+                    # Check if we have puzzle data with ID
+                    if 'puzzle' in data and 'id' in data['puzzle']:
+                        logger.info("Successfully fetched daily puzzle: %s", data['puzzle']['id'])
+                        return data
                     else:
-                        logger.error(f"Failed to fetch daily puzzle. Status: {response.status}")
+                        logger.error("Puzzle data structure is unexpected: %s", data)
                         return None
+                else:
+                    logger.error("Failed to fetch daily puzzle. Status: %s", response.status)
+                    return None
         except Exception as e:
-            logger.error(f"Error fetching daily puzzle: {e}")
+            logger.error("Error fetching daily puzzle: %s", e)
             return None
     
     async def fetch_puzzle_by_id(self, puzzle_id):
+        """Get a specific puzzle by ID, served from the local store when possible."""
+        puzzle = await self.puzzle_store.get(puzzle_id)
+        if puzzle:
+            return puzzle
+        
+        puzzle = self.parse_puzzle(await self.fetch_puzzle_by_id_uncached(puzzle_id), puzzle_id)
+        if puzzle:
+            await self.puzzle_store.put(puzzle_id, puzzle)
+        return puzzle
+    
+    async def fetch_puzzle_by_id_uncached(self, puzzle_id):
         """Fetch a specific puzzle by ID from Lichess API."""
         url = f"{self.lichess_api_base}/puzzle/{puzzle_id}"
         headers = {"Accept": "application/json"}
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        # Log the entire response for debugging
-                        logger.debug(f"Puzzle by ID response: {data}")
-                        
-                        # Check if we have puzzle data
-                        if 'puzzle' in data:
-                            logger.info(f"Successfully fetched puzzle by ID: {puzzle_id}")
-                            return data
-                        else:
-                            logger.error(f"Puzzle data structure is unexpected for ID {puzzle_id}: {data}")
-                            return None
+            async with self.http.get(url, headers=headers) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    # Log the entire response for debugging
+                    logger.debug("Puzzle by ID response: %s", data)
+                    
+                    # Check if we have puzzle data
+                    if 'puzzle' in data:
+                        logger.info("Successfully fetched puzzle by ID: %s", puzzle_id)
+                        return data
                     else:
-                        logger.error(f"Failed to fetch puzzle by ID {puzzle_id}. Status: {response.status}")
+                        logger.error("Puzzle data structure is unexpected for ID %s: %s", puzzle_id, data)
                         return None
+                else:
+                    logger.error("Failed to fetch puzzle by ID %s. Status: %s", puzzle_id, response.status)
+                    return None
         except Exception as e:
-            logger.error(f"Error fetching puzzle by ID: {e}")
+            logger.error("Error fetching puzzle by ID: %s", e)
             return None
     
-    async def fetch_random_puzzle(self, rating_min=1500, rating_max=2000):
+    async def next_random_puzzle(self, rating_min=1500, rating_max=2000, theme=None):
+        """Get a random puzzle for a command, using the pre-fetched reservoir when possible."""
+        if not theme:
+            puzzle = self.reservoir.pop(rating_min, rating_max)
+            if puzzle:
+                return puzzle
+        return await self.fetch_random_puzzle(rating_min, rating_max, theme)
+    
+    async def fetch_random_puzzle(self, rating_min=1500, rating_max=2000, theme=None):
+        """Get a random puzzle within rating range, from the offline database when available."""
+        if self.puzzle_db:
+            try:
+                puzzle_data = await self.puzzle_db.random_puzzle(rating_min, rating_max, theme)
+                if puzzle_data:
+                    return self.parse_puzzle(puzzle_data)
+                logger.info("No offline puzzle for %s-%s (theme: %s), falling back to Lichess", rating_min, rating_max, theme)
+            except Exception as e:
+                logger.error("Error reading offline puzzle database: %s", e)
+        
+        return self.parse_puzzle(await self.fetch_random_puzzle_uncached(rating_min, rating_max))
+    
+    async def fetch_random_puzzle_uncached(self, rating_min=1500, rating_max=2000):
         """Fetch a random puzzle within rating range from Lichess API."""
         url = f"{self.lichess_api_base}/puzzle/random"
         headers = {"Accept": "application/json"}
         params = {"min": rating_min, "max": rating_max}
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        # Log the entire response for debugging
-                        logger.debug(f"Random puzzle response: {data}")
-                        
-                        # Check if we have puzzle data with ID
-                        if 'puzzle' in data and 'id' in data['puzzle']:
-                            logger.info(f"Successfully fetched random puzzle: {data['puzzle']['id']}")
-                            return data
-                        else:
-                            logger.error(f"Random puzzle data structure is unexpected: {data}")
-                            return None
+            async with self.http.get(url, headers=headers, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    # Log the entire response for debugging
+                    logger.debug("Random puzzle response: %s", data)
+                    
+                    # Check if we have puzzle data with ID
+                    if 'puzzle' in data and 'id' in data['puzzle']:
+                        logger.info("Successfully fetched random puzzle: %s", data['puzzle']['id'])
+                        return data
                     else:
-                        logger.error(f"Failed to fetch random puzzle. Status: {response.status}")
+                        logger.error("Random puzzle data structure is unexpected: %s", data)
                         return None
+                else:
+                    logger.error("Failed to fetch random puzzle. Status: %s", response.status)
+                    return None
         except Exception as e:
-            logger.error(f"Error fetching random puzzle: {e}")
+            logger.error("Error fetching random puzzle: %s", e)
             return None
     
+    def stats(self):
+        """Return cache metrics for the puzzle subsystem."""
+        renderer = self.presenter.renderer
+        return {
+            "daily_cache": self.daily_cache.stats(),
+            "puzzle_store": self.puzzle_store.stats(),
+            "puzzle_db": self.puzzle_db.stats() if self.puzzle_db else None,
+            "reservoir": self.reservoir.stats(),
+            "board_renderer": renderer.stats() if renderer else None,
+            "embeds": self.presenter.stats(),
+            "solutions": self.solutions.stats(),
+            "reveals": {
+                "sent": self.reveals,
+                "deduplicated": self.reveals_deduplicated,
+                "window_s": self.reveal_window
+            }
+        }
+    
+    async def post_puzzle(self, send, puzzle, mode, **context):
+        """Send a puzzle embed, add the solution reaction and remember the solution.
+        
+        send is the coroutine function used to post (channel.send, ctx.send or
+        ctx.followup.send); context is passed through to the presenter.
+        """
+        embed, board_file = await self.presenter.present(puzzle, mode, **context)
+        
+        send_kwargs = {"embed": embed}
+        if board_file:
+            send_kwargs["file"] = board_file
+        message = await send(**send_kwargs)
+        
+        # Add reaction for solution
+        await message.add_reaction(SOLUTION_EMOJI)
+        
+        # Store the solution and pre-render its embed for the reveal
+        self.solutions.put(message.id, puzzle.id, puzzle.solution)
+        self.presenter.solution(puzzle.id, puzzle.solution)
+        await self.remember_posted(puzzle)
+        return message
+    
+    async def remember_posted(self, puzzle):
+        """Keep a posted puzzle in the local store so it is warm after a restart."""
+        if puzzle.id == 'Unknown':
+            return
+        try:
+            await self.puzzle_store.record_posted(puzzle.id, puzzle)
+        except Exception as e:
+            logger.error("Error recording posted puzzle %s: %s", puzzle.id, e)
+    
+    @staticmethod
+    def clamp_rating_range(min_rating, max_rating):
+        """Validate a requested rating range, falling back to sensible defaults."""
+        if min_rating < 600 or min_rating > 3000:
+            min_rating = 1500
+        if max_rating < 600 or max_rating > 3000 or max_rating < min_rating:
+            max_rating = min_rating + 500
+            if max_rating > 3000:
+                max_rating = 3000
+        return min_rating, max_rating
+    
     async def post_daily_puzzle(self):
         """Post the daily puzzle to the designated channel."""
         if not self.puzzle_channel_id:
             logger.warning("No puzzle channel ID configured. Skipping daily puzzle.")
             return
         
-        # Try to get the channel from all guilds
+        # The index resolves PUZZLE_CHANNEL_ID (or a /channels override) per guild
         channel = None
         for guild in self.bot.guilds:
-            channel = guild.get_channel(int(self.puzzle_channel_id))
+            channel = self.channels.get(guild, PUZZLE)
             if channel:
                 break
         
         if not channel:
-            logger.error(f"Could not find channel with ID {self.puzzle_channel_id}")
+            logger.error("Could not find channel with ID %s", self.puzzle_channel_id)
             return
         
         # Fetch the puzzle
-        puzzle_data = await self.fetch_daily_puzzle()
-        if not puzzle_data:
+        puzzle = await self.fetch_daily_puzzle()
+        if not puzzle:
             logger.error("Failed to post daily puzzle due to fetch error.")
             # Schedule a retry in 30 minutes
             asyncio.create_task(self.retry_post_puzzle(30))
             return
         
         try:
-            # Extract puzzle information with error handling
-            if 'puzzle' not in puzzle_data:
-                logger.error(f"Unexpected puzzle data format: {puzzle_data}")
-                # Schedule a retry in 15 minutes
-                asyncio.create_task(self.retry_post_puzzle(15))
-                return
-                
-            puzzle = puzzle_data['puzzle']
-            puzzle_id = puzzle.get('id', 'Unknown')
-            
-            # Log the data structure for debugging
-            logger.debug(f"Daily puzzle data structure: {puzzle_data}")
-            
-            # Extract data with proper error handling
-            puzzle_fen = puzzle.get('fen')
-            
-            if not puzzle_fen:
-                # Try alternative field names or structure
-                if 'game' in puzzle_data and 'fen' in puzzle_data['game']:
-                    puzzle_fen = puzzle_data['game']['fen']
-                else:
-                    # Use a default message if FEN is not available
-                    puzzle_fen = "FEN not available"
-            
-            puzzle_rating = puzzle.get('rating', 'Unknown')
-            puzzle_plays = puzzle.get('plays', 0)
-            puzzle_solution = puzzle.get('solution', [])
-            game_url = puzzle_data.get('game', {}).get('url', f"https://lichess.org/training/{puzzle_id}")
-            
-            # Create puzzle image URL
-            puzzle_image_url = f"https://lichess1.org/game/export/gif/puzzle/{puzzle_id}.gif"
-            
-            # Create the embed
-            embed = discord.Embed(
-                title=f"🧩 Daily Chess Puzzle - {datetime.now().strftime('%B %d, %Y')}",
-                description="Test your skills with today's chess puzzle from Lichess!",
-                color=discord.Color.gold(),
-                url=f"https://lichess.org/training/{puzzle_id}"
-            )
-            
-            embed.add_field(name="Rating", value=str(puzzle_rating), inline=True)
-            embed.add_field(name="Played", value=f"{puzzle_plays} times", inline=True)
-            embed.add_field(name="Puzzle ID", value=f"`{puzzle_id}`", inline=True)
-            
-            if puzzle_fen and puzzle_fen != "FEN not available":
-                embed.add_field(name="Position (FEN)", value=f"`{puzzle_fen}`", inline=False)
-                
-            embed.add_field(name="Instructions", value="Find the best move sequence! Click the link in the title to solve on Lichess. React with 🔍 to reveal the solution.", inline=False)
-            embed.set_image(url=puzzle_image_url)
-            embed.set_footer(text=f"Puzzle ID: {puzzle_id} • From a game played on Lichess")
-            
-            # Send the initial message
-            message = await channel.send(embed=embed)
-            
-            # Add reaction for solution
-            await message.add_reaction("🔍")
-            
-            # Store the solution for later
-            self.bot.puzzle_solutions = getattr(self.bot, "puzzle_solutions", {})
-            self.bot.puzzle_solutions[message.id] = {
-                "solution": puzzle_solution, 
-                "puzzle_id": puzzle_id,
-                "timestamp": datetime.now().timestamp()
-            }
-            
-            logger.info(f"Posted daily puzzle {puzzle_id} to {channel.name}")
+            await self.post_puzzle(channel.send, puzzle, DAILY)
+            logger.info("Posted daily puzzle %s to %s", puzzle.id, channel.name)
         except Exception as e:
-            logger.error(f"Error posting daily puzzle: {e}", exc_info=True)
+            logger.error("Error posting daily puzzle: %s", e, exc_info=True)
             # Schedule a retry in 15 minutes
             asyncio.create_task(self.retry_post_puzzle(15))
     
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Start filling the random puzzle reservoir once connected."""
+        self.reservoir.start()
+    
     async def retry_post_puzzle(self, minutes):
         """Retry posting the puzzle after a delay."""
-        logger.info(f"Scheduling puzzle post retry in {minutes} minutes")
+        logger.info("Scheduling puzzle post retry in %s minutes", minutes)
         await asyncio.sleep(minutes * 60)
         await self.post_daily_puzzle()
     
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
         """Handle reactions to reveal puzzle solutions."""
-        # Ignore bot reactions
-        if payload.user_id == self.bot.user.id:
+        # Cheap filters first: this runs for every reaction in every guild
+        if payload.emoji.name != SOLUTION_EMOJI or payload.user_id == self.bot.user.id:
             return
         
         # Check if this is a reaction to a puzzle
-        if not hasattr(self.bot, "puzzle_solutions") or payload.message_id not in self.bot.puzzle_solutions:
-            return
-        
-        # Check if this is the solution reaction
-        if str(payload.emoji) != "🔍":
-            return
-        
-        # Get the solution data
-        solution_data = self.bot.puzzle_solutions[payload.message_id]
-        puzzle_id = solution_data["puzzle_id"]
-        solution = solution_data["solution"]
-        
-        # Get the channel and message
-        channel = self.bot.get_channel(payload.channel_id)
-        message = await channel.fetch_message(payload.message_id)
-        
-        # Create solution embed
-        embed = discord.Embed(
-            title=f"🧩 Solution for Puzzle {puzzle_id}",
-            description="Here's the solution to the daily puzzle:",
-            color=discord.Color.green()
-        )
+        solution_data = self.solutions.get_cached(payload.message_id)
+        if solution_data is None:
+            solution_data = await self.solutions.get(payload.message_id)
+            if solution_data is None:
+                return
         
-        # Format solution moves
-        solution_text = ""
-        for i, move in enumerate(solution):
-            solution_text += f"{i+1}. {move}\n"
+        # Reply through a partial message built from the payload, so no fetch is needed
+        channel = self.bot.get_channel(payload.channel_id) or self.bot.get_partial_messageable(payload.channel_id)
+        message = channel.get_partial_message(payload.message_id)
         
-        embed.add_field(name="Winning Sequence", value=f"```{solution_text}```", inline=False)
-        embed.add_field(name="Play on Lichess", value=f"[Click here to try this puzzle](https://lichess.org/training/{puzzle_id})", inline=False)
+        # One reply per puzzle per window; later reactions in a storm are left alone
+        if not self.claim_reveal(payload.message_id):
+            self.reveals_deduplicated += 1
+            return
         
-        # Send as reply to original message
-        await message.reply(embed=embed)
+        embed = self.presenter.solution(solution_data.puzzle_id, solution_data.solution)
+        try:
+            await message.reply(embed=embed)
+            self.reveals += 1
+        except Exception as e:
+            self._recent_reveals.pop(payload.message_id, None)
+            logger.error("Error revealing solution for message %s: %s", payload.message_id, e)
+            return
         
         # Remove the user's reaction to keep things tidy
-        try:
-            await message.remove_reaction("🔍", payload.member)
-        except Exception:
-            pass
+        if payload.member:
+            try:
+                await message.remove_reaction(SOLUTION_EMOJI, payload.member)
+            except Exception:
+                pass
+    
+    def claim_reveal(self, message_id):
+        """Return True if the solution for a message has not been revealed within the window."""
+        now = time.monotonic()
+        last = self._recent_reveals.get(message_id)
+        if last is not None and now - last < self.reveal_window:
+            return False
+        
+        # Entries are in reveal order, so expired ones are at the front
+        while self._recent_reveals:
+            oldest_id, oldest = next(iter(self._recent_reveals.items()))
+            if now - oldest < self.reveal_window:
+                break
+            del self._recent_reveals[oldest_id]
+        self._recent_reveals.pop(message_id, None)
+        self._recent_reveals[message_id] = now
+        return True
     
     @discord.slash_command(name="puzzle", description="Get today's daily chess puzzle from Lichess")
     async def puzzle_slash(self, ctx):
@@ -289,80 +406,16 @@ class ChessPuzzle(commands.Cog):
                 pass  # Ignore if already responded or can't defer
         try:
             # Fetch the puzzle
-            puzzle_data = await self.fetch_daily_puzzle()
-            if not puzzle_data:
+            puzzle = await self.fetch_daily_puzzle()
+            if not puzzle:
                 await ctx.respond("❌ Failed to fetch today's puzzle from Lichess. Please try again later.")
                 return
             
-            # Post the puzzle (reusing same code as scheduled function)
-            # Extract puzzle information with error handling
-            puzzle_id = puzzle_data.get('puzzle', {}).get('id', 'Unknown')
-            
-            # Debug the puzzle data structure
-            logger.debug(f"Puzzle data structure: {puzzle_data}")
-            
-            # Check if the puzzle data has the expected structure
-            if 'puzzle' not in puzzle_data:
-                await ctx.followup.send("❌ Received unexpected data format from Lichess API. Please try again later.")
-                logger.error(f"Unexpected puzzle data format: {puzzle_data}")
-                return
-            
-            # Extract data with proper error handling
-            puzzle = puzzle_data['puzzle']
-            puzzle_fen = puzzle.get('fen')
-            
-            if not puzzle_fen:
-                # Try alternative field names or structure
-                if 'game' in puzzle_data and 'fen' in puzzle_data['game']:
-                    puzzle_fen = puzzle_data['game']['fen']
-                else:
-                    # Use a default message if FEN is not available
-                    puzzle_fen = "FEN not available"
-            
-            puzzle_rating = puzzle.get('rating', 'Unknown')
-            puzzle_plays = puzzle.get('plays', 0)
-            puzzle_solution = puzzle.get('solution', [])
-            game_url = puzzle_data.get('game', {}).get('url', f"https://lichess.org/training/{puzzle_id}")
-            
-            # Create puzzle image URL
-            puzzle_image_url = f"https://lichess1.org/game/export/gif/puzzle/{puzzle_id}.gif"
-            
-            # Create the embed
-            embed = discord.Embed(
-                title=f"🧩 Daily Chess Puzzle - {datetime.now().strftime('%B %d, %Y')}",
-                description="Test your skills with today's chess puzzle from Lichess!",
-                color=discord.Color.gold(),
-                url=f"https://lichess.org/training/{puzzle_id}"
-            )
-            
-            embed.add_field(name="Rating", value=str(puzzle_rating), inline=True)
-            embed.add_field(name="Played", value=f"{puzzle_plays} times", inline=True)
-            embed.add_field(name="Puzzle ID", value=f"`{puzzle_id}`", inline=True)
-            
-            if puzzle_fen:
-                embed.add_field(name="Position (FEN)", value=f"`{puzzle_fen}`", inline=False)
-                
-            embed.add_field(name="Instructions", value="Find the best move sequence! Click the link in the title to solve on Lichess. React with 🔍 to reveal the solution.", inline=False)
-            embed.set_image(url=puzzle_image_url)
-            embed.set_footer(text=f"Puzzle ID: {puzzle_id} • From a game played on Lichess")
-            
             # Send the message using followup since we deferred earlier
-            message = await ctx.followup.send(embed=embed)
-            
-            # Add reaction for solution
-            await message.add_reaction("🔍")
-            
-            # Store the solution for later
-            self.bot.puzzle_solutions = getattr(self.bot, "puzzle_solutions", {})
-            self.bot.puzzle_solutions[message.id] = {
-                "solution": puzzle_solution, 
-                "puzzle_id": puzzle_id,
-                "timestamp": datetime.now().timestamp()
-            }
-            
-            logger.info(f"Posted puzzle {puzzle_id} via command")
+            await self.post_puzzle(ctx.followup.send, puzzle, DAILY)
+            logger.info("Posted puzzle %s via command", puzzle.id)
         except Exception as e:
-            logger.error(f"Error posting puzzle via command: {e}", exc_info=True)
+            logger.error("Error posting puzzle via command: %s", e, exc_info=True)
             # Use followup for error message since we deferred earlier
             try:
                 await ctx.followup.send("❌ An error occurred while posting the puzzle. Please try again later.")
@@ -376,78 +429,17 @@ class ChessPuzzle(commands.Cog):
         await ctx.defer()
         
         # Fetch the puzzle by ID
-        puzzle_data = await self.fetch_puzzle_by_id(puzzle_id)
-        if not puzzle_data:
+        puzzle = await self.fetch_puzzle_by_id(puzzle_id)
+        if not puzzle:
             await ctx.followup.send(f"❌ Failed to fetch puzzle with ID `{puzzle_id}` from Lichess. Please check the ID and try again.")
             return
         
-        # Post the puzzle with the same format as the daily puzzle
         try:
-            # Log the data structure for debugging
-            logger.debug(f"Puzzle ID data structure: {puzzle_data}")
-            
-            # Check if the puzzle data has the expected structure
-            if 'puzzle' not in puzzle_data:
-                await ctx.followup.send(f"❌ Received unexpected data format from Lichess API for puzzle ID {puzzle_id}. Please try again later.")
-                logger.error(f"Unexpected puzzle data format for ID {puzzle_id}: {puzzle_data}")
-                return
-            
-            # Extract data with proper error handling
-            puzzle = puzzle_data['puzzle']
-            puzzle_fen = puzzle.get('fen')
-            
-            if not puzzle_fen:
-                # Try alternative field names or structure
-                if 'game' in puzzle_data and 'fen' in puzzle_data['game']:
-                    puzzle_fen = puzzle_data['game']['fen']
-                else:
-                    # Use a default message if FEN is not available
-                    puzzle_fen = "FEN not available"
-            
-            puzzle_rating = puzzle.get('rating', 'Unknown')
-            puzzle_plays = puzzle.get('plays', 0)
-            puzzle_solution = puzzle.get('solution', [])
-            
-            # Create puzzle image URL
-            puzzle_image_url = f"https://lichess1.org/game/export/gif/puzzle/{puzzle_id}.gif"
-            
-            # Create the embed
-            embed = discord.Embed(
-                title=f"🧩 Chess Puzzle {puzzle_id}",
-                description="Test your skills with this chess puzzle from Lichess!",
-                color=discord.Color.gold(),
-                url=f"https://lichess.org/training/{puzzle_id}"
-            )
-            
-            embed.add_field(name="Rating", value=str(puzzle_rating), inline=True)
-            if puzzle_plays:
-                embed.add_field(name="Played", value=f"{puzzle_plays} times", inline=True)
-            embed.add_field(name="Puzzle ID", value=f"`{puzzle_id}`", inline=True)
-            
-            if puzzle_fen and puzzle_fen != "FEN not available":
-                embed.add_field(name="Position (FEN)", value=f"`{puzzle_fen}`", inline=False)
-                
-            embed.add_field(name="Instructions", value="Find the best move sequence! Click the link in the title to solve on Lichess. React with 🔍 to reveal the solution.", inline=False)
-            embed.set_image(url=puzzle_image_url)
-            embed.set_footer(text=f"Puzzle ID: {puzzle_id} • From a game played on Lichess")
-            
             # Send the message using followup since we deferred earlier
-            message = await ctx.followup.send(embed=embed)
-            
-            # Add reaction for solution
-            await message.add_reaction("🔍")
-            
-            # Store the solution for later
-            self.bot.puzzle_solutions = getattr(self.bot, "puzzle_solutions", {})
-            self.bot.puzzle_solutions[message.id] = {
-                "solution": puzzle_solution, 
-                "puzzle_id": puzzle_id,
-                "timestamp": datetime.now().timestamp()
-            }
-            
-            logger.info(f"Posted puzzle {puzzle_id} via ID command")
+            await self.post_puzzle(ctx.followup.send, puzzle, BY_ID)
+            logger.info("Posted puzzle %s via ID command", puzzle.id)
         except Exception as e:
-            logger.error(f"Error posting puzzle via ID command: {e}", exc_info=True)
+            logger.error("Error posting puzzle via ID command: %s", e, exc_info=True)
             # Use followup for error since we deferred earlier
             try:
                 await ctx.followup.send("❌ An error occurred while posting the puzzle. Please try again later.")
@@ -457,91 +449,26 @@ class ChessPuzzle(commands.Cog):
     @discord.slash_command(name="randompuzzle", description="Get a random puzzle from Lichess")
     async def random_puzzle_slash(self, ctx, 
                                   min_rating: discord.Option(int, "Minimum rating", required=False, default=1500),
-                                  max_rating: discord.Option(int, "Maximum rating", required=False, default=2000)):
+                                  max_rating: discord.Option(int, "Maximum rating", required=False, default=2000),
+                                  theme: discord.Option(str, "Puzzle theme, e.g. fork or mateIn2", required=False, default=None)):
         """Slash command to fetch and post a random puzzle within a rating range."""
         # Defer first to give us time to fetch the puzzle
         await ctx.defer()
         
-        # Validate rating range
-        if min_rating < 600 or min_rating > 3000:
-            min_rating = 1500
-        if max_rating < 600 or max_rating > 3000 or max_rating < min_rating:
-            max_rating = min_rating + 500
-            if max_rating > 3000:
-                max_rating = 3000
+        min_rating, max_rating = self.clamp_rating_range(min_rating, max_rating)
         
         # Fetch a random puzzle
-        puzzle_data = await self.fetch_random_puzzle(min_rating, max_rating)
-        if not puzzle_data:
+        puzzle = await self.next_random_puzzle(min_rating, max_rating, theme)
+        if not puzzle:
             await ctx.followup.send("❌ Failed to fetch a random puzzle from Lichess. Please try again later.")
             return
         
-        # Post the random puzzle with the same format as the daily puzzle
         try:
-            # Log the data structure for debugging
-            logger.debug(f"Random puzzle data structure: {puzzle_data}")
-            
-            # Check if the puzzle data has the expected structure
-            if 'puzzle' not in puzzle_data:
-                await ctx.followup.send("❌ Received unexpected data format from Lichess API. Please try again later.")
-                logger.error(f"Unexpected random puzzle data format: {puzzle_data}")
-                return
-            
-            # Extract data with proper error handling
-            puzzle = puzzle_data['puzzle']
-            puzzle_id = puzzle.get('id', 'Unknown')
-            puzzle_fen = puzzle.get('fen')
-            
-            if not puzzle_fen:
-                # Try alternative field names or structure
-                if 'game' in puzzle_data and 'fen' in puzzle_data['game']:
-                    puzzle_fen = puzzle_data['game']['fen']
-                else:
-                    # Use a default message if FEN is not available
-                    puzzle_fen = "FEN not available"
-            
-            puzzle_rating = puzzle.get('rating', 'Unknown')
-            puzzle_solution = puzzle.get('solution', [])
-            
-            # Create puzzle image URL
-            puzzle_image_url = f"https://lichess1.org/game/export/gif/puzzle/{puzzle_id}.gif"
-            
-            # Create the embed
-            embed = discord.Embed(
-                title=f"🧩 Random Chess Puzzle (Rating: {puzzle_rating})",
-                description=f"Test your skills with this random puzzle from Lichess!",
-                color=discord.Color.gold(),
-                url=f"https://lichess.org/training/{puzzle_id}"
-            )
-            
-            embed.add_field(name="Rating", value=str(puzzle_rating), inline=True)
-            embed.add_field(name="Rating Range", value=f"{min_rating}-{max_rating}", inline=True)
-            embed.add_field(name="Puzzle ID", value=f"`{puzzle_id}`", inline=True)
-            
-            if puzzle_fen and puzzle_fen != "FEN not available":
-                embed.add_field(name="Position (FEN)", value=f"`{puzzle_fen}`", inline=False)
-                
-            embed.add_field(name="Instructions", value="Find the best move sequence! Click the link in the title to solve on Lichess. React with 🔍 to reveal the solution.", inline=False)
-            embed.set_image(url=puzzle_image_url)
-            embed.set_footer(text=f"Puzzle ID: {puzzle_id} • From a game played on Lichess")
-            
             # Send the message using followup since we deferred earlier
-            message = await ctx.followup.send(embed=embed)
-            
-            # Add reaction for solution
-            await message.add_reaction("🔍")
-            
-            # Store the solution for later
-            self.bot.puzzle_solutions = getattr(self.bot, "puzzle_solutions", {})
-            self.bot.puzzle_solutions[message.id] = {
-                "solution": puzzle_solution, 
-                "puzzle_id": puzzle_id,
-                "timestamp": datetime.now().timestamp()
-            }
-            
-            logger.info(f"Posted random puzzle {puzzle_id} with rating {puzzle_rating}")
+            await self.post_puzzle(ctx.followup.send, puzzle, RANDOM, rating_range=(min_rating, max_rating), theme=theme)
+            logger.info("Posted random puzzle %s with rating %s", puzzle.id, puzzle.rating)
         except Exception as e:
-            logger.error(f"Error posting random puzzle: {e}", exc_info=True)
+            logger.error("Error posting random puzzle: %s", e, exc_info=True)
             # Use followup for error since we deferred earlier
             try:
                 await ctx.followup.send("❌ An error occurred while posting the puzzle. Please try again later.")
@@ -554,21 +481,13 @@ class ChessPuzzle(commands.Cog):
         """Traditional command to manually fetch and post today's puzzle."""
         # Do NOT call the slash command handler directly
         try:
-            puzzle_data = await self.fetch_daily_puzzle()
-            if not puzzle_data:
+            puzzle = await self.fetch_daily_puzzle()
+            if not puzzle:
                 await ctx.send("❌ Failed to fetch today's puzzle from Lichess. Please try again later.")
                 return
-            if 'puzzle' not in puzzle_data:
-                await ctx.send("❌ Received unexpected data format from Lichess API. Please try again later.")
-                logger.error(f"Unexpected puzzle data format: {puzzle_data}")
-                return
-            puzzle = puzzle_data['puzzle']
-            puzzle_id = puzzle.get('id', 'Unknown')
-            puzzle_rating = puzzle.get('rating', 'Unknown')
-            puzzle_image_url = f"https://lichess1.org/game/export/gif/puzzle/{puzzle_id}.gif"
-            await ctx.send(f"🧩 **Today's Chess Puzzle**\nRating: {puzzle_rating}\nPuzzle ID: `{puzzle_id}`\nSolve: https://lichess.org/training/{puzzle_id}\n{puzzle_image_url}")
+            await ctx.send(f"🧩 **Today's Chess Puzzle**\nRating: {puzzle.rating}\nPuzzle ID: `{puzzle.id}`\nSolve: {puzzle.training_url}\n{puzzle.image_url}")
         except Exception as e:
-            logger.error(f"Error posting puzzle via prefix command: {e}")
+            logger.error("Error posting puzzle via prefix command: %s", e)
             await ctx.send("❌ An error occurred while posting the puzzle. Please try again later.")
     
     @commands.command(name="puzzleid")
@@ -580,162 +499,33 @@ class ChessPuzzle(commands.Cog):
         
         try:
             # Fetch the puzzle by ID
-            puzzle_data = await self.fetch_puzzle_by_id(puzzle_id)
-            if not puzzle_data:
+            puzzle = await self.fetch_puzzle_by_id(puzzle_id)
+            if not puzzle:
                 await ctx.send(f"❌ Failed to fetch puzzle with ID `{puzzle_id}` from Lichess. Please check the ID and try again.")
                 return
             
-            # Post the puzzle with the same format as the daily puzzle
-            # Log the data structure for debugging
-            logger.debug(f"Puzzle ID data structure: {puzzle_data}")
-            
-            # Check if the puzzle data has the expected structure
-            if 'puzzle' not in puzzle_data:
-                await ctx.send(f"❌ Received unexpected data format from Lichess API for puzzle ID {puzzle_id}. Please try again later.")
-                logger.error(f"Unexpected puzzle data format for ID {puzzle_id}: {puzzle_data}")
-                return
-            
-            # Extract data with proper error handling
-            puzzle = puzzle_data['puzzle']
-            puzzle_fen = puzzle.get('fen')
-            
-            if not puzzle_fen:
-                # Try alternative field names or structure
-                if 'game' in puzzle_data and 'fen' in puzzle_data['game']:
-                    puzzle_fen = puzzle_data['game']['fen']
-                else:
-                    # Use a default message if FEN is not available
-                    puzzle_fen = "FEN not available"
-            
-            puzzle_rating = puzzle.get('rating', 'Unknown')
-            puzzle_plays = puzzle.get('plays', 0)
-            puzzle_solution = puzzle.get('solution', [])
-            
-            # Create puzzle image URL
-            puzzle_image_url = f"https://lichess1.org/game/export/gif/puzzle/{puzzle_id}.gif"
-            
-            # Create the embed
-            embed = discord.Embed(
-                title=f"🧩 Chess Puzzle {puzzle_id}",
-                description="Test your skills with this chess puzzle from Lichess!",
-                color=discord.Color.gold(),
-                url=f"https://lichess.org/training/{puzzle_id}"
-            )
-            
-            embed.add_field(name="Rating", value=str(puzzle_rating), inline=True)
-            if puzzle_plays:
-                embed.add_field(name="Played", value=f"{puzzle_plays} times", inline=True)
-            embed.add_field(name="Puzzle ID", value=f"`{puzzle_id}`", inline=True)
-            
-            if puzzle_fen and puzzle_fen != "FEN not available":
-                embed.add_field(name="Position (FEN)", value=f"`{puzzle_fen}`", inline=False)
-                
-            embed.add_field(name="Instructions", value="Find the best move sequence! Click the link in the title to solve on Lichess. React with 🔍 to reveal the solution.", inline=False)
-            embed.set_image(url=puzzle_image_url)
-            embed.set_footer(text=f"Puzzle ID: {puzzle_id} • From a game played on Lichess")
-            
-            # Send the message
-            message = await ctx.send(embed=embed)
-            
-            # Add reaction for solution
-            await message.add_reaction("🔍")
-            
-            # Store the solution for later
-            self.bot.puzzle_solutions = getattr(self.bot, "puzzle_solutions", {})
-            self.bot.puzzle_solutions[message.id] = {
-                "solution": puzzle_solution, 
-                "puzzle_id": puzzle_id,
-                "timestamp": datetime.now().timestamp()
-            }
-            
-            logger.info(f"Posted puzzle {puzzle_id} via ID command")
+            await self.post_puzzle(ctx.send, puzzle, BY_ID)
+            logger.info("Posted puzzle %s via ID command", puzzle.id)
         except Exception as e:
-            logger.error(f"Error posting puzzle via ID command: {e}", exc_info=True)
+            logger.error("Error posting puzzle via ID command: %s", e, exc_info=True)
             await ctx.send("❌ An error occurred while posting the puzzle. Please try again later.")
     
     @commands.command(name="randompuzzle")
-    async def random_puzzle_prefix(self, ctx, min_rating: int = 1500, max_rating: int = 2000):
+    async def random_puzzle_prefix(self, ctx, min_rating: int = 1500, max_rating: int = 2000, theme: str = None):
         """Traditional command to fetch and post a random puzzle within a rating range."""
         try:
-            # Validate rating range
-            if min_rating < 600 or min_rating > 3000:
-                min_rating = 1500
-            if max_rating < 600 or max_rating > 3000 or max_rating < min_rating:
-                max_rating = min_rating + 500
-                if max_rating > 3000:
-                    max_rating = 3000
+            min_rating, max_rating = self.clamp_rating_range(min_rating, max_rating)
             
             # Fetch a random puzzle
-            puzzle_data = await self.fetch_random_puzzle(min_rating, max_rating)
-            if not puzzle_data:
+            puzzle = await self.next_random_puzzle(min_rating, max_rating, theme)
+            if not puzzle:
                 await ctx.send("❌ Failed to fetch a random puzzle from Lichess. Please try again later.")
                 return
             
-            # Post the random puzzle with the same format as the daily puzzle
-            # Log the data structure for debugging
-            logger.debug(f"Random puzzle data structure: {puzzle_data}")
-            
-            # Check if the puzzle data has the expected structure
-            if 'puzzle' not in puzzle_data:
-                await ctx.send("❌ Received unexpected data format from Lichess API. Please try again later.")
-                logger.error(f"Unexpected random puzzle data format: {puzzle_data}")
-                return
-            
-            # Extract data with proper error handling
-            puzzle = puzzle_data['puzzle']
-            puzzle_id = puzzle.get('id', 'Unknown')
-            puzzle_fen = puzzle.get('fen')
-            
-            if not puzzle_fen:
-                # Try alternative field names or structure
-                if 'game' in puzzle_data and 'fen' in puzzle_data['game']:
-                    puzzle_fen = puzzle_data['game']['fen']
-                else:
-                    # Use a default message if FEN is not available
-                    puzzle_fen = "FEN not available"
-            
-            puzzle_rating = puzzle.get('rating', 'Unknown')
-            puzzle_solution = puzzle.get('solution', [])
-            
-            # Create puzzle image URL
-            puzzle_image_url = f"https://lichess1.org/game/export/gif/puzzle/{puzzle_id}.gif"
-            
-            # Create the embed
-            embed = discord.Embed(
-                title=f"🧩 Random Chess Puzzle (Rating: {puzzle_rating})",
-                description=f"Test your skills with this random puzzle from Lichess!",
-                color=discord.Color.gold(),
-                url=f"https://lichess.org/training/{puzzle_id}"
-            )
-            
-            embed.add_field(name="Rating", value=str(puzzle_rating), inline=True)
-            embed.add_field(name="Rating Range", value=f"{min_rating}-{max_rating}", inline=True)
-            embed.add_field(name="Puzzle ID", value=f"`{puzzle_id}`", inline=True)
-            
-            if puzzle_fen and puzzle_fen != "FEN not available":
-                embed.add_field(name="Position (FEN)", value=f"`{puzzle_fen}`", inline=False)
-                
-            embed.add_field(name="Instructions", value="Find the best move sequence! Click the link in the title to solve on Lichess. React with 🔍 to reveal the solution.", inline=False)
-            embed.set_image(url=puzzle_image_url)
-            embed.set_footer(text=f"Puzzle ID: {puzzle_id} • From a game played on Lichess")
-            
-            # Send the message
-            message = await ctx.send(embed=embed)
-            
-            # Add reaction for solution
-            await message.add_reaction("🔍")
-            
-            # Store the solution for later
-            self.bot.puzzle_solutions = getattr(self.bot, "puzzle_solutions", {})
-            self.bot.puzzle_solutions[message.id] = {
-                "solution": puzzle_solution, 
-                "puzzle_id": puzzle_id,
-                "timestamp": datetime.now().timestamp()
-            }
-            
-            logger.info(f"Posted random puzzle {puzzle_id} with rating {puzzle_rating}")
+            await self.post_puzzle(ctx.send, puzzle, RANDOM, rating_range=(min_rating, max_rating), theme=theme)
+            logger.info("Posted random puzzle %s with rating %s", puzzle.id, puzzle.rating)
         except Exception as e:
-            logger.error(f"Error posting random puzzle: {e}", exc_info=True)
+            logger.error("Error posting random puzzle: %s", e, exc_info=True)
             await ctx.send("❌ An error occurred while posting the puzzle. Please try again later.")
 
 def setup(bot):
@@ -1,7 +1,8 @@
 import discord
 from discord.ext import commands
+from discord import SlashCommandGroup, Option
 import logging
-import re
+from utils.keyword_matcher import GuildTriggers, normalize_keyword
 
 logger = logging.getLogger("safari_buddy.reactions")
 
@@ -11,26 +12,19 @@ class Reactions(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         
-        # Define keyword-to-emoji mappings
-        self.reaction_triggers = {
-            r"checkmate": "🫡",
-            r"chess": "♟️",
-            r"queen": "👑", 
-            r"king": "🤴",
-            r"safari": "🦁",
-            r"jungle": "🌴",
-            r"banana": "🍌",
-            r"victory": "🏆",
-            r"tournament": "🏅",
-            r"rating": "📈",
-            r"blunder": "😱",
-            r"brilliant": "💫",
-            r"puzzle": "🧩"
-        }
-        
-        # Compile regex patterns for efficiency
-        self.patterns = {keyword: re.compile(rf"\b{keyword}\b", re.IGNORECASE) 
-                        for keyword in self.reaction_triggers}
+        # Keyword-to-emoji mappings, compiled into one matcher per guild
+        self.triggers = GuildTriggers.from_env()
+    
+    def cog_unload(self):
+        """Clean up when the cog is unloaded."""
+        self.triggers.close()
+    
+    def may_be_command(self, message):
+        """Cheap check before building a command context: does the message start with a prefix?"""
+        prefix = self.bot.command_prefix
+        if callable(prefix):
+            return True
+        return message.content.startswith(prefix if isinstance(prefix, str) else tuple(prefix))
     
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -39,20 +33,67 @@ class Reactions(commands.Cog):
         if message.author.bot:
             return
         
+        emojis = self.triggers.matcher(message.guild.id if message.guild else None).match(message.content)
+        if not emojis:
+            return
+        
         # Skip command messages
-        ctx = await self.bot.get_context(message)
-        if ctx.valid:
+        if self.may_be_command(message):
+            ctx = await self.bot.get_context(message)
+            if ctx.valid:
+                return
+        
+        # Add a reaction for each trigger word
+        for emoji in emojis:
+            try:
+                await message.add_reaction(emoji)
+                logger.debug("Added %s reaction to message", emoji)
+            except discord.errors.HTTPException as e:
+                logger.error("Error adding reaction: %s", e)
+    
+    reactions_group = SlashCommandGroup(
+        "reactions",
+        "Choose which words the bot reacts to in this server",
+        default_member_permissions=discord.Permissions(administrator=True),
+        # Server settings: default_member_permissions does not apply in DMs
+        contexts={discord.InteractionContextType.guild}
+    )
+    
+    @reactions_group.command(name="add", description="React with an emoji whenever a word is used")
+    async def reactions_add(self, ctx,
+                            keyword: Option(str, "Word or short phrase", required=True),
+                            emoji: Option(str, "Emoji to react with", required=True)):
+        word = normalize_keyword(keyword)
+        emoji = emoji.strip()
+        if not word:
+            await ctx.respond(f"❌ `{keyword}` can't be used as a trigger word.", ephemeral=True)
+            return
+        if not emoji or " " in emoji or len(emoji) > 64:
+            await ctx.respond("❌ Please give a single emoji.", ephemeral=True)
             return
         
-        # Check for trigger words and add reactions
-        for keyword, pattern in self.patterns.items():
-            if pattern.search(message.content):
-                try:
-                    emoji = self.reaction_triggers[keyword]
-                    await message.add_reaction(emoji)
-                    logger.debug(f"Added {emoji} reaction to message containing '{keyword}'")
-                except discord.errors.HTTPException as e:
-                    logger.error(f"Error adding reaction: {e}")
+        self.triggers.add(ctx.guild.id, word, emoji)
+        logger.info("Added reaction trigger '%s' in %s", word, ctx.guild.name)
+        await ctx.respond(f"✅ Reacting with {emoji} to **{word}**.", ephemeral=True)
+    
+    @reactions_group.command(name="remove", description="Stop reacting to a word")
+    async def reactions_remove(self, ctx, keyword: Option(str, "Word or short phrase", required=True)):
+        word = normalize_keyword(keyword) or keyword
+        if self.triggers.remove(ctx.guild.id, word):
+            await ctx.respond(f"✅ No longer reacting to **{word}**.", ephemeral=True)
+        else:
+            await ctx.respond(f"ℹ️ **{word}** isn't a trigger word here.", ephemeral=True)
+    
+    @reactions_group.command(name="reset", description="Go back to the default trigger words")
+    async def reactions_reset(self, ctx):
+        self.triggers.reset(ctx.guild.id)
+        await ctx.respond("✅ Trigger words reset to the defaults.", ephemeral=True)
+    
+    @reactions_group.command(name="list", description="Show the words the bot reacts to")
+    async def reactions_list(self, ctx):
+        triggers = self.triggers.triggers(ctx.guild.id)
+        lines = [f"{emoji} **{keyword}**" for keyword, emoji in triggers.items()]
+        await ctx.respond("\n".join(lines) or "No trigger words.", ephemeral=True)
 
 def setup(bot):
-    return bot.add_cog(Reactions(bot))
\ No newline at end of file
+    return bot.add_cog(Reactions(bot))
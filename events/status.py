@@ -0,0 +1,62 @@
+import os
+from discord.ext import commands, tasks
+from utils.status import get_status_snapshot
+
+class StatusTracker(commands.Cog):
+    """Keeps the status snapshot served by /status up to date from gateway events."""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.snapshot = get_status_snapshot(bot)
+        self.snapshot.tracked = True
+        self.refresh_snapshot.change_interval(seconds=float(os.getenv("STATUS_REFRESH_INTERVAL", "10")))
+        self.refresh_snapshot.start()
+    
+    def cog_unload(self):
+        """Clean up when the cog is unloaded."""
+        self.refresh_snapshot.cancel()
+        self.snapshot.tracked = False
+    
+    @tasks.loop(seconds=10)
+    async def refresh_snapshot(self):
+        self.snapshot.refresh()
+    
+    @commands.Cog.listener()
+    async def on_connect(self):
+        self.snapshot.set_shard(None, "connected")
+    
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self.snapshot.set_shard(None, "ready")
+        self.snapshot.refresh()
+    
+    @commands.Cog.listener()
+    async def on_resumed(self):
+        self.snapshot.set_shard(None, "resumed")
+    
+    @commands.Cog.listener()
+    async def on_disconnect(self):
+        self.snapshot.set_shard(None, "disconnected")
+    
+    @commands.Cog.listener()
+    async def on_shard_ready(self, shard_id):
+        self.snapshot.set_shard(shard_id, "ready")
+    
+    @commands.Cog.listener()
+    async def on_shard_resumed(self, shard_id):
+        self.snapshot.set_shard(shard_id, "resumed")
+    
+    @commands.Cog.listener()
+    async def on_shard_disconnect(self, shard_id):
+        self.snapshot.set_shard(shard_id, "disconnected")
+    
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.snapshot.set_guilds(len(self.bot.guilds))
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.snapshot.set_guilds(len(self.bot.guilds))
+
+def setup(bot):
+    return bot.add_cog(StatusTracker(bot))
@@ -1,17 +1,25 @@
 import discord
 from discord.ext import commands, tasks
+from discord import SlashCommandGroup, Option
 import os
 import logging
-import aiohttp
 import json
-from dotenv import load_dotenv
-from datetime import datetime, timedelta
-
-# Load environment variables
-load_dotenv()
+import time
+import asyncio
+from collections import OrderedDict
+from utils.http_client import get_http_client
+from utils.twitch_eventsub import EventSubHandler, parse_timestamp
+from utils.twitch_scheduler import AdaptivePollScheduler
+from utils.twitch_auth import TwitchTokenManager
+from utils.fanout import FanOut
+from utils.channel_index import get_channel_index, LIVE
+from utils.twitch_watchlist import TwitchWatchlist, normalize_login, batches
 
 logger = logging.getLogger("safari_buddy.twitch")
 
+# Stream IDs remembered so one stream is never announced twice
+ANNOUNCED_STREAMS = 1000
+
 class TwitchNotifier(commands.Cog):
     """Handles Twitch live notifications."""
     
@@ -20,21 +28,119 @@ class TwitchNotifier(commands.Cog):
         self.twitch_client_id = os.getenv('TWITCH_CLIENT_ID')
         self.twitch_client_secret = os.getenv('TWITCH_CLIENT_SECRET')
         self.twitch_channel_name = os.getenv('TWITCH_CHANNEL', 'chesssafari')
-        self.announcement_channel_name = os.getenv('ANNOUNCEMENT_CHANNEL', 'live-now')
-        self.is_live = False
-        self.access_token = None
-        self.token_expires = datetime.utcnow()
+        # Twitch endpoints, overridable to point the cog at a local fake
+        self.twitch_auth_base = os.getenv('TWITCH_AUTH_BASE', 'https://id.twitch.tv').rstrip('/')
+        self.twitch_api_base = os.getenv('TWITCH_API_BASE', 'https://api.twitch.tv/helix').rstrip('/')
+        
+        # Shared pooled HTTP client and channel index
+        self.http = get_http_client(bot).acquire()
+        self.channels = get_channel_index(bot)
+        
+        # App access token, refreshed in the background before it expires
+        self.tokens = TwitchTokenManager(
+            self.http,
+            self.twitch_client_id,
+            self.twitch_client_secret,
+            auth_base=self.twitch_auth_base,
+            refresh_margin=float(os.getenv('TWITCH_TOKEN_REFRESH_MARGIN', '300'))
+        )
+        
+        # Channels to announce per guild, and login -> stream ID for channels currently live
+        self.watchlist = TwitchWatchlist.from_env(self.twitch_channel_name)
+        self.live_streams = {}
+        self.announced_streams = OrderedDict()
+        self.helix_stream_requests = 0
+        self.last_poll_requests = 0
+        
+        # Concurrent delivery of announcements to every guild
+        self.fanout = FanOut.from_env()
+        self.last_fanout = None
+        
+        # Adapts the poll interval to past go-live times, errors and the Helix rate limit
+        history_since = time.time() - float(os.getenv('TWITCH_POLL_HISTORY_DAYS', '56')) * 86400
+        self.scheduler = AdaptivePollScheduler.from_env(self.watchlist.go_live_history(history_since))
+        
+        # EventSub webhooks, served by the API cog; polling stays on as a fallback
+        self.eventsub = None
+        self.eventsub_callback = os.getenv('TWITCH_EVENTSUB_CALLBACK')
+        eventsub_secret = os.getenv('TWITCH_EVENTSUB_SECRET')
+        self.user_ids = {}
+        self._subscribe_task = None
+        # login -> when EventSub reported it live; Helix can take a while to list a new stream,
+        # so polls do not mark these offline within the grace period
+        self.eventsub_live = {}
+        self.eventsub_grace = float(os.getenv('TWITCH_EVENTSUB_GRACE', '600'))
         
         # Start the background task if credentials are provided
         if self.twitch_client_id and self.twitch_client_secret and self.twitch_client_id != "your_twitch_client_id":
             self.check_twitch_stream.start()
             logger.info("Twitch notifications enabled.")
+            if self.eventsub_callback and eventsub_secret:
+                self.eventsub = EventSubHandler(eventsub_secret)
+                self.eventsub.on("stream.online", self.on_stream_online)
+                self.eventsub.on("stream.offline", self.on_stream_offline)
+                logger.info("Twitch EventSub enabled with callback %s", self.eventsub_callback)
         else:
             logger.warning("Twitch credentials not provided or are default values. Live notifications disabled.")
     
     def cog_unload(self):
         """Clean up when the cog is unloaded."""
         self.check_twitch_stream.cancel()
+        if self._subscribe_task:
+            self._subscribe_task.cancel()
+        self.tokens.close()
+        self.http.release()
+        self.watchlist.close()
+    
+    @property
+    def is_live(self):
+        """Whether the main channel is live."""
+        return self.watchlist.default_login in self.live_streams
+    
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Get a token ahead of the first poll and subscribe to EventSub once connected (on_ready also fires on reconnects)."""
+        if self.check_twitch_stream.is_running() and not self.tokens.stats()["has_token"]:
+            self.tokens.refresh()
+        if self.eventsub and self._subscribe_task is None:
+            self._subscribe_task = asyncio.ensure_future(self.subscribe_eventsub())
+    
+    watchlist_group = SlashCommandGroup(
+        "watchlist",
+        "Twitch channels announced in this server",
+        default_member_permissions=discord.Permissions(administrator=True),
+        # Server settings: default_member_permissions does not apply in DMs
+        contexts={discord.InteractionContextType.guild}
+    )
+    
+    @watchlist_group.command(name="add", description="Announce when a Twitch channel goes live")
+    async def watchlist_add(self, ctx, channel: Option(str, "Twitch login or channel URL", required=True)):
+        login = normalize_login(channel)
+        if not login:
+            await ctx.respond(f"❌ `{channel}` is not a valid Twitch channel name.", ephemeral=True)
+            return
+        if not self.watchlist.add(ctx.guild.id, login):
+            await ctx.respond(f"ℹ️ `{login}` is already on the watchlist.", ephemeral=True)
+            return
+        if self.eventsub:
+            asyncio.ensure_future(self.subscribe_eventsub())
+        await ctx.respond(f"✅ Live announcements enabled for `{login}`.", ephemeral=True)
+    
+    @watchlist_group.command(name="remove", description="Stop announcing a Twitch channel")
+    async def watchlist_remove(self, ctx, channel: Option(str, "Twitch login or channel URL", required=True)):
+        login = normalize_login(channel)
+        if login and login == self.watchlist.default_login:
+            await ctx.respond(f"❌ `{login}` is the main channel and is always announced.", ephemeral=True)
+        elif login and self.watchlist.remove(ctx.guild.id, login):
+            await ctx.respond(f"✅ `{login}` removed from the watchlist.", ephemeral=True)
+        else:
+            await ctx.respond(f"ℹ️ `{channel}` is not on the watchlist.", ephemeral=True)
+    
+    @watchlist_group.command(name="list", description="Show the Twitch channels announced in this server")
+    async def watchlist_list(self, ctx):
+        logins = self.watchlist.for_guild(ctx.guild.id)
+        lines = [f"{'🔴' if login in self.live_streams else '⚫'} `{login}`" for login in logins]
+        await ctx.respond("\n".join(lines) or "The watchlist is empty.", ephemeral=True)
     
     @discord.slash_command(name="go-live", description="Manually trigger a live notification")
     @discord.default_permissions(administrator=True)
@@ -56,151 +162,312 @@ class TwitchNotifier(commands.Cog):
         else:
             await ctx.send("❌ Failed to send live notification. Check logs for details.")
     
-    async def get_twitch_token(self):
-        """Get a Twitch API access token."""
+    async def helix(self, method, path, **kwargs):
+        """Call a Helix endpoint with the app token and return (status, JSON body or None).
+        
+        A 401 invalidates the token and the call is retried once with a new one.
+        Status is None when no token could be obtained.
+        """
         if not self.twitch_client_id or not self.twitch_client_secret:
             logger.error("Twitch credentials not provided")
-            return False
+            return None, None
         
-        # Check if we already have a valid token
-        if self.access_token and datetime.utcnow() < self.token_expires:
-            return True
-        
-        # Get a new token
+        url = f"{self.twitch_api_base}/{path}"
+        for attempt in range(2):
+            token = await self.tokens.get()
+            if not token:
+                return None, None
+            headers = {"Client-ID": self.twitch_client_id, "Authorization": f"Bearer {token}"}
+            async with self.http.request(method, url, headers=headers, **kwargs) as response:
+                self.scheduler.observe_rate_limit(response.headers)
+                if response.status == 401 and attempt == 0:
+                    self.tokens.invalidate(token)
+                    continue
+                data = await response.json() if response.status in (200, 202) else None
+                return response.status, data
+    
+    async def check_if_live(self, login=None):
+        """Check if a Twitch channel (the main one by default) is currently live."""
+        login = login or self.watchlist.default_login
+        streams = await self.fetch_live_streams([login])
+        return streams.get(login, False) if streams else False
+    
+    async def fetch_live_streams(self, logins):
+        """Return login -> stream data for the live channels among up to 100 logins, or None on error."""
         try:
-            async with aiohttp.ClientSession() as session:
-                url = "https://id.twitch.tv/oauth2/token"
-                params = {
-                    "client_id": self.twitch_client_id,
-                    "client_secret": self.twitch_client_secret,
-                    "grant_type": "client_credentials"
+            # Helix takes repeated user_login parameters; first=100 so no live channel is paged out
+            params = [("user_login", login) for login in logins] + [("first", str(len(logins)))]
+            
+            self.helix_stream_requests += 1
+            status, data = await self.helix("GET", "streams", params=params)
+            if status == 200:
+                return {
+                    stream["user_login"].lower(): stream
+                    for stream in data.get("data", [])
+                    if stream.get("type") == "live"
                 }
-                
-                async with session.post(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        self.access_token = data["access_token"]
-                        self.token_expires = datetime.utcnow() + timedelta(seconds=data["expires_in"] - 300)  # 5 minute buffer
-                        logger.info("Successfully obtained Twitch API token")
-                        return True
-                    else:
-                        logger.error(f"Failed to get Twitch API token. Status: {response.status}")
-                        return False
+            if status is not None:
+                logger.error("Failed to check Twitch streams. Status: %s", status)
+            return None
         except Exception as e:
-            logger.error(f"Error getting Twitch API token: {e}")
-            return False
+            logger.error("Error checking Twitch streams: %s", e)
+            return None
     
-    async def check_if_live(self):
-        """Check if the Twitch channel is currently live."""
-        if not await self.get_twitch_token():
-            return False
+    async def get_user_ids(self, logins):
+        """Look up Twitch user IDs for logins, 100 per request, caching the results."""
+        missing = [login for login in logins if login not in self.user_ids]
+        for batch in batches(missing):
+            status, data = await self.helix("GET", "users", params=[("login", login) for login in batch])
+            if status != 200:
+                logger.error("Failed to look up Twitch users. Status: %s", status)
+                continue
+            for user in data.get("data", []):
+                self.user_ids[user["login"].lower()] = user["id"]
         
+        return {login: self.user_ids[login] for login in logins if login in self.user_ids}
+    
+    async def subscribe_eventsub(self):
+        """Create stream.online/stream.offline subscriptions for watched channels that lack them."""
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"https://api.twitch.tv/helix/streams"
-                headers = {
-                    "Client-ID": self.twitch_client_id,
-                    "Authorization": f"Bearer {self.access_token}"
-                }
-                params = {
-                    "user_login": self.twitch_channel_name
-                }
-                
-                async with session.get(url, headers=headers, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        stream_data = data.get("data", [])
-                        
-                        if stream_data and stream_data[0].get("type") == "live":
-                            return stream_data[0]
-                        else:
-                            return False
+            user_ids = await self.get_user_ids(self.watchlist.logins)
+            if not user_ids:
+                return
+            
+            status, data = await self.helix("GET", "eventsub/subscriptions")
+            existing = data.get("data", []) if status == 200 else []
+            
+            active = {
+                (sub["type"], sub.get("condition", {}).get("broadcaster_user_id")) for sub in existing
+                if sub.get("transport", {}).get("callback") == self.eventsub_callback
+                and sub.get("status") in ("enabled", "webhook_callback_verification_pending")
+            }
+            
+            for login, broadcaster_id in user_ids.items():
+                for subscription_type in ("stream.online", "stream.offline"):
+                    if (subscription_type, broadcaster_id) in active:
+                        continue
+                    body = {
+                        "type": subscription_type,
+                        "version": "1",
+                        "condition": {"broadcaster_user_id": broadcaster_id},
+                        "transport": {
+                            "method": "webhook",
+                            "callback": self.eventsub_callback,
+                            "secret": self.eventsub.secret
+                        }
+                    }
+                    status, _ = await self.helix("POST", "eventsub/subscriptions", json=body)
+                    if status in (202, 409):
+                        logger.info("Subscribed to Twitch EventSub %s for %s", subscription_type, login)
                     else:
-                        logger.error(f"Failed to check Twitch stream. Status: {response.status}")
-                        return False
+                        logger.error("Failed to subscribe to EventSub %s for %s. Status: %s", subscription_type, login, status)
         except Exception as e:
-            logger.error(f"Error checking Twitch stream: {e}")
+            logger.error("Error subscribing to Twitch EventSub: %s", e)
+    
+    async def on_stream_online(self, event):
+        """EventSub stream.online: announce straight away instead of waiting for the next poll."""
+        login = event.get("broadcaster_user_login", "").lower()
+        if not self.watchlist.watches(login) or login in self.live_streams:
+            return
+        self.eventsub_live[login] = time.monotonic()
+        if not self.mark_live(login, event.get("id")):
+            return
+        self.record_go_live(login, event)
+        
+        # The event has no title or thumbnail; Helix usually has them by now
+        stream_data = await self.check_if_live(login) or {
+            "user_login": login,
+            "user_name": event.get("broadcaster_user_name", login),
+            "title": "Chess adventures await!",
+            "game_name": "Chess",
+            "viewer_count": 0
+        }
+        await self.announce(login, stream_data)
+        logger.info("%s went live (EventSub): %s", login, stream_data.get('title', 'No title'))
+    
+    async def on_stream_offline(self, event):
+        """EventSub stream.offline."""
+        login = event.get("broadcaster_user_login", "").lower()
+        self.eventsub_live.pop(login, None)
+        if self.live_streams.pop(login, False) is not False:
+            logger.info("%s went offline (EventSub)", login)
+    
+    def mark_live(self, login, stream_id):
+        """Record a channel as live; returns False if this stream was already announced."""
+        self.live_streams[login] = stream_id
+        if stream_id is None:
+            return True
+        if stream_id in self.announced_streams:
+            self.announced_streams.move_to_end(stream_id)
             return False
+        self.announced_streams[stream_id] = None
+        while len(self.announced_streams) > ANNOUNCED_STREAMS:
+            self.announced_streams.popitem(last=False)
+        return True
     
-    async def send_live_notification(self, stream_data=None):
-        """Send a live notification to the announcement channel."""
+    def record_go_live(self, login, stream_data):
+        """Store a go-live time so the poll scheduler learns the usual streaming hours."""
+        try:
+            started_at = parse_timestamp(stream_data["started_at"]).timestamp()
+        except (KeyError, ValueError):
+            started_at = time.time()
+        self.scheduler.record_go_live(started_at)
+        try:
+            self.watchlist.record_go_live(login, started_at)
+        except Exception as e:
+            logger.error("Error recording go-live time for %s: %s", login, e)
+    
+    async def announce(self, login, stream_data):
+        """Announce a live channel in every guild watching it."""
+        await self.send_live_notification(stream_data, self.watchlist.watching_guilds(login))
+    
+    def stats(self):
+        """Return live state, poll cost and EventSub delivery metrics."""
+        return {
+            "channel": self.twitch_channel_name,
+            "is_live": self.is_live,
+            "watched_channels": len(self.watchlist.logins),
+            "live_channels": sorted(self.live_streams),
+            "helix_stream_requests": self.helix_stream_requests,
+            "last_poll_requests": self.last_poll_requests,
+            "scheduler": self.scheduler.stats(),
+            "token": self.tokens.stats(),
+            "last_fanout": self.last_fanout,
+            "eventsub": self.eventsub.stats() if self.eventsub else None
+        }
+    
+    def find_announcement_channel(self, guild):
+        """Find the live announcement channel in a guild."""
+        return self.channels.get(guild, LIVE)
+    
+    def build_live_message(self, stream_data):
+        """Build the (content, embed) announcing a stream; built once per announcement."""
+        login = stream_data.get("user_login", self.twitch_channel_name).lower()
+        is_main = login == self.watchlist.default_login
+        name = "ChessSafari" if is_main else stream_data.get("user_name", login)
+        
+        embed = discord.Embed(
+            title=f"🔴 {name} is Live on Twitch!",
+            description=f"**{stream_data.get('title', 'Chess adventures await!')}**",
+            color=discord.Color.purple(),
+            url=f"https://twitch.tv/{login}"
+        )
+        
+        if stream_data.get("thumbnail_url"):
+            # Replace width and height in thumbnail URL
+            thumbnail = stream_data.get("thumbnail_url")
+            thumbnail = thumbnail.replace("{width}", "640").replace("{height}", "360")
+            embed.set_image(url=thumbnail)
+        
+        embed.add_field(
+            name="Playing", 
+            value=stream_data.get("game_name", "Chess"),
+            inline=True
+        )
+        
+        embed.add_field(
+            name="Viewers", 
+            value=stream_data.get("viewer_count", "0"),
+            inline=True
+        )
+        
+        embed.set_footer(text="Join the safari adventure! 🦁")
+        
+        # Build the message content; only the main channel pings @everyone
+        if is_main:
+            content = "@everyone 🦁 ChessSafari is live on Twitch! Come join the jungle adventure!"
+        else:
+            content = f"🦁 {name} is live on Twitch! Come join the jungle adventure!"
+        return content, embed
+    
+    async def send_live_notification(self, stream_data=None, guild_ids=None):
+        """Send a live notification to the announcement channel of every guild at once.
+        
+        guild_ids limits the guilds notified; None notifies every guild.
+        Returns True if at least one guild received it.
+        """
+        content, embed = self.build_live_message(stream_data or {})
+        
+        targets = []
         for guild in self.bot.guilds:
-            # Find the announcement channel
-            channel = discord.utils.get(guild.channels, name=self.announcement_channel_name)
-            
-            if not channel:
-                # Try to find a channel with "live" or "announcement" in the name
-                for ch in guild.channels:
-                    if isinstance(ch, discord.TextChannel) and ("live" in ch.name.lower() or "announcement" in ch.name.lower()):
-                        channel = ch
-                        break
-            
+            if guild_ids is not None and guild.id not in guild_ids:
+                continue
+            channel = self.find_announcement_channel(guild)
             if channel:
-                try:
-                    # Build the embed
-                    embed = discord.Embed(
-                        title="🔴 ChessSafari is Live on Twitch!",
-                        description=f"**{stream_data.get('title', 'Chess adventures await!')}**",
-                        color=discord.Color.purple(),
-                        url=f"https://twitch.tv/{self.twitch_channel_name}"
-                    )
-                    
-                    if stream_data and stream_data.get("thumbnail_url"):
-                        # Replace width and height in thumbnail URL
-                        thumbnail = stream_data.get("thumbnail_url")
-                        thumbnail = thumbnail.replace("{width}", "640").replace("{height}", "360")
-                        embed.set_image(url=thumbnail)
-                    
-                    embed.add_field(
-                        name="Playing", 
-                        value=stream_data.get("game_name", "Chess") if stream_data else "Chess",
-                        inline=True
-                    )
-                    
-                    embed.add_field(
-                        name="Viewers", 
-                        value=stream_data.get("viewer_count", "0") if stream_data else "0",
-                        inline=True
-                    )
-                    
-                    embed.set_footer(text="Join the safari adventure! 🦁")
-                    
-                    # Build the message content with @everyone mention
-                    content = "@everyone 🦁 ChessSafari is live on Twitch! Come join the jungle adventure!"
-                    
-                    await channel.send(content=content, embed=embed)
-                    logger.info(f"Sent live notification to {guild.name}")
-                    return True
-                except Exception as e:
-                    logger.error(f"Error sending live notification to {guild.name}: {e}")
+                targets.append((guild, channel))
             else:
-                logger.warning(f"Announcement channel not found in {guild.name}")
+                logger.warning("Announcement channel not found in %s", guild.name)
         
-        return False
+        if not targets:
+            return False
+        
+        report = await self.fanout.send(targets, content=content, embed=embed)
+        self.last_fanout = report.summary()
+        logger.info(
+            "Sent live notification to %s/%s guild(s) in %.0fms",
+            report.delivered, len(targets), report.wall_time * 1000
+        )
+        return report.delivered > 0
     
     @tasks.loop(minutes=5.0)
     async def check_twitch_stream(self):
-        """Check if the stream is live every 5 minutes."""
+        """Check every watched channel, 100 channels per Helix request.
+        
+        The delay before the next check comes from the adaptive scheduler.
+        """
         await self.bot.wait_until_ready()
         
         # Skip check if credentials aren't valid
         if not self.twitch_client_id or not self.twitch_client_secret or self.twitch_client_id == "your_twitch_client_id":
             return
         
+        success = False
         try:
-            stream_data = await self.check_if_live()
-            
-            if stream_data and not self.is_live:
-                # Stream just went live
-                self.is_live = True
-                await self.send_live_notification(stream_data)
-                logger.info(f"Stream went live: {stream_data.get('title', 'No title')}")
-            elif not stream_data and self.is_live:
-                # Stream went offline
-                self.is_live = False
-                logger.info("Stream went offline")
+            success = await self.poll_streams()
         except Exception as e:
-            logger.error(f"Error in check_twitch_stream task: {e}")
+            logger.error("Error in check_twitch_stream task: %s", e)
+        
+        delay = self.scheduler.next_delay(success, bool(self.live_streams), calls=max(1, self.last_poll_requests))
+        self.check_twitch_stream.change_interval(seconds=delay)
+        if not success:
+            logger.warning("Twitch poll failed, retrying in %.0fs", delay)
+    
+    async def poll_streams(self):
+        """Update live state for all watched channels and announce the ones that just went live.
+        
+        Returns False if any batch could not be checked.
+        """
+        requests_before = self.helix_stream_requests
+        success = True
+        for batch in batches(self.watchlist.logins):
+            streams = await self.fetch_live_streams(batch)
+            if streams is None:
+                # Keep the previous state rather than marking the batch offline
+                success = False
+                continue
+            
+            for login in batch:
+                stream_data = streams.get(login)
+                if stream_data:
+                    # Helix lists the stream, so EventSub's live state is confirmed
+                    self.eventsub_live.pop(login, None)
+                if stream_data and login not in self.live_streams:
+                    # Stream just went live, unless EventSub already announced it
+                    if self.mark_live(login, stream_data.get("id")):
+                        self.record_go_live(login, stream_data)
+                        await self.announce(login, stream_data)
+                        logger.info("%s went live: %s", login, stream_data.get('title', 'No title'))
+                elif not stream_data and login in self.live_streams:
+                    reported = self.eventsub_live.get(login)
+                    if reported is not None and time.monotonic() - reported < self.eventsub_grace:
+                        # Announced by EventSub and not listed by Helix yet
+                        continue
+                    # Stream went offline
+                    del self.live_streams[login]
+                    self.eventsub_live.pop(login, None)
+                    logger.info("%s went offline", login)
+        self.last_poll_requests = self.helix_stream_requests - requests_before
+        return success
 
 def setup(bot):
     return bot.add_cog(TwitchNotifier(bot))
\ No newline at end of file
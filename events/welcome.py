@@ -1,29 +1,39 @@
 import discord
 from discord.ext import commands
 import logging
+from utils.channel_index import get_channel_index, WELCOME
+from utils.join_rate import get_join_detector, MemberBatcher
 
 logger = logging.getLogger("safari_buddy.welcome")
 
+# Members mentioned by name in one aggregated welcome
+MAX_MENTIONS = 50
+
 class Welcome(commands.Cog):
     """Welcome new members and handle welcome channel messages."""
     
     def __init__(self, bot):
         self.bot = bot
+        self.channels = get_channel_index(bot)
+        # During a join raid, one welcome per interval instead of one per member
+        self.joins = get_join_detector(bot)
+        self.batcher = MemberBatcher(self.joins.aggregate_interval, self.welcome_many)
+    
+    def cog_unload(self):
+        """Clean up when the cog is unloaded."""
+        self.batcher.close()
     
     @commands.Cog.listener()
     async def on_member_join(self, member):
         """Event triggered when a new member joins the server."""
-        logger.info(f"New grandmaster joined: {member.name}#{member.discriminator} ({member.id})")
+        logger.info("New grandmaster joined: %s#%s (%s)", member.name, member.discriminator, member.id)
         
-        # Find the welcome channel
-        welcome_channel = discord.utils.get(member.guild.channels, name="welcome")
+        if self.joins.observe(member):
+            self.batcher.add(member.guild, member)
+            return
         
-        if not welcome_channel:
-            logger.warning(f"Welcome channel not found in {member.guild.name}")
-            for channel in member.guild.channels:
-                if isinstance(channel, discord.TextChannel) and "welcome" in channel.name.lower():
-                    welcome_channel = channel
-                    break
+        # Find the welcome channel
+        welcome_channel = self.channels.get(member.guild, WELCOME)
         
         if welcome_channel:
             # Send a welcome message with a fun safari theme
@@ -44,7 +54,33 @@ class Welcome(commands.Cog):
             
             await welcome_channel.send(embed=embed)
         else:
-            logger.error(f"Could not find welcome channel in {member.guild.name}")
+            logger.error("Could not find welcome channel in %s", member.guild.name)
+
+    async def welcome_many(self, guild, members):
+        """Welcome everyone who joined during the last interval of a raid in one message."""
+        welcome_channel = self.channels.get(guild, WELCOME)
+        if not welcome_channel:
+            logger.error("Could not find welcome channel in %s", guild.name)
+            return
+        
+        mentions = ", ".join(member.mention for member in members[:MAX_MENTIONS])
+        if len(members) > MAX_MENTIONS:
+            mentions += f" and {len(members) - MAX_MENTIONS} more"
+        welcome_message = (
+            f"🌴 Welcome to the jungle, {mentions}! "
+            f"Grab a banana and enjoy the vibes 🍌\n\n"
+            f"Make sure to check out the rules and introduce yourselves!"
+        )
+        
+        embed = discord.Embed(
+            title=f"{len(members)} New Safari Explorers",
+            description=welcome_message,
+            color=discord.Color.green()
+        )
+        embed.set_footer(text="Safari Buddy - Guiding you through the chess jungle")
+        
+        await welcome_channel.send(embed=embed)
+        self.joins.count_suppressed("welcome", len(members) - 1)
 
 def setup(bot):
     return bot.add_cog(Welcome(bot))
\ No newline at end of file
@@ -1,23 +1,25 @@
+import time
+# Measured before the heavy imports, for the startup-to-ready time and the uptime in /status
+STARTED = time.perf_counter()
+STARTED_AT = time.time()
+
 import os
 import logging
 import discord
 from discord.ext import commands
 import asyncio
 from dotenv import load_dotenv
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("safari_buddy.log"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger("safari_buddy")
+from utils.log_pipeline import LogPipeline
+from utils.startup import ExtensionLoader
+from utils.command_sync import CommandSync
 
 # Load environment variables
 load_dotenv()
+
+# Configure logging; file and console writes happen on a background thread
+log_pipeline = LogPipeline.from_env().start()
+logger = logging.getLogger("safari_buddy")
+
 TOKEN = os.getenv('DISCORD_TOKEN')
 PREFIX = os.getenv('COMMAND_PREFIX', '!')
 
@@ -27,12 +29,16 @@ intents.members = True
 intents.message_content = True
 
 # Initialize bot with slash commands
-bot = commands.Bot(command_prefix=PREFIX, intents=intents, help_command=None)
+# Commands are synced by CommandSync, not by py-cord on every connect
+bot = commands.Bot(command_prefix=PREFIX, intents=intents, help_command=None, auto_sync_commands=False)
+bot.started_at = STARTED_AT
+command_sync = CommandSync.from_env()
+ready_after = None
 
 @bot.event
 async def on_ready():
     """Event triggered when the bot is ready and connected to Discord."""
-    logger.info(f'Logged in as {bot.user.name} ({bot.user.id})')
+    logger.info('Logged in as %s (%s)', bot.user.name, bot.user.id)
     await bot.change_presence(
         activity=discord.Activity(
             type=discord.ActivityType.watching, 
@@ -40,48 +46,50 @@ async def on_ready():
         )
     )
     
-    # Register the application commands
+    # Register the application commands that changed since the last sync (once per process)
     try:
-        synced = await bot.sync_commands()
-        if synced:
-            logger.info(f"Synced {len(synced)} command(s)")
-        else:
-            logger.info("Command sync completed, but no commands were returned")
+        await command_sync.sync(bot)
     except Exception as e:
-        logger.error(f"Error syncing commands: {e}")
+        logger.error("Error syncing commands: %s", e)
     
-    logger.info("Bot is ready!")
+    global ready_after
+    if ready_after is None:
+        ready_after = time.perf_counter() - STARTED
+        logger.info("Bot is ready! (%.2fs after startup)", ready_after)
+    else:
+        logger.info("Bot is ready!")
 
 async def load_extensions():
-    """Load all cogs from the commands and events directories."""
-    # Load command cogs
-    for filename in os.listdir('./commands'):
-        if filename.endswith('.py'):
-            # bot.load_extension doesn't return a coroutine, so no await needed
-            bot.load_extension(f'commands.{filename[:-3]}')
-            logger.info(f'Loaded command extension: {filename[:-3]}')
-    
-    # Load event cogs
-    for filename in os.listdir('./events'):
-        if filename.endswith('.py'):
-            # bot.load_extension doesn't return a coroutine, so no await needed
-            bot.load_extension(f'events.{filename[:-3]}')
-            logger.info(f'Loaded event extension: {filename[:-3]}')
-    
-    # Load API extension if exists
-    if os.path.exists('./utils/api.py'):
-        bot.load_extension('utils.api')
-        logger.info('Loaded API extension')
+    """Load the cogs of every enabled feature and log how long each took."""
+    loader = ExtensionLoader.from_env(bot)
+    loader.load_all()
+    loader.report()
+    logger.info("Extensions loaded %.2fs after startup", time.perf_counter() - STARTED)
 
 async def main():
     """Main entry point for the bot."""
     async with bot:
         await load_extensions()
-        await bot.start(TOKEN)
+        try:
+            await bot.start(TOKEN)
+        finally:
+            # Send queued mod-log entries while the Discord connection can still be used
+            logging_cog = bot.get_cog("Logging")
+            if logging_cog:
+                await logging_cog.shutdown()
+            # Close pooled HTTP connections shared by the cogs
+            http_client = getattr(bot, "http_client", None)
+            if http_client:
+                await http_client.close()
+            channel_index = getattr(bot, "channel_index", None)
+            if channel_index:
+                channel_index.close()
+            command_sync.close()
 
 if __name__ == "__main__":
     if not TOKEN:
         logger.error("DISCORD_TOKEN not found in environment variables. Please check your .env file.")
+        log_pipeline.stop()
         exit(1)
     
     try:
@@ -89,4 +97,6 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logger.info("Bot shutdown initiated by user")
     except Exception as e:
-        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
\ No newline at end of file
+        logger.error("An unexpected error occurred: %s", e, exc_info=True)
+    finally:
+        log_pipeline.stop()
\ No newline at end of file
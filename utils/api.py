@@ -4,15 +4,13 @@ import os
 import logging
 import asyncio
 import uvicorn
-from fastapi import FastAPI, Depends, HTTPException, Security, status
+from fastapi import FastAPI, Depends, HTTPException, Security, status, Request, Response
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel
+from utils.status import get_status_snapshot
+from utils.metrics import REGISTRY, CONTENT_TYPE
 from typing import Optional, Dict
 import threading
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
 logger = logging.getLogger("safari_buddy.api")
 
@@ -20,6 +18,7 @@ logger = logging.getLogger("safari_buddy.api")
 API_KEY = os.getenv("API_KEY", "")
 API_KEY_NAME = "X-API-Key"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
+_warned_no_api_key = False
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -36,6 +35,10 @@ class StatusResponse(BaseModel):
     status: str
     guilds: int
     uptime: str
+    started_at: str
+    latency_ms: Optional[int] = None
+    shards: Dict[str, str]
+    caches: Dict[str, int]
 
 class LiveNotificationRequest(BaseModel):
     message: Optional[str] = None
@@ -44,9 +47,12 @@ class LiveNotificationRequest(BaseModel):
 
 # Dependency to check API key
 async def get_api_key(api_key: str = Security(api_key_header)):
+    global _warned_no_api_key
     if not API_KEY:
         # If no API key is set, allow all requests (not recommended for production)
-        logger.warning("No API key set. All API requests will be allowed.")
+        if not _warned_no_api_key:
+            logger.warning("No API key set. All API requests will be allowed.")
+            _warned_no_api_key = True
         return True
     
     if api_key == API_KEY:
@@ -63,21 +69,82 @@ async def root():
     return {"message": "Safari Buddy API is running"}
 
 @app.get("/status", tags=["Bot"], response_model=StatusResponse, dependencies=[Depends(get_api_key)])
-async def get_status():
-    """Get current bot status"""
+async def get_status(request: Request):
+    """Get current bot status (supports If-None-Match; the body is precomputed)"""
+    if not BOT_INSTANCE:
+        raise HTTPException(status_code=503, detail="Bot not connected")
+    
+    snapshot = get_status_snapshot(BOT_INSTANCE).current()
+    snapshot.served += 1
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if snapshot.matches(request.headers.get("if-none-match")):
+        snapshot.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+@app.get("/stats/http", tags=["Bot"], dependencies=[Depends(get_api_key)])
+async def get_http_stats():
+    """Get connection reuse and latency metrics for the shared HTTP client"""
+    if not BOT_INSTANCE:
+        raise HTTPException(status_code=503, detail="Bot not connected")
+    
+    http_client = getattr(BOT_INSTANCE, "http_client", None)
+    if not http_client:
+        raise HTTPException(status_code=503, detail="HTTP client not initialized")
+    
+    return http_client.stats()
+
+@app.get("/stats/puzzle", tags=["Bot"], dependencies=[Depends(get_api_key)])
+async def get_puzzle_stats():
+    """Get cache metrics for the puzzle subsystem"""
+    if not BOT_INSTANCE:
+        raise HTTPException(status_code=503, detail="Bot not connected")
+    
+    puzzle_cog = BOT_INSTANCE.get_cog("ChessPuzzle")
+    if not puzzle_cog:
+        raise HTTPException(status_code=503, detail="Puzzle cog not loaded")
+    
+    return puzzle_cog.stats()
+
+@app.get("/stats/twitch", tags=["Twitch"], dependencies=[Depends(get_api_key)])
+async def get_twitch_stats():
+    """Get live state and EventSub delivery metrics"""
     if not BOT_INSTANCE:
         raise HTTPException(status_code=503, detail="Bot not connected")
     
-    uptime = discord.utils.utcnow() - BOT_INSTANCE.user.created_at
-    days, remainder = divmod(int(uptime.total_seconds()), 86400)
-    hours, remainder = divmod(remainder, 3600)
-    minutes, seconds = divmod(remainder, 60)
+    twitch_cog = BOT_INSTANCE.get_cog("TwitchNotifier")
+    if not twitch_cog:
+        raise HTTPException(status_code=503, detail="Twitch notifier not loaded")
+    
+    return twitch_cog.stats()
+
+@app.get("/stats/modlog", tags=["Bot"], dependencies=[Depends(get_api_key)])
+async def get_modlog_stats():
+    """Get queue depth and flush latency for the mod-log writer"""
+    if not BOT_INSTANCE:
+        raise HTTPException(status_code=503, detail="Bot not connected")
+    
+    logging_cog = BOT_INSTANCE.get_cog("Logging")
+    if not logging_cog:
+        raise HTTPException(status_code=503, detail="Logging cog not loaded")
+    
+    return logging_cog.stats()
+
+@app.get("/metrics", tags=["Bot"], dependencies=[Depends(get_api_key)])
+async def get_metrics():
+    """Get counters, gauges and latency histograms in the Prometheus text format"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.post("/twitch/eventsub", tags=["Twitch"], include_in_schema=False)
+async def twitch_eventsub(request: Request):
+    """Receive Twitch EventSub webhooks (authenticated by their HMAC signature, not the API key)"""
+    twitch_cog = BOT_INSTANCE.get_cog("TwitchNotifier") if BOT_INSTANCE else None
+    if not twitch_cog or not twitch_cog.eventsub:
+        raise HTTPException(status_code=503, detail="EventSub not enabled")
     
-    return {
-        "status": "online",
-        "guilds": len(BOT_INSTANCE.guilds),
-        "uptime": f"{days}d {hours}h {minutes}m {seconds}s"
-    }
+    body = await request.body()
+    status_code, text = await twitch_cog.eventsub.handle(request.headers, body)
+    return Response(content=text, status_code=status_code, media_type="text/plain")
 
 @app.post("/go-live", tags=["Twitch"], dependencies=[Depends(get_api_key)])
 async def trigger_live_notification(request: LiveNotificationRequest = None):
@@ -116,7 +183,7 @@ def run_api(bot, host="0.0.0.0", port=8000):
     server = uvicorn.Server(config)
     
     asyncio.create_task(server.serve())
-    logger.info(f"API server running at http://{host}:{port}")
+    logger.info("API server running at http://%s:%s", host, port)
 
 class API(commands.Cog):
     """API integration for external services."""
@@ -132,7 +199,7 @@ class API(commands.Cog):
         # Start API if enabled
         if self.api_enabled:
             run_api(bot, self.api_host, self.api_port)
-            logger.info(f"API server started on {self.api_host}:{self.api_port}")
+            logger.info("API server started on %s:%s", self.api_host, self.api_port)
         else:
             logger.info("API server disabled")
     
@@ -140,7 +207,7 @@ class API(commands.Cog):
     async def on_ready(self):
         """Log API status when bot is ready."""
         if self.api_enabled:
-            logger.info(f"API is available at http://{self.api_host}:{self.api_port}")
+            logger.info("API is available at http://%s:%s", self.api_host, self.api_port)
 
 def setup(bot):
     return bot.add_cog(API(bot))
\ No newline at end of file
@@ -0,0 +1,245 @@
+import io
+import os
+import asyncio
+import logging
+import threading
+import importlib.util
+from collections import OrderedDict
+
+# Pillow is optional (embeds fall back to the Lichess GIF) and only imported for the first render
+PILLOW_AVAILABLE = importlib.util.find_spec("PIL") is not None
+Image = ImageDraw = ImageFont = None
+
+from utils.fen import parse_placement, side_to_move
+
+logger = logging.getLogger("safari_buddy.board")
+
+THEMES = {
+    "brown": ((240, 217, 181), (181, 136, 99)),
+    "blue": ((222, 227, 230), (140, 162, 173)),
+    "green": ((255, 255, 221), (134, 166, 102)),
+}
+
+# Pillow's Quantize.MEDIANCUT and Dither.NONE (the enums need Pillow 9.1)
+MEDIANCUT = 0
+NO_DITHER = 0
+
+# Piece outlines on a 100x100 grid, drawn at SUPERSAMPLE x size then downscaled
+SUPERSAMPLE = 4
+BASE = [(22, 88), (78, 88), (78, 80), (22, 80)]
+SHAPES = {
+    "p": [("ellipse", (38, 22, 62, 46)), ("polygon", [(34, 80), (42, 44), (58, 44), (66, 80)])],
+    "r": [("polygon", [(28, 20), (36, 20), (36, 28), (46, 28), (46, 20), (54, 20), (54, 28), (64, 28),
+                       (64, 20), (72, 20), (72, 36), (66, 40), (66, 72), (72, 80), (28, 80), (34, 72),
+                       (34, 40), (28, 36)])],
+    "n": [("polygon", [(30, 80), (36, 58), (26, 52), (24, 42), (40, 24), (44, 14), (50, 22), (62, 26),
+                       (72, 42), (74, 80)])],
+    "b": [("ellipse", (45, 10, 55, 20)), ("ellipse", (34, 20, 66, 62)),
+          ("polygon", [(36, 80), (42, 56), (58, 56), (64, 80)])],
+    "q": [("polygon", [(24, 28), (36, 52), (38, 22), (50, 48), (62, 22), (64, 52), (76, 28), (68, 80),
+                       (32, 80)]),
+          ("ellipse", (19, 21, 29, 31)), ("ellipse", (33, 14, 43, 24)), ("ellipse", (45, 10, 55, 20)),
+          ("ellipse", (57, 14, 67, 24)), ("ellipse", (71, 21, 81, 31))],
+    "k": [("polygon", [(46, 8), (54, 8), (54, 14), (60, 14), (60, 22), (54, 22), (54, 30), (46, 30),
+                       (46, 22), (40, 22), (40, 14), (46, 14)]),
+          ("polygon", [(26, 40), (40, 30), (60, 30), (74, 40), (66, 80), (34, 80)])],
+}
+
+
+def _import_pillow():
+    global Image, ImageDraw, ImageFont
+    if Image is None:
+        from PIL import Image, ImageDraw, ImageFont
+
+
+def _draw_sprite(piece, size):
+    """Draw one piece sprite with an alpha channel."""
+    scale = size * SUPERSAMPLE / 100
+    fill, outline = ((250, 250, 250, 255), (30, 30, 30, 255)) if piece.isupper() else \
+        ((40, 40, 40, 255), (230, 230, 230, 255))
+    width = max(1, round(3 * scale))
+
+    big = Image.new("RGBA", (size * SUPERSAMPLE,) * 2, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(big)
+    for kind, points in [("polygon", BASE)] + SHAPES[piece.lower()]:
+        if kind == "polygon":
+            scaled = [(x * scale, y * scale) for x, y in points]
+            draw.polygon(scaled, fill=fill)
+            draw.line(scaled + scaled[:1], fill=outline, width=width, joint="curve")
+        else:
+            box = [coord * scale for coord in points]
+            draw.ellipse(box, fill=fill, outline=outline, width=width)
+    return big.resize((size, size), Image.LANCZOS)
+
+
+class BoardRenderer:
+    """Render FEN positions to PNG from preloaded piece sprites.
+
+    Base boards (per theme and orientation) and piece sprites are built once,
+    on the first render rather than at startup, under a lock since renders
+    run on executor threads; each render pastes sprites
+    onto a copy of the base board. The result is mapped onto a fixed
+    256-colour palette per theme (built from the base board and every
+    sprite on both square colours) before encoding, which makes the PNG
+    several times faster to encode and smaller to upload. Encoded PNGs are
+    cached in an LRU keyed by (placement, orientation, theme), shared by
+    the executor threads under a lock.
+    """
+
+    def __init__(self, square_size=60, cache_size=256, sprite_dir=None):
+        self.square_size = square_size
+        self.cache_size = cache_size
+        self.sprite_dir = sprite_dir
+        self._cache = OrderedDict()
+        self._boards = {}
+        self._palettes = {}
+        self._sprites = None
+        self._init_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a renderer from BOARD_* settings, or return None if Pillow is missing."""
+        if not PILLOW_AVAILABLE:
+            logger.warning("Pillow is not installed, puzzle boards will use the Lichess GIF")
+            return None
+        return cls(
+            square_size=int(os.getenv("BOARD_SQUARE_SIZE", "60")),
+            cache_size=int(os.getenv("BOARD_CACHE_SIZE", "256")),
+            sprite_dir=os.getenv("BOARD_SPRITE_DIR"),
+        )
+
+    def _load_sprites(self, sprite_dir):
+        """Load sprites from sprite_dir (wK.png, bP.png, ...) or draw the built-in set."""
+        sprites = {}
+        for piece in "PNBRQKpnbrqk":
+            name = f"{'w' if piece.isupper() else 'b'}{piece.upper()}.png"
+            path = os.path.join(sprite_dir, name) if sprite_dir else None
+            if path and os.path.exists(path):
+                sprite = Image.open(path).convert("RGBA")
+                sprites[piece] = sprite.resize((self.square_size,) * 2, Image.LANCZOS)
+            else:
+                sprites[piece] = _draw_sprite(piece, self.square_size)
+        return sprites
+
+    def _base_board(self, theme, white_bottom):
+        """Return the empty board with coordinates for a theme and orientation."""
+        key = (theme, white_bottom)
+        board = self._boards.get(key)
+        if board is not None:
+            return board
+        with self._init_lock:
+            board = self._boards.get(key)
+            if board is None:
+                board = self._boards[key] = self._draw_base_board(theme, white_bottom)
+        return board
+
+    def _palette(self, theme):
+        """Return the palette image every render in a theme is quantized to."""
+        palette = self._palettes.get(theme)
+        if palette is not None:
+            return palette
+        light, dark = THEMES.get(theme, THEMES["brown"])
+        size = self.square_size
+        # Both orientations share their colours, so one base board and every sprite on each square colour
+        sample = Image.new("RGB", (size * 12, size * 10), light)
+        sample.paste(self._base_board(theme, True), (0, size * 2))
+        for i, piece in enumerate("PNBRQKpnbrqk"):
+            for j, color in enumerate((light, dark)):
+                square = Image.new("RGB", (size, size), color)
+                square.paste(self._sprites[piece], (0, 0), self._sprites[piece])
+                sample.paste(square, (i * size, j * size))
+        with self._init_lock:
+            palette = self._palettes.setdefault(theme, sample.quantize(256, method=MEDIANCUT))
+        return palette
+
+    def _draw_base_board(self, theme, white_bottom):
+        light, dark = THEMES.get(theme, THEMES["brown"])
+        size = self.square_size
+        board = Image.new("RGB", (size * 8, size * 8), light)
+        draw = ImageDraw.Draw(board)
+        font = ImageFont.load_default()
+        files = "abcdefgh" if white_bottom else "hgfedcba"
+        ranks = "87654321" if white_bottom else "12345678"
+        for row in range(8):
+            for col in range(8):
+                color = dark if (row + col) % 2 else light
+                x, y = col * size, row * size
+                if color is dark:
+                    draw.rectangle([x, y, x + size - 1, y + size - 1], fill=dark)
+                label_color = light if color is dark else dark
+                if col == 0:
+                    draw.text((x + 2, y + 1), ranks[row], fill=label_color, font=font)
+                if row == 7:
+                    draw.text((x + size - 8, y + size - 12), files[col], fill=label_color, font=font)
+        return board
+
+    def render(self, fen, orientation=None, theme="brown"):
+        """Return PNG bytes for a FEN, from the cache when possible.
+
+        orientation is 'w' or 'b' (the side shown at the bottom); by default
+        the side to move, i.e. the player solving the puzzle.
+        """
+        placement = fen.split()[0]
+        orientation = orientation or side_to_move(fen)
+        key = (placement, orientation, theme)
+
+        with self._cache_lock:
+            png = self._cache.get(key)
+            if png is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return png
+            self.misses += 1
+
+        if self._sprites is None:
+            with self._init_lock:
+                if self._sprites is None:
+                    _import_pillow()
+                    self._sprites = self._load_sprites(self.sprite_dir)
+        rows = parse_placement(placement)
+        white_bottom = orientation == "w"
+        image = self._base_board(theme, white_bottom).copy()
+        size = self.square_size
+        for row in range(8):
+            for col in range(8):
+                piece = rows[row][col]
+                if piece is None:
+                    continue
+                draw_row, draw_col = (row, col) if white_bottom else (7 - row, 7 - col)
+                sprite = self._sprites[piece]
+                image.paste(sprite, (draw_col * size, draw_row * size), sprite)
+
+        image = image.quantize(palette=self._palette(theme), dither=NO_DITHER)
+        buffer = io.BytesIO()
+        # Low compression keeps encoding in the low milliseconds
+        image.save(buffer, format="PNG", compress_level=1)
+        png = buffer.getvalue()
+
+        with self._cache_lock:
+            self._cache[key] = png
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return png
+
+    async def render_async(self, fen, orientation=None, theme="brown"):
+        """Render off the event loop unless the image is already cached."""
+        placement = fen.split()[0]
+        key = (placement, orientation or side_to_move(fen), theme)
+        if key in self._cache:
+            return self.render(fen, orientation, theme)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.render, fen, orientation, theme)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "cached_images": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import logging
+
+import discord
+
+logger = logging.getLogger("safari_buddy.channel_index")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_overrides (
+    guild_id INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    channel_id INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, role)
+);
+"""
+
+# Channel roles
+MOD_LOGS = "mod-logs"
+WELCOME = "welcome"
+LIVE = "live"
+PUZZLE = "puzzle"
+
+ROLES = (MOD_LOGS, WELCOME, LIVE, PUZZLE)
+
+
+class ChannelIndex:
+    """Per-guild role -> channel ID map shared by every cog.
+
+    A guild is indexed with one pass over its channels the first time it is
+    looked up: a channel with the role's exact name wins, otherwise the
+    first text channel whose name contains one of the role's keywords.
+    Channel create/update/delete events re-index only the affected guild,
+    and only when the channel's name matters to a role or it is already
+    indexed. Per-guild overrides are stored in SQLite and always win.
+    """
+
+    def __init__(self, path, names, keywords, default_ids=None):
+        self.path = path
+        # role -> exact channel name, role -> name keywords for the fallback
+        self.names = {role: name.lower() for role, name in names.items()}
+        self.keywords = keywords
+        # role -> channel ID used when present in the guild (e.g. PUZZLE_CHANNEL_ID)
+        self.default_ids = default_ids or {}
+        self._index = {}
+        self._overrides = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        for guild_id, role, channel_id in self._db.execute("SELECT guild_id, role, channel_id FROM channel_overrides"):
+            self._overrides.setdefault(guild_id, {})[role] = channel_id
+
+        # Stats
+        self.lookups = 0
+        self.builds = 0
+        self.rebuilds = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build an index from the *_CHANNEL environment variables."""
+        data_dir = os.getenv("DATA_DIR", "data")
+        puzzle_channel_id = os.getenv("PUZZLE_CHANNEL_ID", "")
+        return cls(
+            os.getenv("CHANNEL_INDEX_PATH", os.path.join(data_dir, "channels.db")),
+            names={
+                MOD_LOGS: os.getenv("MOD_LOGS_CHANNEL", "mod-logs"),
+                WELCOME: os.getenv("WELCOME_CHANNEL", "welcome"),
+                LIVE: os.getenv("ANNOUNCEMENT_CHANNEL", "live-now"),
+            },
+            keywords={
+                MOD_LOGS: ("log", "mod"),
+                WELCOME: ("welcome",),
+                LIVE: ("live", "announcement"),
+            },
+            default_ids={PUZZLE: int(puzzle_channel_id)} if puzzle_channel_id.isdigit() else {},
+        )
+
+    def _resolve(self, guild):
+        """Index a guild's channels for every role in one pass."""
+        exact = {}
+        fallback = {}
+        for channel in guild.channels:
+            name = channel.name.lower()
+            for role in ROLES:
+                if role not in exact and name == self.names.get(role):
+                    exact[role] = channel.id
+                elif (role not in fallback and isinstance(channel, discord.TextChannel)
+                      and any(keyword in name for keyword in self.keywords.get(role, ()))):
+                    fallback[role] = channel.id
+
+        roles = {**fallback, **exact}
+        for role, channel_id in self.default_ids.items():
+            if guild.get_channel(channel_id) is not None:
+                roles[role] = channel_id
+        self._index[guild.id] = roles
+        return roles
+
+    def get(self, guild, role):
+        """Return the channel for a role in a guild, or None."""
+        self.lookups += 1
+        override = self._overrides.get(guild.id, {}).get(role)
+        if override is not None:
+            channel = guild.get_channel(override)
+            if channel is not None:
+                return channel
+
+        roles = self._index.get(guild.id)
+        if roles is None:
+            self.builds += 1
+            roles = self._resolve(guild)
+        channel_id = roles.get(role)
+        return guild.get_channel(channel_id) if channel_id is not None else None
+
+    def _relevant(self, channel):
+        """Whether a channel's name or ID can change any role in its guild."""
+        roles = self._index.get(channel.guild.id)
+        if roles is None:
+            return False
+        if channel.id in roles.values():
+            return True
+        name = channel.name.lower()
+        return (name in self.names.values()
+                or any(keyword in name for keywords in self.keywords.values() for keyword in keywords))
+
+    def channel_changed(self, *channels):
+        """Re-index a guild after a channel was created, renamed or deleted."""
+        if any(self._relevant(channel) for channel in channels):
+            self.rebuilds += 1
+            self._index.pop(channels[0].guild.id, None)
+
+    def forget_guild(self, guild_id):
+        self._index.pop(guild_id, None)
+
+    def set_override(self, guild_id, role, channel_id):
+        """Pin a role to a channel in a guild."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO channel_overrides (guild_id, role, channel_id) VALUES (?, ?, ?)",
+            (guild_id, role, channel_id)
+        )
+        self._db.commit()
+        self._overrides.setdefault(guild_id, {})[role] = channel_id
+
+    def clear_override(self, guild_id, role):
+        """Go back to resolving a role by channel name; returns False if it was not pinned."""
+        if self._overrides.get(guild_id, {}).pop(role, None) is None:
+            return False
+        self._db.execute("DELETE FROM channel_overrides WHERE guild_id = ? AND role = ?", (guild_id, role))
+        self._db.commit()
+        return True
+
+    def overrides(self, guild_id):
+        return dict(self._overrides.get(guild_id, {}))
+
+    def close(self):
+        self._db.close()
+
+    def stats(self):
+        return {
+            "indexed_guilds": len(self._index),
+            "overrides": sum(len(roles) for roles in self._overrides.values()),
+            "lookups": self.lookups,
+            "builds": self.builds,
+            "rebuilds": self.rebuilds,
+        }
+
+
+def get_channel_index(bot):
+    """Return the channel index shared by all cogs, creating it if needed."""
+    index = getattr(bot, "channel_index", None)
+    if index is None:
+        index = ChannelIndex.from_env()
+        bot.channel_index = index
+    return index
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+
+import discord
+
+logger = logging.getLogger("safari_buddy.command_sync")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS synced_scopes (
+    application_id INTEGER NOT NULL,
+    scope TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (application_id, scope)
+);
+"""
+
+# Scope of the commands registered for every server
+GLOBAL = "global"
+
+
+def command_scopes(commands):
+    """Group application commands by scope: GLOBAL or a guild ID as a string."""
+    scopes = {GLOBAL: []}
+    for command in commands:
+        if command.guild_ids is None:
+            scopes[GLOBAL].append(command)
+        else:
+            for guild_id in command.guild_ids:
+                scopes.setdefault(str(guild_id), []).append(command)
+    return scopes
+
+
+def definition_hash(commands):
+    """Hash of the payload Discord would receive for a scope, independent of command order."""
+    payload = sorted((command.to_dict() for command in commands), key=lambda data: (data.get("type", 1), data["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class CommandSync:
+    """Registers application commands only when their definitions changed.
+
+    The hash of each scope's command payload is stored after a successful
+    sync; on the next start only scopes whose hash differs are uploaded
+    (one bulk overwrite each), and guild scopes that no longer have
+    commands are cleared. A scope with no stored hash (first run, new data
+    directory) is compared against Discord first, so it is only uploaded
+    if it actually differs. An unchanged scope still costs one read: the
+    registered commands are fetched so their IDs can be mapped onto the
+    bot's commands, which is how py-cord dispatches interactions; if
+    Discord's set of commands differs from the bot's, the scope is
+    overwritten. A guild the bot can no longer manage (403 or 404) is
+    counted as cleared rather than failed. Syncing
+    happens once per process (until every scope succeeded), so reconnects
+    and repeated on_ready events cost nothing.
+    """
+
+    def __init__(self, path, force=False):
+        self.path = path
+        self.force = force
+        self.done = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+
+        # Stats
+        self.uploaded = []
+        self.verified = []
+        self.unchanged = []
+        self.cleared = []
+        self.failed = []
+        self.duration = None
+
+    @classmethod
+    def from_env(cls):
+        """Build a sync manager from COMMAND_SYNC_PATH and COMMAND_SYNC_FORCE."""
+        data_dir = os.getenv("DATA_DIR", "data")
+        return cls(
+            os.getenv("COMMAND_SYNC_PATH", os.path.join(data_dir, "command_sync.db")),
+            force=os.getenv("COMMAND_SYNC_FORCE", "false").lower() == "true",
+        )
+
+    def stored_hashes(self, application_id):
+        rows = self._db.execute("SELECT scope, hash FROM synced_scopes WHERE application_id = ?", (application_id,))
+        return dict(rows.fetchall())
+
+    def _store(self, application_id, scope, digest):
+        with self._db:
+            if digest is None:
+                self._db.execute("DELETE FROM synced_scopes WHERE application_id = ? AND scope = ?",
+                                 (application_id, scope))
+            else:
+                self._db.execute("INSERT OR REPLACE INTO synced_scopes VALUES (?, ?, ?, ?)",
+                                 (application_id, scope, digest, time.time()))
+
+    async def map_ids(self, bot, commands, guild_id):
+        """Give a scope's commands the IDs Discord has for them, without writing anything.
+
+        Returns False if Discord's commands in the scope are not the bot's
+        (one is missing, or a stale one is still registered), i.e. Discord
+        no longer matches the stored hash.
+        """
+        if guild_id is None:
+            registered = await bot.http.get_global_commands(bot.user.id)
+        else:
+            registered = await bot.http.get_guild_commands(bot.user.id, guild_id)
+        ids = {(data["name"], data.get("type", 1)): data["id"] for data in registered}
+        if set(ids) != {(command.name, command.type) for command in commands}:
+            return False
+        for command in commands:
+            command.id = ids[(command.name, command.type)]
+            bot._application_commands[command.id] = command
+        return True
+
+    async def sync(self, bot):
+        """Register the bot's changed command scopes, at most once per process."""
+        if self.done:
+            return
+        started = time.perf_counter()
+        self.uploaded, self.verified, self.unchanged, self.cleared, self.failed = [], [], [], [], []
+
+        application_id = bot.user.id
+        stored = self.stored_hashes(application_id)
+        scopes = command_scopes(bot.pending_application_commands)
+        # Guilds that had commands last time but have none now are cleared
+        for scope in stored:
+            scopes.setdefault(scope, [])
+
+        for scope, commands in scopes.items():
+            guild_id = None if scope == GLOBAL else int(scope)
+            # An empty global scope is hashed like any other; an empty guild scope is deleted
+            digest = definition_hash(commands) if commands or guild_id is None else None
+            previous = stored.get(scope)
+            if digest is None and previous is None:
+                continue
+            unchanged = digest == previous and not self.force
+            try:
+                if unchanged and (not commands or await self.map_ids(bot, commands, guild_id)):
+                    self.unchanged.append(scope)
+                    continue
+                # A stored hash that differs from the bot's or from Discord's commands means the scope is
+                # out of date: overwrite it in one request. Without one, let py-cord compare first.
+                await bot.register_commands(commands, guild_id=guild_id, force=self.force or previous is not None)
+            except (discord.Forbidden, discord.NotFound) as e:
+                if guild_id is None:
+                    logger.error("Error syncing %s commands: %s", scope, e)
+                    self.failed.append(scope)
+                    continue
+                # Removed from the guild or no longer allowed to manage its commands: nothing to retry
+                logger.warning("Cannot sync commands in guild %s, skipping it: %s", scope, e)
+                self._store(application_id, scope, None)
+                self.cleared.append(scope)
+                continue
+            except Exception as e:
+                logger.error("Error syncing %s commands: %s", scope, e)
+                self.failed.append(scope)
+                continue
+            self._store(application_id, scope, digest)
+            if digest is None:
+                self.cleared.append(scope)
+            elif previous is None and not self.force:
+                self.verified.append(scope)
+            else:
+                self.uploaded.append(scope)
+
+        self.duration = time.perf_counter() - started
+        # Failed scopes are retried on the next on_ready; the others are stored and skipped then
+        self.done = not self.failed
+        logger.info("Command sync: %s scope(s) uploaded, %s verified, %s unchanged, %s cleared, %s failed in %.2fs",
+                    len(self.uploaded), len(self.verified), len(self.unchanged), len(self.cleared), len(self.failed),
+                    self.duration)
+
+    def close(self):
+        self._db.close()
+
+    def stats(self):
+        return {
+            "uploaded": list(self.uploaded),
+            "verified": list(self.verified),
+            "unchanged": list(self.unchanged),
+            "cleared": list(self.cleared),
+            "failed": list(self.failed),
+            "duration_ms": self.duration * 1000 if self.duration is not None else None,
+        }
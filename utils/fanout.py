@@ -0,0 +1,92 @@
+import os
+import time
+import asyncio
+import logging
+from collections import namedtuple
+
+from utils.stats import percentile
+
+logger = logging.getLogger("safari_buddy.fanout")
+
+# Outcome of one send: error is None on success
+Delivery = namedtuple("Delivery", ("guild_id", "guild_name", "ok", "latency", "error"))
+
+
+class FanOutReport:
+    """Per-guild results of one fan-out, with wall time and latency summary."""
+
+    def __init__(self, deliveries, wall_time):
+        self.deliveries = deliveries
+        self.wall_time = wall_time
+
+    @property
+    def delivered(self):
+        return sum(1 for delivery in self.deliveries if delivery.ok)
+
+    @property
+    def failed(self):
+        return [delivery for delivery in self.deliveries if not delivery.ok]
+
+    def summary(self):
+        latencies = [delivery.latency for delivery in self.deliveries]
+        return {
+            "targets": len(self.deliveries),
+            "delivered": self.delivered,
+            "failed": {delivery.guild_name: delivery.error for delivery in self.failed},
+            "wall_time_ms": self.wall_time * 1000,
+            "latency_p50_ms": percentile(latencies, 50) * 1000,
+            "latency_max_ms": max(latencies, default=0.0) * 1000,
+            "latency_sum_ms": sum(latencies) * 1000,
+        }
+
+
+class FanOut:
+    """Sends one message to a channel in many guilds concurrently.
+
+    At most ``concurrency`` sends are in flight. Every guild's channel is a
+    separate Discord rate-limit route, and py-cord waits out per-route and
+    global 429s itself, so the semaphore only has to keep the burst
+    bounded. ``rate`` optionally spaces out send starts (per second) to
+    stay under the global limit instead of relying on 429s.
+    """
+
+    def __init__(self, concurrency=50, rate=0.0):
+        self.concurrency = concurrency
+        self.rate = rate
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._next_start = 0.0
+
+    @classmethod
+    def from_env(cls):
+        """Build a fan-out from the FANOUT_* environment variables."""
+        return cls(
+            concurrency=int(os.getenv("FANOUT_CONCURRENCY", "50")),
+            rate=float(os.getenv("FANOUT_RATE", "0")),
+        )
+
+    async def _pace(self):
+        """Wait for the next send slot when a rate is configured."""
+        if not self.rate:
+            return
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + 1 / self.rate
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _deliver(self, guild, channel, kwargs):
+        async with self._semaphore:
+            await self._pace()
+            start = time.perf_counter()
+            try:
+                await channel.send(**kwargs)
+                return Delivery(guild.id, guild.name, True, time.perf_counter() - start, None)
+            except Exception as e:
+                logger.error("Error sending to %s: %s", guild.name, e)
+                return Delivery(guild.id, guild.name, False, time.perf_counter() - start, str(e))
+
+    async def send(self, targets, **kwargs):
+        """Send the same message to every (guild, channel) target and return a FanOutReport."""
+        start = time.perf_counter()
+        deliveries = await asyncio.gather(*(self._deliver(guild, channel, kwargs) for guild, channel in targets))
+        return FanOutReport(list(deliveries), time.perf_counter() - start)
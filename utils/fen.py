@@ -0,0 +1,104 @@
+"""Minimal FEN helpers for puzzle positions (no move validation)."""
+
+FILES = "abcdefgh"
+
+
+def parse_placement(placement):
+    """Turn the piece placement field into 8 rows of 8 squares (rank 8 first).
+
+    Empty squares are None; pieces keep their FEN letter.
+    """
+    rows = []
+    for rank in placement.split("/"):
+        row = []
+        for char in rank:
+            if char.isdigit():
+                row.extend([None] * int(char))
+            else:
+                row.append(char)
+        if len(row) != 8:
+            raise ValueError(f"Invalid FEN rank: {rank}")
+        rows.append(row)
+    if len(rows) != 8:
+        raise ValueError(f"Invalid FEN placement: {placement}")
+    return rows
+
+
+def format_placement(rows):
+    """Inverse of parse_placement."""
+    ranks = []
+    for row in rows:
+        rank = ""
+        empty = 0
+        for square in row:
+            if square is None:
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            rank += square
+        if empty:
+            rank += str(empty)
+        ranks.append(rank)
+    return "/".join(ranks)
+
+
+def _square(name):
+    """Return (row, col) for a square name such as 'e4'."""
+    return 8 - int(name[1]), FILES.index(name[0])
+
+
+def side_to_move(fen):
+    """Return 'w' or 'b' for the side to move in a FEN."""
+    fields = fen.split()
+    return fields[1] if len(fields) > 1 else "w"
+
+
+def apply_uci_move(fen, move):
+    """Play a UCI move (e.g. 'e2e4', 'e7e8q') on a FEN and return the new FEN."""
+    fields = fen.split()
+    fields += ["w", "-", "-", "0", "1"][len(fields) - 1:]
+    placement, turn, castling, en_passant, halfmove, fullmove = fields[:6]
+    rows = parse_placement(placement)
+
+    from_row, from_col = _square(move[0:2])
+    to_row, to_col = _square(move[2:4])
+    piece = rows[from_row][from_col]
+    if piece is None:
+        raise ValueError(f"No piece on {move[0:2]} for move {move}")
+    captured = rows[to_row][to_col]
+
+    rows[from_row][from_col] = None
+    rows[to_row][to_col] = piece
+
+    kind = piece.lower()
+    if kind == "k" and abs(to_col - from_col) == 2:
+        # Castling: bring the rook over the king
+        rook_from, rook_to = (7, 5) if to_col > from_col else (0, 3)
+        rows[to_row][rook_to] = rows[to_row][rook_from]
+        rows[to_row][rook_from] = None
+    elif kind == "p" and from_col != to_col and captured is None:
+        # En passant: the captured pawn sits beside the moving pawn
+        rows[from_row][to_col] = None
+        captured = "p"
+    if kind == "p" and len(move) == 5:
+        promotion = move[4]
+        rows[to_row][to_col] = promotion.upper() if piece.isupper() else promotion.lower()
+
+    # Castling rights are lost when a king or rook moves, or a rook is captured
+    lost = set()
+    for name in (move[0:2], move[2:4]):
+        lost.update({"e1": "KQ", "e8": "kq", "h1": "K", "a1": "Q", "h8": "k", "a8": "q"}.get(name, ""))
+    castling = "".join(right for right in castling if right not in lost) or "-"
+
+    en_passant = "-"
+    if kind == "p" and abs(to_row - from_row) == 2:
+        en_passant = f"{move[0]}{(int(move[1]) + int(move[3])) // 2}"
+
+    halfmove = "0" if kind == "p" or captured else str(int(halfmove) + 1)
+    if turn == "b":
+        fullmove = str(int(fullmove) + 1)
+    turn = "b" if turn == "w" else "w"
+
+    return " ".join([format_placement(rows), turn, castling, en_passant, halfmove, fullmove])
@@ -0,0 +1,173 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+
+import aiohttp
+
+from utils.metrics import UPSTREAM_DURATION, UPSTREAM_ERRORS
+from utils.stats import percentile
+
+logger = logging.getLogger("safari_buddy.http")
+
+# Number of recent request latencies kept for percentile reporting
+LATENCY_SAMPLES = 1024
+
+
+class HTTPClient:
+    """Bot-wide pooled HTTP client shared by every cog.
+
+    Keeps one aiohttp session with keep-alive connections, a per-host
+    connection cap and a DNS cache, so repeated Lichess/Twitch calls skip
+    the TCP+TLS handshake and DNS lookup.
+    """
+
+    def __init__(self, limit=100, limit_per_host=10, dns_ttl=300, keepalive_timeout=30,
+                 total_timeout=15.0, connect_timeout=5.0):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self._session = None
+        self._users = 0
+
+        # Metrics
+        self.requests = 0
+        self.errors = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    @classmethod
+    def from_env(cls):
+        """Build a client from the HTTP_* environment variables."""
+        return cls(
+            limit=int(os.getenv("HTTP_POOL_LIMIT", "100")),
+            limit_per_host=int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10")),
+            dns_ttl=int(os.getenv("HTTP_DNS_TTL", "300")),
+            keepalive_timeout=int(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30")),
+            total_timeout=float(os.getenv("HTTP_TIMEOUT", "15")),
+            connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+        )
+
+    def _trace_config(self):
+        """Create the aiohttp trace hooks that feed the metrics."""
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+
+        async def on_request_end(session, ctx, params):
+            elapsed = time.perf_counter() - ctx.start
+            self.requests += 1
+            self.latencies.append(elapsed)
+            host = params.url.host
+            UPSTREAM_DURATION.labels(host).observe(elapsed)
+            if params.response.status >= 400:
+                UPSTREAM_ERRORS.labels(host, str(params.response.status)).inc()
+
+        async def on_request_exception(session, ctx, params):
+            self.requests += 1
+            self.errors += 1
+            UPSTREAM_ERRORS.labels(params.url.host, type(params.exception).__name__).inc()
+
+        async def on_connection_create_end(session, ctx, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self.connections_reused += 1
+
+        async def on_dns_cache_hit(session, ctx, params):
+            self.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, ctx, params):
+            self.dns_cache_misses += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace
+
+    @property
+    def session(self):
+        """Return the shared session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                use_dns_cache=True,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                trace_configs=[self._trace_config()],
+            )
+            logger.info("Opened shared HTTP session")
+        return self._session
+
+    def request(self, method, url, **kwargs):
+        """Issue a request on the pooled session (use as an async context manager)."""
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def acquire(self):
+        """Register a cog as a user of the client."""
+        self._users += 1
+        return self
+
+    def release(self):
+        """Unregister a cog; the session is closed once the last user leaves."""
+        self._users = max(0, self._users - 1)
+        if self._users == 0 and self._session is not None:
+            try:
+                asyncio.get_running_loop().create_task(self.close())
+            except RuntimeError:
+                # No running loop (interpreter shutdown); nothing left to await on
+                pass
+
+    async def close(self):
+        """Close the shared session and its pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed shared HTTP session")
+        self._session = None
+
+    def stats(self):
+        """Return a snapshot of connection reuse and latency metrics."""
+        connections = self.connections_created + self.connections_reused
+        samples = list(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_ratio": self.connections_reused / connections if connections else 0.0,
+            "dns_cache_hits": self.dns_cache_hits,
+            "dns_cache_misses": self.dns_cache_misses,
+            "latency_p50_ms": percentile(samples, 50) * 1000,
+            "latency_p99_ms": percentile(samples, 99) * 1000,
+        }
+
+
+def get_http_client(bot):
+    """Return the HTTP client shared by all cogs, creating it if needed."""
+    client = getattr(bot, "http_client", None)
+    if client is None:
+        client = HTTPClient.from_env()
+        bot.http_client = client
+    return client
@@ -0,0 +1,151 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger("safari_buddy.join_rate")
+
+
+class JoinRateDetector:
+    """Sliding-window join counter per guild that flags join raids.
+
+    A guild enters raid mode once ``threshold`` members joined within the
+    last ``window`` seconds, and leaves it when the count falls to half
+    the threshold, so the mode doesn't flap around the limit. In raid mode
+    the cogs batch their per-member messages every ``aggregate_interval``
+    seconds (see MemberBatcher). Welcome and Logging both report every
+    join; the window is keyed by member ID, so a join is counted once
+    however many cogs see it.
+    """
+
+    def __init__(self, threshold=10, window=60.0, aggregate_interval=15.0):
+        self.threshold = threshold
+        self.window = window
+        self.aggregate_interval = aggregate_interval
+        # guild ID -> member ID -> monotonic join time, oldest first
+        self._joins = {}
+        self._raids = set()
+
+        # Stats
+        self.raids_started = 0
+        self.suppressed = {}
+
+    @classmethod
+    def from_env(cls):
+        """Build a detector from the RAID_* environment variables."""
+        return cls(
+            threshold=int(os.getenv("RAID_JOIN_THRESHOLD", "10")),
+            window=float(os.getenv("RAID_WINDOW", "60")),
+            aggregate_interval=float(os.getenv("RAID_AGGREGATE_INTERVAL", "15")),
+        )
+
+    def _prune(self, guild_id, now):
+        joins = self._joins.get(guild_id)
+        if joins is None:
+            return 0
+        while joins and next(iter(joins.values())) <= now - self.window:
+            joins.popitem(last=False)
+        if not joins:
+            del self._joins[guild_id]
+            return 0
+        return len(joins)
+
+    def _update(self, guild_id, count):
+        if guild_id not in self._raids and count >= self.threshold:
+            self._raids.add(guild_id)
+            self.raids_started += 1
+            logger.warning("Join raid in guild %s: %s joins in %gs, aggregating messages", guild_id, count, self.window)
+        elif guild_id in self._raids and count <= self.threshold // 2:
+            self._raids.discard(guild_id)
+            logger.info("Join rate in guild %s back to normal, sending messages individually", guild_id)
+
+    def observe(self, member, now=None):
+        """Count a member's join and return whether their guild is in raid mode."""
+        now = now or time.monotonic()
+        guild_id = member.guild.id
+        self._joins.setdefault(guild_id, OrderedDict()).setdefault(member.id, now)
+        self._update(guild_id, self._prune(guild_id, now))
+        return guild_id in self._raids
+
+    def in_raid(self, guild_id, now=None):
+        """Whether a guild is (still) in raid mode."""
+        self._update(guild_id, self._prune(guild_id, now or time.monotonic()))
+        return guild_id in self._raids
+
+    def active_raids(self):
+        """Number of guilds currently in raid mode."""
+        return len(self._raids)
+
+    def join_rate(self, guild_id, now=None):
+        """Joins per minute over the window."""
+        return self._prune(guild_id, now or time.monotonic()) * 60 / self.window
+
+    def count_suppressed(self, kind, sends):
+        """Record sends saved by aggregating (e.g. one welcome instead of 40)."""
+        self.suppressed[kind] = self.suppressed.get(kind, 0) + sends
+
+    def stats(self):
+        now = time.monotonic()
+        rates = {guild_id: self.join_rate(guild_id, now) for guild_id in list(self._joins)}
+        return {
+            "threshold": self.threshold,
+            "window_s": self.window,
+            "raids_active": sorted(self._raids),
+            "raids_started": self.raids_started,
+            "join_rate_per_min": {str(guild_id): round(rate, 1) for guild_id, rate in rates.items()},
+            "max_join_rate_per_min": round(max(rates.values(), default=0.0), 1),
+            "suppressed_sends": dict(self.suppressed),
+        }
+
+
+class MemberBatcher:
+    """Collects members per guild and hands them to a callback every ``interval`` seconds."""
+
+    def __init__(self, interval, flush):
+        self.interval = interval
+        self.flush = flush
+        self._pending = {}
+        self._guilds = {}
+        self._tasks = {}
+
+    def add(self, guild, member):
+        self._guilds[guild.id] = guild
+        self._pending.setdefault(guild.id, []).append(member)
+        if guild.id not in self._tasks:
+            self._tasks[guild.id] = asyncio.ensure_future(self._flush_later(guild))
+
+    async def _flush_later(self, guild):
+        try:
+            await asyncio.sleep(self.interval)
+        finally:
+            self._tasks.pop(guild.id, None)
+        await self._flush_now(guild)
+
+    async def _flush_now(self, guild):
+        self._guilds.pop(guild.id, None)
+        members = self._pending.pop(guild.id, [])
+        if members:
+            try:
+                await self.flush(guild, members)
+            except Exception as e:
+                logger.error("Error sending %s aggregated member events in %s: %s", len(members), guild.name, e)
+
+    async def drain(self):
+        """Hand every pending member to the callback now instead of after the interval."""
+        self.close()
+        for guild_id in list(self._pending):
+            await self._flush_now(self._guilds[guild_id])
+
+    def close(self):
+        for task in self._tasks.values():
+            task.cancel()
+
+
+def get_join_detector(bot):
+    """Return the join-rate detector shared by all cogs, creating it if needed."""
+    detector = getattr(bot, "join_detector", None)
+    if detector is None:
+        detector = JoinRateDetector.from_env()
+        bot.join_detector = detector
+    return detector
@@ -0,0 +1,190 @@
+import os
+import re
+import sqlite3
+import logging
+
+logger = logging.getLogger("safari_buddy.keyword_matcher")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reaction_triggers (
+    guild_id INTEGER NOT NULL,
+    keyword TEXT NOT NULL,
+    emoji TEXT,
+    PRIMARY KEY (guild_id, keyword)
+);
+"""
+
+# Trigger words: letters, digits, spaces, apostrophes and hyphens
+KEYWORD_PATTERN = re.compile(r"^[\w][\w' -]{0,30}[\w]$")
+
+DEFAULT_TRIGGERS = {
+    "checkmate": "🫡",
+    "chess": "♟️",
+    "queen": "👑",
+    "king": "🤴",
+    "safari": "🦁",
+    "jungle": "🌴",
+    "banana": "🍌",
+    "victory": "🏆",
+    "tournament": "🏅",
+    "rating": "📈",
+    "blunder": "😱",
+    "brilliant": "💫",
+    "puzzle": "🧩",
+}
+
+
+def normalize_keyword(keyword):
+    """Return a lower-case trigger word, or None if it is not a valid one."""
+    keyword = " ".join(keyword.lower().split())
+    return keyword if KEYWORD_PATTERN.match(keyword) else None
+
+
+class KeywordMatcher:
+    """Finds every trigger word in a message with one regex pass.
+
+    All keywords are compiled into a single whole-word alternation, longest
+    first, so a message is scanned once however many triggers there are
+    (instead of once per keyword). A match maps back to its trigger by its
+    lower-case text, or, when lower-casing does not give the trigger back
+    (e.g. "KİNG"), through a second pattern with one named group per
+    keyword; a match neither resolves is skipped. Triggers a
+    longer match contains are reported with it, and after a multi-word
+    match the scan resumes at its next word, so a trigger that starts
+    inside it is still found. Emojis come back in trigger order, each at
+    most once.
+    """
+
+    def __init__(self, triggers):
+        self.triggers = dict(triggers)
+        self._order = {keyword: i for i, keyword in enumerate(self.triggers)}
+        keywords = sorted(self.triggers, key=len, reverse=True)
+        self._lookup = {keyword.lower(): keyword for keyword in keywords}
+        alternation = "|".join(re.escape(keyword) for keyword in keywords)
+        self._pattern = re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE) if keywords else None
+        # Named groups are slower to scan with, so only used to resolve the rare match the lookup misses
+        self._groups = {f"k{i}": keyword for i, keyword in enumerate(keywords)}
+        named = "|".join(rf"(?P<{name}>{re.escape(keyword)})" for name, keyword in self._groups.items())
+        self._named = re.compile(named, re.IGNORECASE) if keywords else None
+        # Shorter triggers inside a longer one, e.g. "chess" in "chess puzzle"
+        self._within = {
+            keyword: [other for other in keywords if other != keyword
+                      and re.search(rf"\b{re.escape(other)}\b", keyword, re.IGNORECASE)]
+            for keyword in keywords
+        }
+        # Triggers with inner word boundaries, after which the scan must not skip ahead
+        self._multiword = {keyword for keyword in keywords if re.search(r"\W", keyword)}
+
+    def _keyword(self, text):
+        keyword = self._lookup.get(text.lower())
+        if keyword is None:
+            m = self._named.fullmatch(text)
+            keyword = self._groups.get(m.lastgroup) if m else None
+        return keyword
+
+    def match(self, content):
+        """Return the emojis for every trigger word in a message."""
+        if self._pattern is None or not content:
+            return []
+        found = set()
+        m = self._pattern.search(content)
+        while m is not None:
+            keyword = self._keyword(m.group())
+            if keyword is not None:
+                found.add(keyword)
+                found.update(self._within[keyword])
+            m = self._pattern.search(content, m.start() + 1 if keyword in self._multiword else m.end())
+        return [self.triggers[keyword] for keyword in sorted(found, key=self._order.__getitem__)]
+
+
+class GuildTriggers:
+    """Default trigger words plus per-guild additions and removals.
+
+    Each guild's matcher is compiled when its triggers change (or on its
+    first message) and kept, and guilds with the same triggers share one
+    matcher, so handling a message is a dict lookup and one regex scan.
+    Changes are stored in SQLite; an emoji of NULL removes a default.
+    """
+
+    def __init__(self, path, defaults=DEFAULT_TRIGGERS):
+        self.path = path
+        self.default = KeywordMatcher(defaults)
+        self._changes = {}
+        self._matchers = {}
+        self._compiled = {tuple(defaults.items()): self.default}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        for guild_id, keyword, emoji in self._db.execute("SELECT guild_id, keyword, emoji FROM reaction_triggers"):
+            self._changes.setdefault(guild_id, {})[keyword] = emoji
+
+    @classmethod
+    def from_env(cls):
+        """Build the trigger store from the REACTIONS_PATH environment variable."""
+        data_dir = os.getenv("DATA_DIR", "data")
+        return cls(os.getenv("REACTIONS_PATH", os.path.join(data_dir, "reactions.db")))
+
+    def triggers(self, guild_id):
+        """Return a guild's keyword -> emoji mapping."""
+        triggers = dict(self.default.triggers)
+        for keyword, emoji in self._changes.get(guild_id, {}).items():
+            if emoji is None:
+                triggers.pop(keyword, None)
+            else:
+                triggers[keyword] = emoji
+        return triggers
+
+    def _compile(self, guild_id):
+        triggers = self.triggers(guild_id)
+        key = tuple(triggers.items())
+        matcher = self._compiled.get(key)
+        if matcher is None:
+            matcher = self._compiled[key] = KeywordMatcher(triggers)
+        self._matchers[guild_id] = matcher
+        return matcher
+
+    def matcher(self, guild_id):
+        """Return the compiled matcher for a guild."""
+        if guild_id not in self._changes:
+            return self.default
+        matcher = self._matchers.get(guild_id)
+        return matcher if matcher is not None else self._compile(guild_id)
+
+    def _set(self, guild_id, keyword, emoji):
+        self._db.execute(
+            "INSERT OR REPLACE INTO reaction_triggers (guild_id, keyword, emoji) VALUES (?, ?, ?)",
+            (guild_id, keyword, emoji)
+        )
+        self._db.commit()
+        self._changes.setdefault(guild_id, {})[keyword] = emoji
+        self._compile(guild_id)
+
+    def add(self, guild_id, keyword, emoji):
+        """React with an emoji to a word in a guild (replacing any existing emoji)."""
+        self._set(guild_id, keyword, emoji)
+
+    def remove(self, guild_id, keyword):
+        """Stop reacting to a word in a guild; returns False if it was not a trigger there."""
+        if keyword not in self.triggers(guild_id):
+            return False
+        if keyword in self.default.triggers:
+            self._set(guild_id, keyword, None)
+        else:
+            self._db.execute("DELETE FROM reaction_triggers WHERE guild_id = ? AND keyword = ?", (guild_id, keyword))
+            self._db.commit()
+            self._changes[guild_id].pop(keyword, None)
+            self._compile(guild_id)
+        return True
+
+    def reset(self, guild_id):
+        """Go back to the default triggers in a guild."""
+        self._db.execute("DELETE FROM reaction_triggers WHERE guild_id = ?", (guild_id,))
+        self._db.commit()
+        self._changes.pop(guild_id, None)
+        self._matchers.pop(guild_id, None)
+
+    def close(self):
+        self._db.close()
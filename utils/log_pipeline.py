@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+from utils.metrics import REGISTRY
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed with extra= and goes into the JSON
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# logging module switches set while the pipeline is installed: no thread, process or caller lookups per record
+_RECORD_SETTINGS = {"logThreads": False, "logProcesses": False, "logMultiprocessing": False, "_srcfile": None}
+
+LOG_QUEUE_DEPTH = REGISTRY.gauge("safari_log_queue_depth", "Log records waiting for the writer thread")
+LOG_DROPPED = REGISTRY.counter("safari_log_records_dropped", "Log records dropped because the queue was full")
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, exception and any extra= fields."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotates by size like the stdlib handler, and also every ``interval`` seconds.
+
+    Intervals are aligned to the epoch, so 24 hours rolls over at UTC
+    midnight; backups are numbered .1 (newest) to .backup_count either way.
+    """
+
+    def __init__(self, filename, max_bytes=0, interval=0, backup_count=0):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.interval = interval
+        self.rollover_at = self._next_rollover(time.time())
+
+    def _next_rollover(self, now):
+        if not self.interval:
+            return float("inf")
+        return (now // self.interval + 1) * self.interval
+
+    def shouldRollover(self, record):
+        if record.created >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_rollover(time.time())
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread without formatting them first.
+
+    The stdlib QueueHandler renders the message (and any traceback) on the
+    calling thread; here that happens on the writer thread, so the event
+    loop only pays for creating the record. Log arguments must therefore
+    not be mutated after the call, which holds for the bot's log lines.
+    A full queue drops the record instead of blocking the loop.
+    """
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+class LogPipeline:
+    """Root logger setup that keeps file and console writes off the event loop.
+
+    Every record goes through a bounded queue to a background thread that
+    writes the log file (JSON or text, rotated by size and time) and the
+    console. While it is installed, records skip the thread, process and
+    caller fields (logging's module-level switches, including the private
+    ``logging._srcfile``), since neither format uses them; stop() puts the
+    previous settings back.
+    """
+
+    def __init__(self, level=logging.INFO, path="safari_buddy.log", file_format="json", max_bytes=10 * 1024 * 1024,
+                 rotate_interval=24 * 3600, backup_count=5, queue_size=10000):
+        self.level = level
+        self.path = path
+        self.file_format = file_format
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.queue = queue.Queue(queue_size)
+        self._listener = None
+        self._saved_settings = None
+        LOG_QUEUE_DEPTH.set_function(self.queue.qsize)
+
+    @classmethod
+    def from_env(cls):
+        """Build a pipeline from the LOG_* environment variables."""
+        return cls(
+            level=os.getenv("LOG_LEVEL", "INFO").upper(),
+            path=os.getenv("LOG_FILE", "safari_buddy.log"),
+            file_format=os.getenv("LOG_FORMAT", "json").lower(),
+            max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            rotate_interval=float(os.getenv("LOG_ROTATE_HOURS", "24")) * 3600,
+            backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        )
+
+    def handlers(self):
+        """The handlers run on the writer thread."""
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers = [console]
+        if self.path:
+            log_file = RotatingFileHandler(self.path, self.max_bytes, self.rotate_interval, self.backup_count)
+            log_file.setFormatter(JSONFormatter() if self.file_format == "json" else logging.Formatter(TEXT_FORMAT))
+            handlers.append(log_file)
+        return handlers
+
+    def start(self):
+        """Route the root logger through the queue and start the writer thread."""
+        # Skip record fields nothing formats; the caller lookup walks the stack on every call
+        self._saved_settings = {name: getattr(logging, name) for name in _RECORD_SETTINGS}
+        for name in _RECORD_SETTINGS:
+            setattr(logging, name, _RECORD_SETTINGS[name])
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+        root.addHandler(_QueueHandler(self.queue))
+        root.setLevel(self.level)
+
+        self._listener = logging.handlers.QueueListener(self.queue, *self.handlers(), respect_handler_level=True)
+        self._listener.start()
+        return self
+
+    def stop(self):
+        """Write out what is still queued and stop the writer thread."""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+        if self._saved_settings is not None:
+            for name, value in self._saved_settings.items():
+                setattr(logging, name, value)
+            self._saved_settings = None
+
@@ -0,0 +1,219 @@
+import os
+import logging
+from array import array
+from collections import namedtuple
+
+import discord
+
+logger = logging.getLogger("safari_buddy.message_cache")
+
+# What the mod-log needs to describe a message after it is gone
+CachedMessage = namedtuple(
+    "CachedMessage",
+    ("id", "guild_id", "channel_id", "author_id", "author_name", "content", "attachments")
+)
+
+# Measured bytes a cached message costs besides its text: three array
+# slots, the reference bit, the bytes object header and its index entry
+SLOT_OVERHEAD = 175
+
+# Separators inside a slot's payload (neither appears in names or filenames)
+FIELD_SEPARATOR = b"\x00"
+ATTACHMENT_SEPARATOR = "\x1f"
+
+
+def snapshot(message):
+    """Return the loggable parts of a discord.Message."""
+    return CachedMessage(
+        message.id,
+        message.guild.id if message.guild else None,
+        message.channel.id,
+        message.author.id,
+        str(message.author),
+        message.content,
+        tuple(attachment.filename for attachment in message.attachments),
+    )
+
+
+def _pack(author_name, content, attachments):
+    return FIELD_SEPARATOR.join((
+        author_name.encode("utf-8"),
+        content.encode("utf-8"),
+        ATTACHMENT_SEPARATOR.join(attachments).encode("utf-8"),
+    ))
+
+
+def _unpack(payload):
+    author_name, rest = payload.split(FIELD_SEPARATOR, 1)
+    content, attachments = rest.rsplit(FIELD_SEPARATOR, 1)
+    attachments = attachments.decode("utf-8")
+    return (
+        author_name.decode("utf-8"),
+        content.decode("utf-8"),
+        tuple(attachments.split(ATTACHMENT_SEPARATOR)) if attachments else (),
+    )
+
+
+class _GuildSlots:
+    """Messages of one guild in parallel arrays, evicted with a CLOCK hand.
+
+    IDs are stored as unsigned 64-bit integers in flat arrays and the text
+    fields as one UTF-8 bytes object per message, so a message costs
+    about SLOT_OVERHEAD bytes plus its text instead of a full Message
+    object. Freed slots are reused.
+    """
+
+    def __init__(self):
+        self.ids = array("Q")
+        self.channels = array("Q")
+        self.authors = array("Q")
+        self.payloads = []
+        # Second-chance bit, set when a message is read or edited
+        self.referenced = bytearray()
+        self.index = {}
+        self.free = []
+        self.hand = 0
+        self.bytes = 0
+
+    def put(self, message_id, channel_id, author_id, payload):
+        slot = self.index.get(message_id)
+        if slot is not None:
+            self.bytes += len(payload) - len(self.payloads[slot])
+            self.payloads[slot] = payload
+            self.referenced[slot] = 1
+            return
+        if self.free:
+            slot = self.free.pop()
+            self.ids[slot] = message_id
+            self.channels[slot] = channel_id
+            self.authors[slot] = author_id
+            self.payloads[slot] = payload
+            self.referenced[slot] = 0
+        else:
+            slot = len(self.payloads)
+            self.ids.append(message_id)
+            self.channels.append(channel_id)
+            self.authors.append(author_id)
+            self.payloads.append(payload)
+            self.referenced.append(0)
+        self.index[message_id] = slot
+        self.bytes += SLOT_OVERHEAD + len(payload)
+
+    def remove(self, slot):
+        del self.index[self.ids[slot]]
+        self.bytes -= SLOT_OVERHEAD + len(self.payloads[slot])
+        self.payloads[slot] = None
+        self.free.append(slot)
+
+    def evict_one(self):
+        """Remove the first message, from the hand onwards, not referenced since the last pass."""
+        while True:
+            slot = self.hand
+            self.hand = (self.hand + 1) % len(self.payloads)
+            if self.payloads[slot] is None:
+                continue
+            if self.referenced[slot]:
+                self.referenced[slot] = 0
+                continue
+            self.remove(slot)
+            return
+
+    def __len__(self):
+        return len(self.index)
+
+
+class MessageCache:
+    """Compact cache of recent message contents for edit and delete auditing.
+
+    Raw edit and delete events only carry IDs once a message has left
+    py-cord's small message cache, and raising ``max_messages`` keeps full
+    Message objects around. This keeps just the ID, channel, author,
+    content and attachment names, in per-guild slot arrays with a byte
+    budget each, so one busy guild cannot push everyone else's history
+    out. Over budget, the least recently used messages are evicted
+    (CLOCK, so reads only flip a bit instead of reordering a list).
+    """
+
+    def __init__(self, guild_budget=4 * 1024 * 1024):
+        self.guild_budget = guild_budget
+        self._guilds = {}
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from the MESSAGE_CACHE_GUILD_BYTES environment variable."""
+        return cls(int(os.getenv("MESSAGE_CACHE_GUILD_BYTES", str(4 * 1024 * 1024))))
+
+    def add(self, message):
+        """Remember a message (a discord.Message or a CachedMessage)."""
+        entry = snapshot(message) if isinstance(message, discord.Message) else message
+        slots = self._guilds.get(entry.guild_id)
+        if slots is None:
+            slots = self._guilds[entry.guild_id] = _GuildSlots()
+        slots.put(entry.id, entry.channel_id, entry.author_id,
+                  _pack(entry.author_name, entry.content, entry.attachments))
+        while slots.bytes > self.guild_budget and len(slots) > 1:
+            slots.evict_one()
+            self.evictions += 1
+
+    def _lookup(self, guild_id, message_id):
+        slots = self._guilds.get(guild_id)
+        slot = slots.index.get(message_id) if slots else None
+        if slot is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return slots, slot
+
+    def _entry(self, guild_id, slots, slot):
+        author_name, content, attachments = _unpack(slots.payloads[slot])
+        return CachedMessage(slots.ids[slot], guild_id, slots.channels[slot], slots.authors[slot],
+                             author_name, content, attachments)
+
+    def get(self, guild_id, message_id):
+        slots, slot = self._lookup(guild_id, message_id)
+        if slot is None:
+            return None
+        slots.referenced[slot] = 1
+        return self._entry(guild_id, slots, slot)
+
+    def update(self, guild_id, message_id, content):
+        """Replace the content of a cached message after an edit."""
+        slots = self._guilds.get(guild_id)
+        slot = slots.index.get(message_id) if slots else None
+        if slot is not None:
+            entry = self._entry(guild_id, slots, slot)
+            slots.put(message_id, entry.channel_id, entry.author_id,
+                      _pack(entry.author_name, content, entry.attachments))
+
+    def pop(self, guild_id, message_id):
+        """Return and forget a message that was deleted, or None."""
+        slots, slot = self._lookup(guild_id, message_id)
+        if slot is None:
+            return None
+        entry = self._entry(guild_id, slots, slot)
+        slots.remove(slot)
+        return entry
+
+    def forget_guild(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def __len__(self):
+        return sum(len(slots) for slots in self._guilds.values())
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "messages": len(self),
+            "guilds": len(self._guilds),
+            "bytes": sum(slots.bytes for slots in self._guilds.values()),
+            "guild_budget_bytes": self.guild_budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,355 @@
+import time
+import asyncio
+import logging
+import threading
+from bisect import bisect_left
+
+logger = logging.getLogger("safari_buddy.metrics")
+
+# Latency buckets in seconds, from a fast event handler to a slow upstream call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _ThreadCells(threading.local):
+    """One list of numbers per thread, registered with its metric the first time a thread uses it.
+
+    A thread only ever writes its own list, so recording needs no lock;
+    a scrape sums the lists of every thread.
+    """
+
+    def __init__(self, size, all_cells):
+        self.cells = [0] * size
+        all_cells.append(self.cells)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("_local", "_all")
+
+    def __init__(self):
+        self._all = []
+        self._local = _ThreadCells(1, self._all)
+
+    def inc(self, amount=1):
+        self._local.cells[0] += amount
+
+    def value(self):
+        return sum(cells[0] for cells in self._all)
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_local", "_all")
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        self._all = []
+        # One count per bucket (the last is +Inf), then the sum
+        self._local = _ThreadCells(len(bounds) + 2, self._all)
+
+    def observe(self, value):
+        cells = self._local.cells
+        cells[bisect_left(self._bounds, value)] += 1
+        cells[-1] += value
+
+    def snapshot(self):
+        """Return (cumulative bucket counts, sum, count) across threads."""
+        totals = [0] * (len(self._bounds) + 2)
+        for cells in self._all:
+            for i, value in enumerate(list(cells)):
+                totals[i] += value
+        cumulative = []
+        running = 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1], running
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_function")
+
+    def __init__(self):
+        self._value = 0
+        self._function = None
+
+    def set(self, value):
+        self._value = value
+
+    def inc(self, amount=1):
+        self._value += amount
+
+    def dec(self, amount=1):
+        self._value -= amount
+
+    def set_function(self, function):
+        """Read the value from a callable at scrape time (None leaves the sample out)."""
+        self._function = function
+
+    def value(self):
+        if self._function is None:
+            return self._value
+        try:
+            return self._function()
+        except Exception as e:
+            logger.error("Error reading gauge: %s", e)
+            return None
+
+
+class _Metric:
+    """A metric family; ``labels(...)`` returns the child for one set of label values.
+
+    Children are cached, so a hot path can look one up once and keep it.
+    Without label names the family records directly.
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield f"{self.name}_total{_format_labels(self.labelnames, values)} {_format_value(child.value())}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            value = child.value()
+            if value is not None:
+                yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            cumulative, total, count = child.snapshot()
+            for bound, running in zip(self.buckets + (float("inf"),), cumulative):
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(float(bound))}"')
+                yield f"{self.name}_bucket{labels} {running}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(float(total))}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    """All metrics of the process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, cls, name, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry, so utilities without a bot reference can record too
+REGISTRY = Registry()
+
+UPSTREAM_DURATION = REGISTRY.histogram(
+    "safari_upstream_request_duration_seconds", "Latency of requests to Lichess, Twitch and other APIs", ("host",))
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "safari_upstream_errors", "Failed upstream requests (exceptions and 4xx/5xx responses)", ("host", "reason"))
+
+
+class _RateLimitCounter(logging.Handler):
+    """Counts the 429s py-cord reports while it waits them out.
+
+    py-cord logs "We are being rate limited" for every 429 and, right
+    after it and before sleeping, "Global rate limit has been hit" for a
+    global one. So a 429 is only counted once the task that logged it
+    has moved on: as global if the second line came, as bucket otherwise.
+    """
+
+    def __init__(self, counter):
+        super().__init__(logging.WARNING)
+        self.bucket = counter.labels("bucket")
+        self.global_ = counter.labels("global")
+        # Tasks that logged a 429 which is not classified yet
+        self._pending = set()
+
+    def _settle(self, task):
+        if task in self._pending:
+            self._pending.discard(task)
+            self.bucket.inc()
+
+    def emit(self, record):
+        message = record.msg if isinstance(record.msg, str) else ""
+        if message.startswith("We are being rate limited"):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.bucket.inc()
+                return
+            task = asyncio.current_task(loop)
+            self._pending.add(task)
+            # Runs once the task awaits its retry sleep, after any global line
+            loop.call_soon(self._settle, task)
+        elif message.startswith("Global rate limit"):
+            try:
+                self._pending.discard(asyncio.current_task())
+            except RuntimeError:
+                pass
+            self.global_.inc()
+
+
+def instrument_bot(bot, registry=REGISTRY):
+    """Time event handlers, commands and Discord API calls of a bot.
+
+    Wraps the bot's own methods on the instance, so every listener and
+    command is covered without touching the cogs.
+    """
+    if getattr(bot, "_metrics_instrumented", False):
+        return
+    bot._metrics_instrumented = True
+
+    event_duration = registry.histogram(
+        "safari_event_handler_duration_seconds", "Time spent in each event handler", ("event",))
+    event_errors = registry.counter("safari_event_handler_errors", "Event handlers that raised", ("event",))
+    command_duration = registry.histogram(
+        "safari_command_duration_seconds", "Time to run a command", ("command", "kind"))
+    discord_duration = registry.histogram(
+        "safari_discord_request_duration_seconds", "Latency of Discord API calls, including rate-limit waits",
+        ("method", "route"))
+    discord_errors = registry.counter(
+        "safari_discord_request_errors", "Discord API calls that failed", ("method", "route", "status"))
+    rate_limited = registry.counter("safari_discord_rate_limited", "429 responses from Discord", ("scope",))
+    logging.getLogger("discord.http").addHandler(_RateLimitCounter(rate_limited))
+
+    run_event = bot._run_event
+
+    async def timed_run_event(coro, event_name, *args, **kwargs):
+        async def handler(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                await coro(*args, **kwargs)
+            except Exception:
+                event_errors.labels(event_name).inc()
+                raise
+            finally:
+                event_duration.labels(event_name).observe(time.perf_counter() - start)
+        await run_event(handler, event_name, *args, **kwargs)
+
+    bot._run_event = timed_run_event
+
+    def timed_invoke(invoke, kind):
+        async def wrapper(ctx):
+            start = time.perf_counter()
+            try:
+                await invoke(ctx)
+            finally:
+                name = ctx.command.qualified_name if ctx.command else "unknown"
+                command_duration.labels(name, kind).observe(time.perf_counter() - start)
+        return wrapper
+
+    bot.invoke = timed_invoke(bot.invoke, "prefix")
+    if hasattr(bot, "invoke_application_command"):
+        bot.invoke_application_command = timed_invoke(bot.invoke_application_command, "slash")
+
+    request = bot.http.request
+
+    async def timed_request(route, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await request(route, **kwargs)
+        except Exception as e:
+            discord_errors.labels(route.method, route.path, str(getattr(e, "status", type(e).__name__))).inc()
+            raise
+        finally:
+            discord_duration.labels(route.method, route.path).observe(time.perf_counter() - start)
+
+    bot.http.request = timed_request
@@ -0,0 +1,302 @@
+import io
+import os
+import json
+import base64
+import time
+import asyncio
+import logging
+from collections import deque
+
+import discord
+
+from utils.stats import percentile
+
+logger = logging.getLogger("safari_buddy.modlog")
+
+# Discord limits for a single message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+# Number of recent flush latencies kept for percentile reporting
+LATENCY_SAMPLES = 1024
+
+# What to do with new entries once a guild's queue is full
+DROP_OLDEST = "drop_oldest"
+SPILL = "spill"
+
+
+class _GuildQueue:
+    """Pending mod-log embeds for one guild and the task that sends them."""
+
+    def __init__(self, guild_id, channel, spill_path):
+        self.guild_id = guild_id
+        self.channel = channel
+        self.spill_path = spill_path
+        # (monotonic enqueue time, embed, attachment), oldest first
+        self.items = deque()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        # Entries waiting in the spill file; they are older than anything enqueued after them
+        self.spilled = 0
+        if spill_path and os.path.exists(spill_path):
+            with open(spill_path, encoding="utf-8") as spill:
+                self.spilled = sum(1 for _ in spill)
+
+
+class ModLogWriter:
+    """Batches mod-log embeds per guild into as few messages as possible.
+
+    Each guild has its own queue and sender task. A message goes out once
+    ``batch_size`` embeds (at most 10, and at most 6000 embed characters)
+    are waiting or the oldest one has waited ``max_delay`` seconds, so a
+    raid or a purge costs one send per ten events instead of one each, and
+    the per-channel rate limit stops holding the log minutes behind.
+    Guilds never wait on each other. A queue holds at most ``max_queue``
+    embeds; beyond that the oldest are dropped, or with the ``spill``
+    policy the overflow is appended to a file per guild and sent once the
+    queue has caught up. Spill files left by an earlier run are picked up
+    with resume() once the guild's channel is known, and drain() sends
+    what is queued before shutdown, spilling what it could not send.
+    """
+
+    def __init__(self, batch_size=MAX_EMBEDS_PER_MESSAGE, max_delay=2.0, max_queue=500,
+                 overflow=DROP_OLDEST, spill_dir=None):
+        if overflow not in (DROP_OLDEST, SPILL):
+            raise ValueError(f"Unknown mod-log overflow policy: {overflow}")
+        self.batch_size = max(1, min(batch_size, MAX_EMBEDS_PER_MESSAGE))
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.spill_dir = spill_dir
+        if overflow == SPILL and spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._queues = {}
+
+        # Stats
+        self.enqueued = 0
+        self.messages = 0
+        self.embeds_sent = 0
+        self.send_failures = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.max_depth = 0
+        self.flush_latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    @classmethod
+    def from_env(cls):
+        """Build a writer from the MODLOG_* environment variables."""
+        data_dir = os.getenv("DATA_DIR", "data")
+        return cls(
+            batch_size=int(os.getenv("MODLOG_BATCH_SIZE", str(MAX_EMBEDS_PER_MESSAGE))),
+            max_delay=float(os.getenv("MODLOG_MAX_DELAY", "2")),
+            max_queue=int(os.getenv("MODLOG_MAX_QUEUE", "500")),
+            overflow=os.getenv("MODLOG_OVERFLOW", DROP_OLDEST),
+            spill_dir=os.getenv("MODLOG_SPILL_DIR", os.path.join(data_dir, "modlog_spill")),
+        )
+
+    def _queue(self, channel):
+        guild_id = channel.guild.id
+        queue = self._queues.get(guild_id)
+        if queue is None:
+            spill_path = os.path.join(self.spill_dir, f"{guild_id}.jsonl") if self.overflow == SPILL and self.spill_dir else None
+            queue = _GuildQueue(guild_id, channel, spill_path)
+            self._queues[guild_id] = queue
+        # Follow the channel if the guild's mod-logs channel changed
+        queue.channel = channel
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.ensure_future(self._run(queue))
+        return queue
+
+    def enqueue(self, channel, embed, attachment=None):
+        """Queue an embed for a guild's mod-logs channel; never waits on Discord.
+
+        ``attachment`` is an optional (filename, bytes) pair uploaded with it.
+        """
+        queue = self._queue(channel)
+        self.enqueued += 1
+        item = (time.monotonic(), embed, attachment)
+
+        if queue.spilled or len(queue.items) >= self.max_queue:
+            if queue.spill_path:
+                self._spill(queue, item)
+            else:
+                queue.items.popleft()
+                self.dropped += 1
+                queue.items.append(item)
+        else:
+            queue.items.append(item)
+
+        self.max_depth = max(self.max_depth, len(queue.items) + queue.spilled)
+        queue.wakeup.set()
+
+    @staticmethod
+    def _spill_line(item):
+        _, embed, attachment = item
+        entry = {"embed": embed.to_dict()}
+        if attachment:
+            filename, data = attachment
+            entry["attachment"] = [filename, base64.b64encode(data).decode("ascii")]
+        return json.dumps(entry) + "\n"
+
+    def _spill(self, queue, item):
+        with open(queue.spill_path, "a", encoding="utf-8") as spill:
+            spill.write(self._spill_line(item))
+        queue.spilled += 1
+        self.spilled += 1
+
+    def _spill_queued(self, queue):
+        """Put the entries still in memory back in front of the spill file, oldest first."""
+        lines = [self._spill_line(item) for item in queue.items]
+        if os.path.exists(queue.spill_path):
+            with open(queue.spill_path, encoding="utf-8") as spill:
+                lines.extend(spill.readlines())
+        with open(queue.spill_path, "w", encoding="utf-8") as spill:
+            spill.writelines(lines)
+        queue.spilled += len(queue.items)
+        self.spilled += len(queue.items)
+        queue.items.clear()
+
+    def pending_spills(self):
+        """Guild IDs with a spill file that no queue has picked up yet (e.g. from before a restart)."""
+        if self.overflow != SPILL or not self.spill_dir or not os.path.isdir(self.spill_dir):
+            return []
+        guild_ids = []
+        for filename in os.listdir(self.spill_dir):
+            name, ext = os.path.splitext(filename)
+            if ext == ".jsonl" and name.isdigit() and int(name) not in self._queues:
+                guild_ids.append(int(name))
+        return guild_ids
+
+    def resume(self, channel):
+        """Start sending a guild's spilled entries without waiting for a new one."""
+        self._queue(channel).wakeup.set()
+
+    def _unspill(self, queue):
+        """Move the oldest spilled entries back into memory once the queue has drained."""
+        with open(queue.spill_path, encoding="utf-8") as spill:
+            lines = spill.readlines()
+        loaded, rest = lines[:self.max_queue], lines[self.max_queue:]
+        now = time.monotonic()
+        for line in loaded:
+            entry = json.loads(line)
+            attachment = entry.get("attachment")
+            if attachment:
+                attachment = (attachment[0], base64.b64decode(attachment[1]))
+            queue.items.append((now, discord.Embed.from_dict(entry["embed"]), attachment))
+        if rest:
+            with open(queue.spill_path, "w", encoding="utf-8") as spill:
+                spill.writelines(rest)
+        else:
+            os.remove(queue.spill_path)
+        queue.spilled = len(rest)
+
+    def _take_batch(self, queue):
+        """Pop the oldest embeds that fit into one message."""
+        batch = []
+        chars = 0
+        while queue.items and len(batch) < self.batch_size:
+            size = len(queue.items[0][1])
+            if batch and chars + size > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            batch.append(queue.items.popleft())
+            chars += size
+        return batch
+
+    async def _run(self, queue):
+        while True:
+            if not queue.items and queue.spilled:
+                self._unspill(queue)
+            if not queue.items:
+                queue.wakeup.clear()
+                await queue.wakeup.wait()
+                continue
+
+            # Wait for a full batch, but not past the oldest entry's deadline
+            deadline = queue.items[0][0] + self.max_delay
+            while len(queue.items) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                queue.wakeup.clear()
+                try:
+                    await asyncio.wait_for(queue.wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            await self._flush(queue)
+
+    async def _flush(self, queue):
+        batch = self._take_batch(queue)
+        if not batch:
+            return
+        files = [discord.File(io.BytesIO(attachment[1]), filename=attachment[0])
+                 for _, _, attachment in batch if attachment]
+        try:
+            await queue.channel.send(embeds=[embed for _, embed, _ in batch], files=files or None)
+            self.messages += 1
+            self.embeds_sent += len(batch)
+            self.flush_latencies.append(time.monotonic() - batch[0][0])
+        except asyncio.CancelledError:
+            # Stopped mid-send (e.g. by drain's timeout): keep the entries for the spill file
+            queue.items.extendleft(reversed(batch))
+            raise
+        except Exception as e:
+            self.send_failures += 1
+            logger.error("Error sending %s mod-log entries to guild %s: %s", len(batch), queue.guild_id, e)
+
+    async def drain(self, timeout=10.0):
+        """Send everything queued in memory right away (used before shutting down).
+
+        The sender tasks are stopped first. Whatever is not sent within
+        ``timeout`` seconds is written to the spill file with the spill
+        policy, and otherwise dropped.
+        """
+        self.close()
+
+        async def send_all():
+            for queue in list(self._queues.values()):
+                while queue.items:
+                    await self._flush(queue)
+
+        try:
+            await asyncio.wait_for(send_all(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for queue in self._queues.values():
+            if not queue.items:
+                continue
+            if queue.spill_path:
+                self._spill_queued(queue)
+            else:
+                logger.warning("Dropped %s unsent mod-log entries for guild %s at shutdown",
+                               len(queue.items), queue.guild_id)
+                self.dropped += len(queue.items)
+                queue.items.clear()
+
+    def close(self):
+        for queue in self._queues.values():
+            if queue.task is not None:
+                queue.task.cancel()
+
+    def queue_depth(self):
+        """Embeds waiting in memory across all guilds."""
+        return sum(len(queue.items) for queue in self._queues.values())
+
+    def stats(self):
+        """Return queue depth, batching and flush latency metrics."""
+        samples = list(self.flush_latencies)
+        return {
+            "guilds": len(self._queues),
+            "queue_depth": self.queue_depth(),
+            "spilled_pending": sum(queue.spilled for queue in self._queues.values()),
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "messages": self.messages,
+            "embeds_sent": self.embeds_sent,
+            "embeds_per_message": self.embeds_sent / self.messages if self.messages else 0.0,
+            "send_failures": self.send_failures,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "flush_latency_p50_ms": percentile(samples, 50) * 1000,
+            "flush_latency_p99_ms": percentile(samples, 99) * 1000,
+        }
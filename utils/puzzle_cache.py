@@ -0,0 +1,122 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger("safari_buddy.puzzle_cache")
+
+
+class DailyPuzzleCache:
+    """TTL cache for the Lichess daily puzzle.
+
+    Entries are keyed on the puzzle day, which starts at ``rollover_hour``
+    UTC. Concurrent misses share a single upstream fetch, and when a
+    refresh is slower than ``stale_timeout`` seconds callers get the
+    previous puzzle while the refresh finishes in the background.
+    """
+
+    def __init__(self, fetch, rollover_hour=0, stale_timeout=2.0, recheck_interval=300, key=None):
+        self._fetch = fetch
+        # Returns the puzzle ID of a fetched value; defaults to the Lichess payload shape
+        self._key = key or (lambda data: data.get("puzzle", {}).get("id"))
+        self.rollover_hour = rollover_hour
+        self.stale_timeout = stale_timeout
+        self.recheck_interval = recheck_interval
+
+        # (day, data, expires, stale_id): expires is a monotonic deadline or None,
+        # stale_id the previous day's puzzle ID while Lichess has not rolled over
+        self._entry = None
+        self._inflight = None
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_served = 0
+        self.upstream_fetches = 0
+        self.upstream_errors = 0
+
+    def current_day(self, now=None):
+        """Return the puzzle day for the given UTC time."""
+        now = now or datetime.now(timezone.utc)
+        return (now - timedelta(hours=self.rollover_hour)).date()
+
+    def _is_fresh(self, entry, day):
+        if entry is None or entry[0] != day:
+            return False
+        return entry[2] is None or time.monotonic() < entry[2]
+
+    async def get(self):
+        """Return today's puzzle payload, fetching it at most once per day."""
+        day = self.current_day()
+        entry = self._entry
+
+        if self._is_fresh(entry, day):
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh(day))
+        else:
+            self.coalesced += 1
+        inflight = self._inflight
+
+        # Nothing to fall back on, so wait for the upstream
+        if entry is None:
+            return await asyncio.shield(inflight)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(inflight), self.stale_timeout)
+        except asyncio.TimeoutError:
+            self.stale_served += 1
+            logger.info("Lichess is slow, serving cached daily puzzle while revalidating")
+            return entry[1]
+
+    async def _refresh(self, day):
+        """Fetch the puzzle from upstream and store it under the given day."""
+        previous = self._entry
+        try:
+            self.upstream_fetches += 1
+            data = await self._fetch()
+            if not data:
+                self.upstream_errors += 1
+                return previous[1] if previous else None
+
+            if previous is None:
+                stale_id = None
+            elif previous[0] != day:
+                stale_id = self._key(previous[1])
+            else:
+                stale_id = previous[3]
+
+            if stale_id is not None and self._key(data) == stale_id:
+                # Lichess has not rolled over yet; keep it but check again soon
+                self._entry = (day, data, time.monotonic() + self.recheck_interval, stale_id)
+            else:
+                self._entry = (day, data, None, None)
+            return data
+        except Exception as e:
+            self.upstream_errors += 1
+            logger.error("Error refreshing daily puzzle cache: %s", e)
+            return previous[1] if previous else None
+        finally:
+            self._inflight = None
+
+    def invalidate(self):
+        """Drop the cached puzzle so the next call goes upstream."""
+        self._entry = None
+
+    def stats(self):
+        """Return hit/miss counters for the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            "upstream_fetches": self.upstream_fetches,
+            "upstream_errors": self.upstream_errors,
+            "cached_day": self._entry[0].isoformat() if self._entry else None,
+        }
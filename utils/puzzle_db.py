@@ -0,0 +1,300 @@
+"""Offline Lichess puzzle database with indexed rating-range queries.
+
+Imports the Lichess puzzle dump (https://database.lichess.org/#puzzles) or
+any CSV with the same columns:
+
+    PuzzleId,FEN,Moves,Rating,RatingDeviation,Popularity,NbPlays,Themes,GameUrl,OpeningTags
+
+Puzzles are stored in rating order so that a random puzzle in a rating band
+(and optionally a theme) is two index seeks plus a primary key lookup.
+
+Usage, from the repository root:
+
+    python -m utils.puzzle_db import lichess_db_puzzle.csv.zst [--db data/lichess_puzzles.db]
+"""
+import os
+import io
+import csv
+import bz2
+import time
+import random
+import sqlite3
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from utils.fen import apply_uci_move
+
+logger = logging.getLogger("safari_buddy.puzzle_db")
+
+# Rows inserted per executemany batch while importing
+IMPORT_BATCH_SIZE = 10000
+
+SCHEMA = """
+CREATE TABLE puzzles (
+    rank INTEGER PRIMARY KEY,
+    puzzle_id TEXT NOT NULL,
+    fen TEXT NOT NULL,
+    moves TEXT NOT NULL,
+    rating INTEGER NOT NULL,
+    plays INTEGER NOT NULL,
+    themes TEXT NOT NULL,
+    game_url TEXT NOT NULL
+);
+CREATE TABLE themes (
+    theme_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE puzzle_themes (
+    seq INTEGER PRIMARY KEY,
+    theme_id INTEGER NOT NULL,
+    rating INTEGER NOT NULL,
+    rank INTEGER NOT NULL
+);
+"""
+
+STAGING_SCHEMA = """
+CREATE TABLE staging_puzzles (
+    puzzle_id TEXT NOT NULL,
+    fen TEXT NOT NULL,
+    moves TEXT NOT NULL,
+    rating INTEGER NOT NULL,
+    plays INTEGER NOT NULL,
+    themes TEXT NOT NULL,
+    game_url TEXT NOT NULL
+);
+CREATE TABLE staging_themes (
+    puzzle_id TEXT NOT NULL,
+    theme_id INTEGER NOT NULL,
+    rating INTEGER NOT NULL
+);
+"""
+
+
+def _open_dump(path):
+    """Open a plain, bz2 or zstd compressed CSV dump as a text stream."""
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8", newline="")
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Reading .zst dumps requires the 'zstandard' package (pip install zstandard)")
+        raw = open(path, "rb")
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def import_dump(csv_path, db_path, progress_every=250000):
+    """Stream a puzzle CSV into a fresh database at db_path.
+
+    Memory use is bounded by the batch size; sorting happens inside SQLite.
+    The new database is built next to db_path and swapped in at the end, so
+    a running bot keeps serving the old one until the import is complete.
+    Returns the number of imported puzzles.
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = db_path + ".importing"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    db = sqlite3.connect(tmp_path)
+    db.execute("PRAGMA journal_mode=OFF")
+    db.execute("PRAGMA synchronous=OFF")
+    db.execute("PRAGMA temp_store=FILE")
+    db.executescript(SCHEMA)
+    db.executescript(STAGING_SCHEMA)
+
+    theme_ids = {}
+    puzzles = []
+    puzzle_themes = []
+    count = 0
+    start = time.perf_counter()
+
+    def flush():
+        db.executemany("INSERT INTO staging_puzzles VALUES (?, ?, ?, ?, ?, ?, ?)", puzzles)
+        db.executemany("INSERT INTO staging_themes VALUES (?, ?, ?)", puzzle_themes)
+        puzzles.clear()
+        puzzle_themes.clear()
+
+    with _open_dump(csv_path) as handle:
+        for row in csv.reader(handle):
+            if not row or row[0] == "PuzzleId":
+                continue
+            puzzle_id, fen, moves, rating, _, _, plays, themes, game_url = row[:9]
+            rating = int(rating)
+            puzzles.append((puzzle_id, fen, moves, rating, int(plays or 0), themes, game_url))
+            for theme in themes.split():
+                theme_id = theme_ids.get(theme)
+                if theme_id is None:
+                    theme_id = theme_ids[theme] = len(theme_ids) + 1
+                puzzle_themes.append((puzzle_id, theme_id, rating))
+
+            count += 1
+            if len(puzzles) >= IMPORT_BATCH_SIZE:
+                flush()
+            if count % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                logger.info("Imported %s puzzles (%s rows/s)", format(count, ","), format(count / elapsed, ",.0f"))
+        flush()
+
+    logger.info("Sorting puzzles by rating and building indexes")
+    db.executemany("INSERT INTO themes (theme_id, name) VALUES (?, ?)",
+                   [(theme_id, name) for name, theme_id in theme_ids.items()])
+    # Rank is assigned in rating order, so a rating band is a contiguous rank range
+    db.execute(
+        "INSERT INTO puzzles (puzzle_id, fen, moves, rating, plays, themes, game_url) "
+        "SELECT puzzle_id, fen, moves, rating, plays, themes, game_url FROM staging_puzzles ORDER BY rating"
+    )
+    db.execute("DROP TABLE staging_puzzles")
+    db.execute("CREATE INDEX puzzles_rating ON puzzles (rating)")
+    db.execute("CREATE UNIQUE INDEX puzzles_puzzle_id ON puzzles (puzzle_id)")
+    # Likewise seq is assigned in (theme, rating) order
+    db.execute(
+        "INSERT INTO puzzle_themes (theme_id, rating, rank) "
+        "SELECT t.theme_id, t.rating, p.rank FROM staging_themes AS t "
+        "JOIN puzzles AS p ON p.puzzle_id = t.puzzle_id ORDER BY t.theme_id, t.rating"
+    )
+    db.execute("DROP TABLE staging_themes")
+    db.execute("CREATE INDEX puzzle_themes_theme_rating ON puzzle_themes (theme_id, rating)")
+    db.commit()
+    db.execute("VACUUM")
+    db.close()
+
+    os.replace(tmp_path, db_path)
+    elapsed = time.perf_counter() - start
+    logger.info("Imported %s puzzles in %.1fs (%s rows/s)", format(count, ","), elapsed, format(count / max(elapsed, 1e-9), ",.0f"))
+    return count
+
+
+class OfflinePuzzleDB:
+    """Read-only access to an imported puzzle database."""
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="puzzle-db")
+        self.themes = dict(self._db.execute("SELECT name, theme_id FROM themes"))
+        self.size = self._db.execute("SELECT MAX(rank) FROM puzzles").fetchone()[0] or 0
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """Open the database at PUZZLE_DB_PATH, or return None if it has not been imported."""
+        data_dir = os.getenv("DATA_DIR", "data")
+        path = os.getenv("PUZZLE_DB_PATH", os.path.join(data_dir, "lichess_puzzles.db"))
+        if not os.path.exists(path):
+            logger.info("No offline puzzle database at %s, using Lichess for random puzzles", path)
+            return None
+        db = cls(path)
+        logger.info("Loaded offline puzzle database with %s puzzles", format(db.size, ","))
+        return db
+
+    def pick(self, rating_min, rating_max, theme=None):
+        """Return a uniformly random puzzle payload in the rating band, or None."""
+        if theme:
+            theme_id = self.themes.get(theme)
+            if theme_id is None:
+                return None
+            low = self._db.execute(
+                "SELECT seq FROM puzzle_themes WHERE theme_id = ? AND rating >= ? ORDER BY rating, seq LIMIT 1",
+                (theme_id, rating_min)
+            ).fetchone()
+            high = self._db.execute(
+                "SELECT seq FROM puzzle_themes WHERE theme_id = ? AND rating <= ? ORDER BY rating DESC, seq DESC LIMIT 1",
+                (theme_id, rating_max)
+            ).fetchone()
+            if not low or not high or low[0] > high[0]:
+                return None
+            rank = self._db.execute(
+                "SELECT rank FROM puzzle_themes WHERE seq = ?", (random.randint(low[0], high[0]),)
+            ).fetchone()[0]
+        else:
+            low = self._db.execute(
+                "SELECT rank FROM puzzles WHERE rating >= ? ORDER BY rating, rank LIMIT 1", (rating_min,)
+            ).fetchone()
+            high = self._db.execute(
+                "SELECT rank FROM puzzles WHERE rating <= ? ORDER BY rating DESC, rank DESC LIMIT 1", (rating_max,)
+            ).fetchone()
+            if not low or not high or low[0] > high[0]:
+                return None
+            rank = random.randint(low[0], high[0])
+
+        row = self._db.execute(
+            "SELECT puzzle_id, fen, moves, rating, plays, themes, game_url FROM puzzles WHERE rank = ?", (rank,)
+        ).fetchone()
+        return self.to_payload(row)
+
+    async def random_puzzle(self, rating_min, rating_max, theme=None):
+        """Async wrapper around pick() that keeps disk reads off the event loop."""
+        loop = asyncio.get_running_loop()
+        puzzle_data = await loop.run_in_executor(self._executor, self.pick, rating_min, rating_max, theme)
+        if puzzle_data:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return puzzle_data
+
+    @staticmethod
+    def to_payload(row):
+        """Convert a database row into the same shape as a Lichess API puzzle."""
+        puzzle_id, fen, moves, rating, plays, themes, game_url = row
+        moves = moves.split()
+        # The dump's FEN is the position before the opponent's move that sets up the puzzle
+        puzzle_fen = apply_uci_move(fen, moves[0]) if moves else fen
+        return {
+            "puzzle": {
+                "id": puzzle_id,
+                "fen": puzzle_fen,
+                "rating": rating,
+                "plays": plays,
+                "solution": moves[1:],
+                "themes": themes.split(),
+            },
+            "game": {
+                "url": game_url
+            }
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._db.close()
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "themes": len(self.themes),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def main():
+    import argparse
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Manage the offline Lichess puzzle database")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    import_parser = subcommands.add_parser("import", help="Import a Lichess puzzle CSV dump")
+    import_parser.add_argument("csv_path")
+    import_parser.add_argument(
+        "--db",
+        default=os.getenv("PUZZLE_DB_PATH", os.path.join(os.getenv("DATA_DIR", "data"), "lichess_puzzles.db"))
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.command == "import":
+        import_dump(args.csv_path, args.db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+class Puzzle:
+    """A Lichess puzzle, parsed once from an API (or offline database) payload."""
+
+    __slots__ = ("id", "rating", "plays", "fen", "solution", "themes", "game_url")
+
+    def __init__(self, id, rating="Unknown", plays=0, fen=None, solution=(), themes=(), game_url=None):
+        self.id = id
+        self.rating = rating
+        self.plays = plays
+        self.fen = fen
+        self.solution = tuple(solution)
+        self.themes = tuple(themes)
+        self.game_url = game_url or f"https://lichess.org/training/{id}"
+
+    @classmethod
+    def from_payload(cls, data, puzzle_id=None):
+        """Parse a Lichess puzzle payload.
+
+        Raises ValueError if the payload has no 'puzzle' section. The FEN falls
+        back to the game section and is None when neither has one.
+        """
+        if not data or "puzzle" not in data:
+            raise ValueError(f"Unexpected puzzle data format: {data}")
+
+        puzzle = data["puzzle"]
+        game = data.get("game", {})
+        puzzle_id = puzzle.get("id", puzzle_id or "Unknown")
+        return cls(
+            puzzle_id,
+            rating=puzzle.get("rating", "Unknown"),
+            plays=puzzle.get("plays", 0),
+            fen=puzzle.get("fen") or game.get("fen"),
+            solution=puzzle.get("solution", []),
+            themes=puzzle.get("themes", []),
+            game_url=game.get("url"),
+        )
+
+    def to_payload(self):
+        """Serialize back to a Lichess-shaped payload (inverse of from_payload)."""
+        puzzle = {
+            "id": self.id,
+            "rating": self.rating,
+            "plays": self.plays,
+            "solution": list(self.solution),
+            "themes": list(self.themes),
+        }
+        if self.fen:
+            puzzle["fen"] = self.fen
+        return {"puzzle": puzzle, "game": {"url": self.game_url}}
+
+    @property
+    def training_url(self):
+        return f"https://lichess.org/training/{self.id}"
+
+    @property
+    def image_url(self):
+        """Lichess-hosted GIF of the puzzle position."""
+        return f"https://lichess1.org/game/export/gif/puzzle/{self.id}.gif"
+
+    def __repr__(self):
+        return f"<Puzzle id={self.id} rating={self.rating}>"
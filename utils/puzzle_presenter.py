@@ -0,0 +1,139 @@
+import io
+import logging
+from collections import OrderedDict
+from datetime import datetime
+
+import discord
+
+logger = logging.getLogger("safari_buddy.puzzle_presenter")
+
+INSTRUCTIONS = (
+    "Find the best move sequence! Click the link in the title to solve on Lichess. "
+    "React with 🔍 to reveal the solution."
+)
+
+# Render modes
+DAILY = "daily"
+BY_ID = "by_id"
+RANDOM = "random"
+
+
+class PuzzlePresenter:
+    """Single embed-building stage for every puzzle command.
+
+    Embeds are memoized per puzzle ID and render mode, so repeated posts of
+    the same puzzle skip embed construction. Boards are rendered through the
+    optional BoardRenderer; without it the Lichess GIF is used. Solution
+    embeds are built when a puzzle is posted, so a 🔍 reveal only looks one up.
+    """
+
+    def __init__(self, renderer=None, board_theme="brown", cache_size=256):
+        self.renderer = renderer
+        self.board_theme = board_theme
+        self.cache_size = cache_size
+        self._embeds = OrderedDict()
+        self._solutions = OrderedDict()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+
+    async def present(self, puzzle, mode, rating_range=None, theme=None):
+        """Return (embed, file) for a puzzle; file is None when the board is not rendered."""
+        board_file = await self._board_file(puzzle)
+        image_url = "attachment://board.png" if board_file else puzzle.image_url
+
+        # The daily title carries the date, so it is part of the key
+        day = datetime.now().strftime('%B %d, %Y') if mode == DAILY else None
+        key = (puzzle.id, mode, rating_range, theme, day, image_url)
+        embed = self._embeds.get(key)
+        if embed is not None:
+            self._embeds.move_to_end(key)
+            self.hits += 1
+            return embed, board_file
+
+        self.misses += 1
+        embed = self._build(puzzle, mode, rating_range, theme, day, image_url)
+        self._embeds[key] = embed
+        while len(self._embeds) > self.cache_size:
+            self._embeds.popitem(last=False)
+        return embed, board_file
+
+    async def _board_file(self, puzzle):
+        """Render the board as a PNG attachment, or return None to use the Lichess GIF."""
+        if not self.renderer or not puzzle.fen:
+            return None
+        try:
+            png = await self.renderer.render_async(puzzle.fen, theme=self.board_theme)
+            return discord.File(io.BytesIO(png), filename="board.png")
+        except Exception as e:
+            logger.error("Error rendering board for puzzle %s: %s", puzzle.id, e)
+            return None
+
+    def _build(self, puzzle, mode, rating_range, theme, day, image_url):
+        """Build the embed for a puzzle in the given mode."""
+        if mode == DAILY:
+            title = f"🧩 Daily Chess Puzzle - {day}"
+            description = "Test your skills with today's chess puzzle from Lichess!"
+        elif mode == RANDOM:
+            title = f"🧩 Random Chess Puzzle (Rating: {puzzle.rating})"
+            description = "Test your skills with this random puzzle from Lichess!"
+        else:
+            title = f"🧩 Chess Puzzle {puzzle.id}"
+            description = "Test your skills with this chess puzzle from Lichess!"
+
+        embed = discord.Embed(
+            title=title,
+            description=description,
+            color=discord.Color.gold(),
+            url=puzzle.training_url
+        )
+
+        embed.add_field(name="Rating", value=str(puzzle.rating), inline=True)
+        if mode == RANDOM:
+            if rating_range:
+                embed.add_field(name="Rating Range", value=f"{rating_range[0]}-{rating_range[1]}", inline=True)
+            if theme and theme in puzzle.themes:
+                embed.add_field(name="Theme", value=theme, inline=True)
+        elif mode == DAILY or puzzle.plays:
+            embed.add_field(name="Played", value=f"{puzzle.plays} times", inline=True)
+        embed.add_field(name="Puzzle ID", value=f"`{puzzle.id}`", inline=True)
+
+        if puzzle.fen:
+            embed.add_field(name="Position (FEN)", value=f"`{puzzle.fen}`", inline=False)
+
+        embed.add_field(name="Instructions", value=INSTRUCTIONS, inline=False)
+        embed.set_image(url=image_url)
+        embed.set_footer(text=f"Puzzle ID: {puzzle.id} • From a game played on Lichess")
+        return embed
+
+    def solution(self, puzzle_id, moves):
+        """Return the solution embed for a puzzle, building it on first use."""
+        embed = self._solutions.get(puzzle_id)
+        if embed is not None:
+            self._solutions.move_to_end(puzzle_id)
+            return embed
+
+        embed = discord.Embed(
+            title=f"🧩 Solution for Puzzle {puzzle_id}",
+            description="Here's the solution to the daily puzzle:",
+            color=discord.Color.green()
+        )
+        solution_text = "".join(f"{i + 1}. {move}\n" for i, move in enumerate(moves))
+        embed.add_field(name="Winning Sequence", value=f"```{solution_text}```", inline=False)
+        embed.add_field(name="Play on Lichess", value=f"[Click here to try this puzzle](https://lichess.org/training/{puzzle_id})", inline=False)
+
+        self._solutions[puzzle_id] = embed
+        while len(self._solutions) > self.cache_size:
+            self._solutions.popitem(last=False)
+        return embed
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "cached_embeds": len(self._embeds),
+            "cached_solutions": len(self._solutions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
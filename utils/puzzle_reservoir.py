@@ -0,0 +1,142 @@
+import time
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger("safari_buddy.puzzle_reservoir")
+
+# Seconds to wait before retrying a band whose refill failed
+REFILL_RETRY_DELAY = 30
+
+# Consecutive duplicate puzzles after which a refill gives up for now
+MAX_DUPLICATES = 3
+
+
+def parse_bands(value):
+    """Parse a band list such as '1000-1500,1500-2000' into (min, max) tuples."""
+    bands = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        low, high = item.split("-")
+        bands.append((int(low), int(high)))
+    return bands
+
+
+class PuzzleReservoir:
+    """Background-filled pools of ready random puzzles, one per rating band.
+
+    The command path pops a puzzle synchronously; each pop schedules an
+    asynchronous refill so the pool tops itself back up to ``depth``.
+    """
+
+    def __init__(self, fetch, bands, depth=5, refill_concurrency=2, key=None):
+        self._fetch = fetch
+        # Returns the puzzle ID of a fetched value; defaults to the Lichess payload shape
+        self._key = key or (lambda data: data.get("puzzle", {}).get("id"))
+        self.depth = depth
+        self._pools = {band: deque() for band in bands}
+        # Times at which puzzles were popped and not yet replaced, per band
+        self._pending = {band: deque() for band in bands}
+        self._refills = {}
+        self._semaphore = asyncio.Semaphore(refill_concurrency)
+        self._running = False
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.refilled = 0
+        self.refill_errors = 0
+        self.refill_lag_samples = 0
+        self.refill_lag_total = 0.0
+        self.refill_lag_max = 0.0
+
+    def start(self):
+        """Begin filling every band up to its depth."""
+        if self.depth <= 0:
+            return
+        self._running = True
+        for band in self._pools:
+            self._schedule_refill(band)
+
+    def stop(self):
+        """Cancel any refills in progress."""
+        self._running = False
+        for task in self._refills.values():
+            task.cancel()
+        self._refills.clear()
+
+    def pop(self, rating_min, rating_max):
+        """Return a ready puzzle for this exact band, or None if none is available."""
+        band = (rating_min, rating_max)
+        pool = self._pools.get(band)
+        if pool is None:
+            return None
+
+        if not pool:
+            self.misses += 1
+            self._schedule_refill(band)
+            return None
+
+        self.hits += 1
+        self._pending[band].append(time.monotonic())
+        self._schedule_refill(band)
+        return pool.popleft()
+
+    def _schedule_refill(self, band):
+        if not self._running or band in self._refills:
+            return
+        self._refills[band] = asyncio.ensure_future(self._refill(band))
+
+    async def _refill(self, band):
+        """Top a band back up to depth, limited by the shared refill semaphore."""
+        pool = self._pools[band]
+        pending = self._pending[band]
+        duplicates = 0
+        try:
+            while len(pool) < self.depth and duplicates < MAX_DUPLICATES:
+                async with self._semaphore:
+                    puzzle_data = await self._fetch(*band)
+                if not puzzle_data:
+                    self.refill_errors += 1
+                    logger.warning("Refill failed for puzzle band %s-%s, retrying in %ss", band[0], band[1], REFILL_RETRY_DELAY)
+                    await asyncio.sleep(REFILL_RETRY_DELAY)
+                    continue
+
+                puzzle_id = self._key(puzzle_data)
+                if any(self._key(queued) == puzzle_id for queued in pool):
+                    duplicates += 1
+                    continue
+                duplicates = 0
+                pool.append(puzzle_data)
+                self.refilled += 1
+
+                if pending:
+                    lag = time.monotonic() - pending.popleft()
+                    self.refill_lag_samples += 1
+                    self.refill_lag_total += lag
+                    self.refill_lag_max = max(self.refill_lag_max, lag)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.refill_errors += 1
+            logger.error("Error refilling puzzle band %s-%s: %s", band[0], band[1], e)
+        finally:
+            self._refills.pop(band, None)
+
+    def stats(self):
+        """Return hit rate, pool levels and refill lag."""
+        lookups = self.hits + self.misses
+        return {
+            "depth": self.depth,
+            "levels": {f"{low}-{high}": len(pool) for (low, high), pool in self._pools.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "refilled": self.refilled,
+            "refill_errors": self.refill_errors,
+            "refill_lag_avg_s": self.refill_lag_total / self.refill_lag_samples if self.refill_lag_samples else 0.0,
+            "refill_lag_max_s": self.refill_lag_max,
+            "refills_in_progress": len(self._refills),
+        }
@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("safari_buddy.puzzle_store")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS puzzles (
+    puzzle_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS puzzles_accessed ON puzzles (accessed);
+CREATE TABLE IF NOT EXISTS posted (
+    puzzle_id TEXT PRIMARY KEY,
+    posted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posted_at ON posted (posted_at);
+"""
+
+
+class PuzzleStore:
+    """Two-tier store for Lichess puzzles fetched by ID.
+
+    Puzzles never change once published, so they are kept in an in-memory
+    LRU backed by a local SQLite file that survives restarts. Memory hits
+    are served synchronously; disk access runs on a single worker thread.
+    ``encode``/``decode`` convert between stored values and JSON-able dicts,
+    so the memory tier can hold parsed objects.
+    """
+
+    def __init__(self, path, memory_size=512, disk_size=100000, encode=None, decode=None):
+        self.path = path
+        self._encode = encode or (lambda data: data)
+        self._decode = decode or (lambda data: data)
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self._memory = OrderedDict()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="puzzle-store")
+        # Upper bound on the disk row count, refreshed whenever it crosses the limit
+        self._disk_count = self._db.execute("SELECT COUNT(*) FROM puzzles").fetchone()[0]
+
+        # Stats
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Build a store from the PUZZLE_STORE_* environment variables."""
+        data_dir = os.getenv("DATA_DIR", "data")
+        return cls(
+            os.getenv("PUZZLE_STORE_PATH", os.path.join(data_dir, "puzzles.db")),
+            memory_size=int(os.getenv("PUZZLE_STORE_MEMORY_SIZE", "512")),
+            disk_size=int(os.getenv("PUZZLE_STORE_DISK_SIZE", "100000")),
+            **kwargs
+        )
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _remember(self, puzzle_id, data):
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self._memory[puzzle_id] = data
+        self._memory.move_to_end(puzzle_id)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
+
+    def get_cached(self, puzzle_id):
+        """Return a puzzle from the memory tier only, or None."""
+        data = self._memory.get(puzzle_id)
+        if data is not None:
+            self._memory.move_to_end(puzzle_id)
+            self.memory_hits += 1
+        return data
+
+    async def get(self, puzzle_id):
+        """Return a stored puzzle payload, or None if it has never been seen."""
+        data = self.get_cached(puzzle_id)
+        if data is not None:
+            return data
+
+        data = await self._run(self._load, puzzle_id)
+        if data is None:
+            self.misses += 1
+            return None
+
+        self.disk_hits += 1
+        self._remember(puzzle_id, data)
+        return data
+
+    async def put(self, puzzle_id, data):
+        """Store a puzzle payload in both tiers."""
+        self._remember(puzzle_id, data)
+        await self._run(self._save, puzzle_id, json.dumps(self._encode(data)))
+
+    async def record_posted(self, puzzle_id, data=None):
+        """Remember that a puzzle was posted so it is preloaded on the next start."""
+        if data is not None:
+            self._remember(puzzle_id, data)
+        await self._run(self._save_posted, puzzle_id, None if data is None else json.dumps(self._encode(data)))
+
+    def _load(self, puzzle_id):
+        row = self._db.execute("SELECT payload FROM puzzles WHERE puzzle_id = ?", (puzzle_id,)).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE puzzles SET accessed = ? WHERE puzzle_id = ?", (time.time(), puzzle_id))
+        self._db.commit()
+        return self._decode(json.loads(row[0]))
+
+    def _save(self, puzzle_id, payload):
+        self._db.execute(
+            "INSERT OR REPLACE INTO puzzles (puzzle_id, payload, accessed) VALUES (?, ?, ?)",
+            (puzzle_id, payload, time.time())
+        )
+        self._evict_disk()
+        self._db.commit()
+
+    def _save_posted(self, puzzle_id, payload):
+        now = time.time()
+        if payload is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO puzzles (puzzle_id, payload, accessed) VALUES (?, ?, ?)",
+                (puzzle_id, payload, now)
+            )
+            self._evict_disk()
+        self._db.execute("INSERT OR REPLACE INTO posted (puzzle_id, posted_at) VALUES (?, ?)", (puzzle_id, now))
+        self._db.commit()
+
+    def _evict_disk(self):
+        """Trim the disk tier back under its size limit, oldest access first."""
+        self._disk_count += 1
+        if self._disk_count <= self.disk_size:
+            return
+        self._disk_count = self._db.execute("SELECT COUNT(*) FROM puzzles").fetchone()[0]
+        excess = self._disk_count - self.disk_size
+        if excess <= 0:
+            return
+        # Evict an extra 10% so we do not trim on every insert
+        excess += self.disk_size // 10
+        deleted = self._db.execute(
+            "DELETE FROM puzzles WHERE puzzle_id IN "
+            "(SELECT puzzle_id FROM puzzles ORDER BY accessed LIMIT ?)",
+            (excess,)
+        ).rowcount
+        self.disk_evictions += deleted
+        self._disk_count = max(0, self._disk_count - deleted)
+
+    def warm_up(self, limit=100):
+        """Preload the most recently posted puzzles into the memory tier."""
+        rows = self._db.execute(
+            "SELECT p.puzzle_id, p.payload FROM posted AS r "
+            "JOIN puzzles AS p ON p.puzzle_id = r.puzzle_id "
+            "ORDER BY r.posted_at DESC LIMIT ?",
+            (min(limit, self.memory_size),)
+        ).fetchall()
+        # Insert oldest first so the newest end up most recently used
+        for puzzle_id, payload in reversed(rows):
+            self._remember(puzzle_id, self._decode(json.loads(payload)))
+        logger.info("Warmed puzzle store with %s recently posted puzzle(s)", len(rows))
+        return len(rows)
+
+    def close(self):
+        """Finish pending writes and close the database."""
+        self._executor.shutdown(wait=True)
+        self._db.close()
+
+    def stats(self):
+        """Return hit and eviction counters for both tiers."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_size": len(self._memory),
+            "memory_limit": self.memory_size,
+            "disk_limit": self.disk_size,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_evictions": self.memory_evictions,
+            "disk_evictions": self.disk_evictions,
+        }
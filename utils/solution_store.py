@@ -0,0 +1,236 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("safari_buddy.solution_store")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    message_id INTEGER PRIMARY KEY,
+    puzzle_id TEXT NOT NULL,
+    solution TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS solutions_expires ON solutions (expires);
+"""
+
+Solution = namedtuple("Solution", ("puzzle_id", "solution", "expires"))
+
+
+class SolutionStore:
+    """Puzzle solutions keyed by the Discord message they were posted in.
+
+    Recent solutions live in a bounded in-memory dict (insertion order is
+    expiry order, since every entry gets the same TTL), so the reaction
+    handler does a single O(1) lookup. A solution read back from disk is
+    put in memory too, so later reactions on an older puzzle stay off the
+    disk; such entries sit behind newer ones, so they expire on lookup or
+    are evicted rather than purged from the front. New solutions are written behind to
+    SQLite in batches every ``flush_interval`` seconds; older solutions are
+    read back from disk, so reactions keep working after a restart.
+
+    Most 🔍 reactions are not on puzzles, so misses avoid the disk too:
+    message IDs grow with time, and one outside the range of stored
+    messages cannot have a solution, while misses inside it are
+    remembered in a bounded negative cache.
+    """
+
+    def __init__(self, path, ttl=7 * 86400, memory_size=10000, flush_interval=5.0, missing_size=10000):
+        self.path = path
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.flush_interval = flush_interval
+        self._memory = OrderedDict()
+        # Rows not yet written to disk, keyed by message ID
+        self._pending = {}
+        self._flush_task = None
+        # Message IDs known to have no solution, oldest first
+        self.missing_size = missing_size
+        self._missing = OrderedDict()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        # Smallest and largest message ID with a solution; expired rows only widen the range
+        self._oldest, self._newest = self._db.execute(
+            "SELECT MIN(message_id), MAX(message_id) FROM solutions WHERE expires >= ?", (time.time(),)
+        ).fetchone()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="solution-store")
+
+        # Stats
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_misses = 0
+        self.expired = 0
+        self.memory_evictions = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a store from the SOLUTION_* environment variables."""
+        data_dir = os.getenv("DATA_DIR", "data")
+        return cls(
+            os.getenv("SOLUTION_STORE_PATH", os.path.join(data_dir, "solutions.db")),
+            ttl=float(os.getenv("SOLUTION_TTL_DAYS", "7")) * 86400,
+            memory_size=int(os.getenv("SOLUTION_STORE_MEMORY_SIZE", "10000")),
+            flush_interval=float(os.getenv("SOLUTION_FLUSH_INTERVAL", "5")),
+            missing_size=int(os.getenv("SOLUTION_MISSING_CACHE_SIZE", "10000")),
+        )
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _remember(self, message_id, entry):
+        self._memory[message_id] = entry
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
+
+    def put(self, message_id, puzzle_id, solution):
+        """Track the solution for a posted message; persisted on the next flush."""
+        entry = Solution(puzzle_id, tuple(solution), time.time() + self.ttl)
+        self._remember(message_id, entry)
+        self._pending[message_id] = entry
+        self._missing.pop(message_id, None)
+        if self._oldest is None or message_id < self._oldest:
+            self._oldest = message_id
+        if self._newest is None or message_id > self._newest:
+            self._newest = message_id
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+
+    def get_cached(self, message_id):
+        """Return a solution from memory only, or None."""
+        entry = self._memory.get(message_id)
+        if entry is None:
+            return None
+        if entry.expires < time.time():
+            del self._memory[message_id]
+            self.expired += 1
+            return None
+        self.memory_hits += 1
+        return entry
+
+    async def get(self, message_id):
+        """Return the solution for a message, falling back to disk for older posts."""
+        entry = self.get_cached(message_id)
+        if entry is not None:
+            return entry
+
+        entry = self._pending.get(message_id)
+        if entry is None:
+            if self._oldest is None or not self._oldest <= message_id <= self._newest or message_id in self._missing:
+                self.misses += 1
+                return None
+            entry = await self._run(self._load, message_id)
+            if entry is None:
+                self.disk_misses += 1
+                self._missing[message_id] = None
+                while len(self._missing) > self.missing_size:
+                    self._missing.popitem(last=False)
+        if entry is None or entry.expires < time.time():
+            self.misses += 1
+            return None
+
+        self.disk_hits += 1
+        self._remember(message_id, entry)
+        return entry
+
+    def _load(self, message_id):
+        row = self._db.execute(
+            "SELECT puzzle_id, solution, expires FROM solutions WHERE message_id = ?", (message_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return Solution(row[0], tuple(row[1].split()), row[2])
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Error flushing puzzle solutions: %s", e)
+
+    async def flush(self):
+        """Write pending solutions to disk and purge expired ones."""
+        self.purge_expired()
+        if not self._pending:
+            return 0
+        rows, self._pending = self._pending, {}
+        return await self._run(self._write, rows)
+
+    def _write(self, rows):
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO solutions (message_id, puzzle_id, solution, expires) VALUES (?, ?, ?, ?)",
+            [(message_id, e.puzzle_id, " ".join(e.solution), e.expires) for message_id, e in rows.items()]
+        )
+        self._db.execute("DELETE FROM solutions WHERE expires < ?", (now,))
+        self._db.commit()
+        self.flushes += 1
+        self.rows_written += len(rows)
+        return len(rows)
+
+    def purge_expired(self):
+        """Drop expired entries from the front of the memory tier."""
+        now = time.time()
+        purged = 0
+        while self._memory:
+            message_id, entry = next(iter(self._memory.items()))
+            if entry.expires >= now:
+                break
+            del self._memory[message_id]
+            purged += 1
+        self.expired += purged
+        return purged
+
+    def warm_up(self):
+        """Load the most recent unexpired solutions into memory."""
+        rows = self._db.execute(
+            "SELECT message_id, puzzle_id, solution, expires FROM solutions "
+            "WHERE expires >= ? ORDER BY expires DESC LIMIT ?",
+            (time.time(), self.memory_size)
+        ).fetchall()
+        for message_id, puzzle_id, solution, expires in reversed(rows):
+            self._remember(message_id, Solution(puzzle_id, tuple(solution.split()), expires))
+        logger.info("Loaded %s puzzle solution(s) from disk", len(rows))
+        return len(rows)
+
+    def close(self):
+        """Flush pending solutions and close the database."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        self._executor.shutdown(wait=True)
+        if self._pending:
+            rows, self._pending = self._pending, {}
+            self._write(rows)
+        self._db.close()
+
+    def stats(self):
+        """Return lookup and persistence counters."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_size": len(self._memory),
+            "memory_limit": self.memory_size,
+            "pending_writes": len(self._pending),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk_misses": self.disk_misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "memory_evictions": self.memory_evictions,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+        }
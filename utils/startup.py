@@ -0,0 +1,123 @@
+import os
+import ast
+import sys
+import time
+import logging
+import importlib
+import importlib.util
+from collections import namedtuple
+
+logger = logging.getLogger("safari_buddy.startup")
+
+# Extensions that are only loaded (and imported) when their feature is on: module -> (setting, default)
+FEATURE_FLAGS = {
+    "utils.api": ("API_ENABLED", "false"),
+    "events.twitch": ("TWITCH_ENABLED", "true"),
+    "events.puzzle": ("PUZZLE_ENABLED", "true"),
+}
+
+# name, status (loaded, disabled or failed), import and setup time in seconds
+ExtensionTiming = namedtuple("ExtensionTiming", "name status import_time setup_time")
+
+
+def _top_level_imports(path):
+    """Modules a source file imports at module level (imports inside functions are left lazy)."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return modules
+
+
+class ExtensionLoader:
+    """Loads the bot's cogs and reports how long each one took.
+
+    Cogs are discovered in the commands and events packages, plus the API;
+    an extension whose feature is disabled is never imported, so e.g.
+    FastAPI and uvicorn stay out of the process unless API_ENABLED is set.
+    An extension's module-level imports are timed on their own, before
+    py-cord runs the module and its setup, so the report separates import
+    cost from cog setup.
+    """
+
+    def __init__(self, bot, packages=("commands", "events"), extra=("utils.api",), disabled=()):
+        self.bot = bot
+        self.packages = packages
+        self.extra = extra
+        self.disabled = set(disabled)
+        self.timings = []
+
+    @classmethod
+    def from_env(cls, bot):
+        """Build a loader from the *_ENABLED feature flags and DISABLED_EXTENSIONS."""
+        disabled = {name.strip() for name in os.getenv("DISABLED_EXTENSIONS", "").split(",") if name.strip()}
+        for name, (setting, default) in FEATURE_FLAGS.items():
+            if os.getenv(setting, default).lower() != "true":
+                disabled.add(name)
+        return cls(bot, disabled=disabled)
+
+    def discover(self):
+        """Extension module names, in load order."""
+        names = []
+        for package in self.packages:
+            names.extend(f"{package}.{filename[:-3]}" for filename in sorted(os.listdir(package))
+                         if filename.endswith(".py") and not filename.startswith("_"))
+        names.extend(name for name in self.extra if importlib.util.find_spec(name) is not None)
+        return names
+
+    def _import_dependencies(self, name):
+        spec = importlib.util.find_spec(name)
+        for module in _top_level_imports(spec.origin):
+            if module not in sys.modules:
+                try:
+                    importlib.import_module(module)
+                except ImportError:
+                    # Surfaces with the real traceback when py-cord loads the extension
+                    pass
+
+    def load(self, name):
+        """Load one extension, recording its timing; failures are logged, not raised."""
+        if name in self.disabled:
+            self.timings.append(ExtensionTiming(name, "disabled", 0.0, 0.0))
+            return False
+
+        started = time.perf_counter()
+        self._import_dependencies(name)
+        imported = time.perf_counter()
+        try:
+            self.bot.load_extension(name)
+        except Exception as e:
+            logger.error("Failed to load extension %s: %s", name, e, exc_info=True)
+            status = "failed"
+        else:
+            status = "loaded"
+        self.timings.append(ExtensionTiming(name, status, imported - started, time.perf_counter() - imported))
+        return status == "loaded"
+
+    def load_all(self):
+        for name in self.discover():
+            self.load(name)
+
+    def report(self):
+        """Log a per-extension import/setup breakdown."""
+        lines = [f"{'extension':<20} {'status':<9} {'import':>9} {'setup':>9}"]
+        for timing in self.timings:
+            lines.append(f"{timing.name:<20} {timing.status:<9} {timing.import_time * 1000:7.1f}ms "
+                         f"{timing.setup_time * 1000:7.1f}ms")
+        total = sum(timing.import_time + timing.setup_time for timing in self.timings)
+        lines.append(f"{'total':<30} {total * 1000:7.1f}ms")
+        logger.info("Extension load times:\n" + "\n".join(lines))
+
+    def stats(self):
+        return {
+            timing.name: {
+                "status": timing.status,
+                "import_ms": round(timing.import_time * 1000, 1),
+                "setup_ms": round(timing.setup_time * 1000, 1),
+            }
+            for timing in self.timings
+        }
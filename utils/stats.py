@@ -0,0 +1,7 @@
+def percentile(samples, pct):
+    """Return the pct-th percentile of a list of samples (nearest rank)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
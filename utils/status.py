@@ -0,0 +1,139 @@
+import json
+import time
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger("safari_buddy.status")
+
+
+def format_uptime(seconds, with_seconds=True):
+    """Format a duration as '1d 2h 3m 4s' (or without the seconds)."""
+    days, remainder = divmod(int(seconds), 86400)
+    hours, remainder = divmod(remainder, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    text = f"{days}d {hours}h {minutes}m"
+    return f"{text} {seconds}s" if with_seconds else text
+
+
+class StatusSnapshot:
+    """Precomputed bot status, served as-is to health checks.
+
+    Guild count and shard state are updated from gateway events, and
+    latency, uptime and cache sizes on a periodic refresh, so answering
+    /status never walks the bot's state. The JSON body and its ETag are
+    rebuilt only when one of those changes (uptime is reported to the
+    minute), so monitors polling with If-None-Match mostly get a 304.
+    Without the StatusTracker cog (``tracked`` is False) no events reach
+    the snapshot, so it is refreshed when read and takes the connection
+    state from the bot.
+    """
+
+    def __init__(self, bot, started_at):
+        self.bot = bot
+        self.started_at = started_at
+        self.tracked = False
+        self.guilds = 0
+        self.latency_ms = None
+        # shard ID ("0" without sharding) -> connected, ready, resumed or disconnected
+        self.shards = {}
+        self._cache_sizes = {}
+        self.caches = {}
+
+        self.body = b""
+        self.etag = '""'
+        self.renders = 0
+        self.not_modified = 0
+        self.served = 0
+        self.render()
+
+    @property
+    def uptime(self):
+        return time.time() - self.started_at
+
+    @property
+    def online(self):
+        return any(state != "disconnected" for state in self.shards.values())
+
+    def register_cache(self, name, size):
+        """Report a cache's size (a callable returning an int) in the status."""
+        self._cache_sizes[name] = size
+
+    def render(self):
+        """Rebuild the JSON body, and the ETag if anything changed."""
+        body = json.dumps({
+            "status": "online" if self.online else "connecting",
+            "guilds": self.guilds,
+            "uptime": format_uptime(self.uptime, with_seconds=False),
+            "started_at": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            "latency_ms": self.latency_ms,
+            "shards": self.shards,
+            "caches": self.caches,
+        }, separators=(",", ":")).encode("utf-8")
+        if body != self.body:
+            self.body = body
+            self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            self.renders += 1
+
+    def set_shard(self, shard_id, state):
+        self.shards[str(shard_id if shard_id is not None else 0)] = state
+        self.render()
+
+    def set_guilds(self, count):
+        if count != self.guilds:
+            self.guilds = count
+            self.render()
+
+    def refresh(self):
+        """Pick up values that change without an event: latency, cache sizes and uptime."""
+        if not self.tracked:
+            state = "disconnected" if self.bot.is_closed() else "ready" if self.bot.is_ready() else "connected"
+            self.shards = {"0": state}
+        latency = self.bot.latency
+        self.latency_ms = round(latency * 1000) if latency == latency and latency != float("inf") else None
+        self.guilds = len(self.bot.guilds)
+        caches = {
+            "messages": len(self.bot.cached_messages),
+            "users": len(self.bot.users),
+        }
+        for name, size in self._cache_sizes.items():
+            try:
+                caches[name] = size()
+            except Exception as e:
+                logger.error("Error reading size of cache %s: %s", name, e)
+        self.caches = caches
+        self.render()
+
+    def matches(self, if_none_match):
+        """Whether an If-None-Match header names the current body."""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        tags = [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+        return self.etag in tags or "*" in tags
+
+    def current(self):
+        """The snapshot to serve: as kept up to date by the tracker, or refreshed now without it."""
+        if not self.tracked:
+            self.refresh()
+        return self
+
+    def stats(self):
+        return {
+            "served": self.served,
+            "not_modified": self.not_modified,
+            "renders": self.renders,
+        }
+
+
+def get_status_snapshot(bot):
+    """Return the status snapshot shared by the API and the status command, creating it if needed.
+
+    Uptime counts from ``bot.started_at`` (set by main.py when the process
+    starts), or from the snapshot's creation if the bot has none.
+    """
+    snapshot = getattr(bot, "status_snapshot", None)
+    if snapshot is None:
+        snapshot = StatusSnapshot(bot, getattr(bot, "started_at", None) or time.time())
+        bot.status_snapshot = snapshot
+    return snapshot
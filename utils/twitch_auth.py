@@ -0,0 +1,131 @@
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger("safari_buddy.twitch_auth")
+
+# Seconds to wait before retrying a failed background refresh (doubles up to the max)
+RETRY_DELAY = 15
+MAX_RETRY_DELAY = 300
+
+
+class TwitchTokenManager:
+    """Single-flight holder for the Twitch app access token.
+
+    Concurrent callers that find no valid token share one request to
+    id.twitch.tv. Once a token is obtained, a background task replaces it
+    ``refresh_margin`` seconds before it expires, so callers only ever wait
+    for the very first token (or after an invalidation).
+    """
+
+    def __init__(self, http, client_id, client_secret, auth_base="https://id.twitch.tv", refresh_margin=300):
+        self.http = http
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.auth_base = auth_base
+        self.refresh_margin = refresh_margin
+
+        self._token = None
+        # Monotonic times the current token was issued and expires
+        self._issued = None
+        self._expires = None
+        self._inflight = None
+        self._refresher = None
+
+        # Stats
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.waits = 0
+        self.invalidations = 0
+
+    def _valid(self):
+        return self._token is not None and time.monotonic() < self._expires
+
+    async def get(self):
+        """Return a valid access token, or None if Twitch would not issue one."""
+        if self._valid():
+            return self._token
+        self.waits += 1
+        return await self.refresh()
+
+    def refresh(self):
+        """Fetch a new token, sharing the request with any refresh already in flight."""
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._fetch())
+        return asyncio.shield(self._inflight)
+
+    async def _fetch(self):
+        try:
+            url = f"{self.auth_base}/oauth2/token"
+            params = {
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "grant_type": "client_credentials"
+            }
+            async with self.http.post(url, params=params) as response:
+                if response.status != 200:
+                    self.refresh_failures += 1
+                    logger.error("Failed to get Twitch API token. Status: %s", response.status)
+                    return self._token if self._valid() else None
+                data = await response.json()
+
+            now = time.monotonic()
+            self._token = data["access_token"]
+            self._issued = now
+            self._expires = now + data["expires_in"]
+            self.refreshes += 1
+            logger.info("Successfully obtained Twitch API token")
+            self._schedule_refresh(max(0, data["expires_in"] - self.refresh_margin))
+            return self._token
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.error("Error getting Twitch API token: %s", e)
+            return self._token if self._valid() else None
+        finally:
+            self._inflight = None
+
+    def _schedule_refresh(self, delay):
+        # Replaces any pending refresh, including one waiting on this fetch
+        if self._refresher is not None:
+            self._refresher.cancel()
+        self._refresher = asyncio.ensure_future(self._refresh_later(delay))
+
+    async def _refresh_later(self, delay):
+        """Replace the token before it expires, retrying with backoff while it is still valid."""
+        await asyncio.sleep(delay)
+        retry = RETRY_DELAY
+        failures = self.refresh_failures
+        while True:
+            await self.refresh()
+            if self.refresh_failures == failures:
+                return
+            failures = self.refresh_failures
+            await asyncio.sleep(retry)
+            retry = min(MAX_RETRY_DELAY, retry * 2)
+
+    def invalidate(self, token):
+        """Drop a token Twitch rejected (401), unless it has already been replaced."""
+        if token is not None and token == self._token:
+            self.invalidations += 1
+            self._token = None
+            logger.warning("Twitch rejected the API token, fetching a new one")
+
+    def close(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+        if self._inflight is not None:
+            self._inflight.cancel()
+
+    def stats(self):
+        """Return token age and refresh counters."""
+        now = time.monotonic()
+        return {
+            "has_token": self._valid(),
+            "token_age_s": round(now - self._issued, 1) if self._issued is not None else None,
+            "expires_in_s": round(self._expires - now, 1) if self._expires is not None else None,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "waits": self.waits,
+            "invalidations": self.invalidations,
+            "refresh_in_flight": self._inflight is not None,
+        }
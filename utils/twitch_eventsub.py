@@ -0,0 +1,166 @@
+import hmac
+import time
+import json
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+logger = logging.getLogger("safari_buddy.twitch_eventsub")
+
+# Twitch EventSub webhook headers
+MESSAGE_ID = "Twitch-Eventsub-Message-Id"
+MESSAGE_TIMESTAMP = "Twitch-Eventsub-Message-Timestamp"
+MESSAGE_SIGNATURE = "Twitch-Eventsub-Message-Signature"
+MESSAGE_TYPE = "Twitch-Eventsub-Message-Type"
+
+# Message types
+VERIFICATION = "webhook_callback_verification"
+NOTIFICATION = "notification"
+REVOCATION = "revocation"
+
+# Number of recent delivery latencies kept for reporting
+LATENCY_SAMPLES = 256
+
+
+def sign(secret, message_id, timestamp, body):
+    """Return the EventSub signature header value for a delivery."""
+    digest = hmac.new(secret.encode(), message_id.encode() + timestamp.encode() + body, hashlib.sha256)
+    return "sha256=" + digest.hexdigest()
+
+
+def parse_timestamp(value):
+    """Parse an RFC3339 EventSub timestamp (nanosecond precision) to a UTC datetime."""
+    value = value.rstrip("Z")
+    if "." in value:
+        whole, fraction = value.split(".", 1)
+        value = f"{whole}.{fraction[:6]}"
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+class EventSubHandler:
+    """Verifies, deduplicates and dispatches Twitch EventSub webhook deliveries.
+
+    Every delivery must carry a valid HMAC signature and a timestamp no older
+    than ``max_age`` seconds. Twitch retries deliveries it considers failed,
+    so message IDs seen in the last ``dedupe_size`` deliveries are
+    acknowledged without being dispatched again. Listeners run as background
+    tasks so the webhook is acknowledged straight away.
+    """
+
+    def __init__(self, secret, max_age=600, dedupe_size=1024):
+        self.secret = secret
+        self.max_age = max_age
+        self.dedupe_size = dedupe_size
+        self._seen = OrderedDict()
+        self._listeners = {}
+        self._tasks = set()
+
+        # Stats
+        self.notifications = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.verifications = 0
+        self.revocations = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.last_notification = None
+
+    def on(self, subscription_type, callback):
+        """Register a coroutine function called with the event for a subscription type."""
+        self._listeners[subscription_type] = callback
+
+    def verify(self, headers, body):
+        """Return True if a delivery is signed with our secret and recent enough."""
+        message_id = headers.get(MESSAGE_ID)
+        timestamp = headers.get(MESSAGE_TIMESTAMP)
+        signature = headers.get(MESSAGE_SIGNATURE)
+        if not message_id or not timestamp or not signature:
+            return False
+
+        expected = sign(self.secret, message_id, timestamp, body)
+        if not hmac.compare_digest(expected, signature):
+            return False
+
+        try:
+            sent = parse_timestamp(timestamp)
+        except ValueError:
+            return False
+        return (datetime.now(timezone.utc) - sent).total_seconds() <= self.max_age
+
+    def _is_duplicate(self, message_id):
+        if message_id in self._seen:
+            self._seen.move_to_end(message_id)
+            return True
+        self._seen[message_id] = None
+        while len(self._seen) > self.dedupe_size:
+            self._seen.popitem(last=False)
+        return False
+
+    async def handle(self, headers, body):
+        """Process one webhook delivery and return (status_code, text) for the response."""
+        if not self.verify(headers, body):
+            self.rejected += 1
+            logger.warning("Rejected EventSub delivery with an invalid signature or timestamp")
+            return 403, "invalid signature"
+
+        message_type = headers.get(MESSAGE_TYPE)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.rejected += 1
+            return 400, "invalid body"
+
+        if message_type == VERIFICATION:
+            self.verifications += 1
+            subscription = payload.get("subscription", {})
+            logger.info("Verified EventSub subscription %s (%s)", subscription.get('type'), subscription.get('id'))
+            return 200, payload.get("challenge", "")
+
+        if self._is_duplicate(headers[MESSAGE_ID]):
+            self.duplicates += 1
+            return 204, ""
+
+        subscription = payload.get("subscription", {})
+        if message_type == REVOCATION:
+            self.revocations += 1
+            logger.warning("EventSub subscription %s revoked: %s", subscription.get('type'), subscription.get('status'))
+            return 204, ""
+
+        if message_type != NOTIFICATION:
+            return 204, ""
+
+        self.notifications += 1
+        self.last_notification = time.time()
+        try:
+            sent = parse_timestamp(headers[MESSAGE_TIMESTAMP])
+            self.latencies.append((datetime.now(timezone.utc) - sent).total_seconds())
+        except ValueError:
+            pass
+
+        callback = self._listeners.get(subscription.get("type"))
+        if callback:
+            task = asyncio.ensure_future(self._dispatch(callback, payload.get("event", {})))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return 204, ""
+
+    async def _dispatch(self, callback, event):
+        try:
+            await callback(event)
+        except Exception as e:
+            logger.error("Error handling EventSub event: %s", e, exc_info=True)
+
+    def stats(self):
+        """Return delivery counters and webhook delivery latency."""
+        samples = sorted(self.latencies)
+        return {
+            "notifications": self.notifications,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "verifications": self.verifications,
+            "revocations": self.revocations,
+            "delivery_latency_p50_ms": samples[len(samples) // 2] * 1000 if samples else 0.0,
+            "delivery_latency_max_ms": samples[-1] * 1000 if samples else 0.0,
+            "last_notification": self.last_notification,
+        }
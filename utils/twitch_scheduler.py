@@ -0,0 +1,164 @@
+import os
+import time
+import random
+import logging
+from collections import deque
+from datetime import datetime, timezone
+
+logger = logging.getLogger("safari_buddy.twitch_scheduler")
+
+# Hour-of-week slots used to learn when channels usually go live
+SLOTS = 7 * 24
+
+# Go-live times kept for learning (about eight weeks of daily streams)
+HISTORY_SIZE = 512
+
+
+def slot_of(timestamp):
+    """Return the UTC hour-of-week slot (0 = Monday 00:00) for a Unix timestamp."""
+    moment = datetime.fromtimestamp(timestamp, timezone.utc)
+    return moment.weekday() * 24 + moment.hour
+
+
+class AdaptivePollScheduler:
+    """Chooses the delay before the next Twitch poll.
+
+    Polls every ``min_interval`` seconds in hour-of-week slots where the
+    watched channels have gone live at least ``hot_threshold`` times before
+    (and the slot just before them), every ``interval`` seconds otherwise,
+    and stretches towards ``max_interval`` once nothing has been live for
+    ``idle_after`` seconds. Failed polls back off exponentially with full
+    jitter, and the Helix rate-limit headers hold polls back until the
+    bucket resets when it is nearly empty.
+    """
+
+    def __init__(self, interval=300, min_interval=60, max_interval=1800, idle_after=6 * 3600,
+                 hot_threshold=2, jitter=0.1, rate_limit_reserve=10, history=()):
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_after = idle_after
+        self.hot_threshold = hot_threshold
+        self.jitter = jitter
+        self.rate_limit_reserve = rate_limit_reserve
+
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._slots = [0] * SLOTS
+        for started_at in sorted(history):
+            self.record_go_live(started_at)
+
+        self.failures = 0
+        self.last_live = time.time()
+        self.current_interval = interval
+        self.next_poll_at = None
+        self.mode = "normal"
+
+        # Helix rate-limit bucket, as last reported by Twitch
+        self.ratelimit_limit = None
+        self.ratelimit_remaining = None
+        self.ratelimit_reset = None
+
+        # Stats
+        self.polls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.calls_per_poll = 0
+
+    @classmethod
+    def from_env(cls, history=()):
+        """Build a scheduler from the TWITCH_POLL_* environment variables."""
+        return cls(
+            interval=float(os.getenv("TWITCH_POLL_INTERVAL", "300")),
+            min_interval=float(os.getenv("TWITCH_POLL_MIN_INTERVAL", "60")),
+            max_interval=float(os.getenv("TWITCH_POLL_MAX_INTERVAL", "1800")),
+            idle_after=float(os.getenv("TWITCH_POLL_IDLE_AFTER", str(6 * 3600))),
+            hot_threshold=int(os.getenv("TWITCH_POLL_HOT_THRESHOLD", "2")),
+            jitter=float(os.getenv("TWITCH_POLL_JITTER", "0.1")),
+            history=history,
+        )
+
+    def record_go_live(self, started_at):
+        """Learn from a channel going live at a Unix timestamp."""
+        if len(self._history) == self._history.maxlen:
+            self._slots[slot_of(self._history[0])] -= 1
+        self._history.append(started_at)
+        self._slots[slot_of(started_at)] += 1
+
+    def is_hot(self, now=None):
+        """Whether now, or the next hour, is a slot where channels usually go live."""
+        slot = slot_of(now or time.time())
+        return max(self._slots[slot], self._slots[(slot + 1) % SLOTS]) >= self.hot_threshold
+
+    def observe_rate_limit(self, headers):
+        """Record the Ratelimit-* headers of a Helix response."""
+        try:
+            if "Ratelimit-Limit" in headers:
+                self.ratelimit_limit = int(headers["Ratelimit-Limit"])
+            if "Ratelimit-Remaining" in headers:
+                self.ratelimit_remaining = int(headers["Ratelimit-Remaining"])
+            if "Ratelimit-Reset" in headers:
+                self.ratelimit_reset = int(headers["Ratelimit-Reset"])
+        except ValueError:
+            pass
+
+    def next_delay(self, success, any_live, calls=1, now=None):
+        """Record the outcome of a poll and return the seconds to wait before the next one."""
+        now = now or time.time()
+        self.polls += 1
+        self.calls_per_poll = calls
+        if any_live:
+            self.last_live = now
+
+        if not success:
+            self.errors += 1
+            self.failures += 1
+            self.mode = "backoff"
+            # Full jitter: anywhere up to the exponential ceiling
+            ceiling = min(self.max_interval, self.min_interval * 2 ** self.failures)
+            delay = random.uniform(self.min_interval, max(self.min_interval, ceiling))
+        else:
+            self.failures = 0
+            if self.is_hot(now):
+                self.mode = "hot"
+                delay = self.min_interval
+            elif any_live or now - self.last_live < self.idle_after:
+                self.mode = "normal"
+                delay = self.interval
+            else:
+                # Double the interval for every further idle_after spent offline
+                self.mode = "idle"
+                idle_periods = (now - self.last_live) / self.idle_after
+                delay = min(self.max_interval, self.interval * 2 ** (idle_periods - 1))
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+
+        # Wait for the bucket to refill rather than spending the last requests
+        if (self.ratelimit_remaining is not None and self.ratelimit_reset
+                and self.ratelimit_remaining < self.rate_limit_reserve + calls and self.ratelimit_reset > now):
+            self.rate_limited += 1
+            self.mode = "rate_limited"
+            delay = max(delay, self.ratelimit_reset - now + random.uniform(0, 1))
+
+        self.current_interval = delay
+        self.next_poll_at = now + delay
+        return delay
+
+    def stats(self):
+        """Return the current interval, mode and upstream call budget."""
+        hourly_calls = self.calls_per_poll * 3600 / self.current_interval if self.current_interval else 0.0
+        return {
+            "mode": self.mode,
+            "current_interval_s": round(self.current_interval, 1),
+            "next_poll_at": self.next_poll_at,
+            "consecutive_failures": self.failures,
+            "hot_now": self.is_hot(),
+            "hot_slots": sum(1 for count in self._slots if count >= self.hot_threshold),
+            "go_lives_learned": len(self._history),
+            "calls_per_poll": self.calls_per_poll,
+            "estimated_calls_per_hour": round(hourly_calls, 1),
+            "ratelimit_limit": self.ratelimit_limit,
+            "ratelimit_remaining": self.ratelimit_remaining,
+            "ratelimit_reset": self.ratelimit_reset,
+            "polls": self.polls,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+        }
@@ -0,0 +1,130 @@
+import os
+import re
+import sqlite3
+import logging
+
+logger = logging.getLogger("safari_buddy.twitch_watchlist")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watchlist (
+    guild_id INTEGER NOT NULL,
+    login TEXT NOT NULL,
+    PRIMARY KEY (guild_id, login)
+);
+CREATE TABLE IF NOT EXISTS go_lives (
+    login TEXT NOT NULL,
+    started_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS go_lives_started_at ON go_lives (started_at);
+"""
+
+# Twitch login names: 4-25 letters, digits or underscores
+LOGIN_PATTERN = re.compile(r"^[a-z0-9_]{4,25}$")
+
+# Most logins Helix accepts in one /streams or /users request
+HELIX_BATCH_SIZE = 100
+
+
+def normalize_login(login):
+    """Return a lower-case Twitch login, or None if it is not a valid login."""
+    login = login.strip().lower().lstrip("@")
+    if login.startswith("https://twitch.tv/") or login.startswith("https://www.twitch.tv/"):
+        login = login.rstrip("/").rsplit("/", 1)[-1]
+    return login if LOGIN_PATTERN.match(login) else None
+
+
+def batches(items, size=HELIX_BATCH_SIZE):
+    """Split a list into consecutive chunks of at most size items."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class TwitchWatchlist:
+    """Twitch channels announced per guild, persisted in SQLite.
+
+    The default channel is announced in every guild; other channels are
+    added per guild. The set of logins to poll and the guilds watching each
+    login are kept in memory and rebuilt only when the watchlist changes,
+    so a poll cycle never touches the database. Go-live times are kept
+    too, so the poll scheduler can learn when channels usually stream.
+    """
+
+    def __init__(self, path, default_login=None):
+        self.path = path
+        self.default_login = normalize_login(default_login) if default_login else None
+        self._guilds = {}
+        self._watchers = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+        for guild_id, login in self._db.execute("SELECT guild_id, login FROM watchlist"):
+            self._guilds.setdefault(guild_id, set()).add(login)
+        self._reindex()
+
+    @classmethod
+    def from_env(cls, default_login=None):
+        """Build a watchlist from the TWITCH_WATCHLIST_PATH environment variable."""
+        data_dir = os.getenv("DATA_DIR", "data")
+        return cls(os.getenv("TWITCH_WATCHLIST_PATH", os.path.join(data_dir, "twitch.db")), default_login)
+
+    def _reindex(self):
+        """Rebuild login -> watching guild IDs; None means every guild."""
+        watchers = {}
+        for guild_id, logins in self._guilds.items():
+            for login in logins:
+                watchers.setdefault(login, set()).add(guild_id)
+        if self.default_login:
+            watchers[self.default_login] = None
+        self._watchers = watchers
+        self.logins = sorted(watchers)
+
+    def add(self, guild_id, login):
+        """Watch a channel in a guild; returns False if it was already watched."""
+        if login in self._guilds.get(guild_id, ()):
+            return False
+        self._db.execute("INSERT OR IGNORE INTO watchlist (guild_id, login) VALUES (?, ?)", (guild_id, login))
+        self._db.commit()
+        self._guilds.setdefault(guild_id, set()).add(login)
+        self._reindex()
+        return True
+
+    def remove(self, guild_id, login):
+        """Stop watching a channel in a guild; returns False if it was not watched."""
+        if login not in self._guilds.get(guild_id, ()):
+            return False
+        self._db.execute("DELETE FROM watchlist WHERE guild_id = ? AND login = ?", (guild_id, login))
+        self._db.commit()
+        self._guilds[guild_id].discard(login)
+        self._reindex()
+        return True
+
+    def for_guild(self, guild_id):
+        """Return the channels announced in a guild, default first."""
+        extra = sorted(self._guilds.get(guild_id, ()) - {self.default_login})
+        return ([self.default_login] if self.default_login else []) + extra
+
+    def watches(self, login):
+        return login in self._watchers
+
+    def watching_guilds(self, login):
+        """Return the IDs of guilds announcing a channel, or None for every guild."""
+        return self._watchers.get(login, set())
+
+    def record_go_live(self, login, started_at):
+        """Remember when a channel went live."""
+        self._db.execute("INSERT INTO go_lives (login, started_at) VALUES (?, ?)", (login, started_at))
+        self._db.commit()
+
+    def go_live_history(self, since):
+        """Return go-live timestamps since a Unix time, oldest first."""
+        rows = self._db.execute(
+            "SELECT started_at FROM go_lives WHERE started_at >= ? ORDER BY started_at", (since,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        self._db.close()